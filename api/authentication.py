@@ -0,0 +1,153 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+# Сколько полных пользователей держать в памяти процесса и как долго (секунды)
+USER_CACHE_SIZE = getattr(settings, 'JWT_USER_CACHE_SIZE', 1024)
+USER_CACHE_TIMEOUT = getattr(settings, 'JWT_USER_CACHE_TIMEOUT', 60)
+# Права пользователя (is_active, is_superuser, район) в общем кэше; сбрасываются при сохранении пользователя
+AUTH_STATE_TIMEOUT = getattr(settings, 'JWT_AUTH_STATE_TIMEOUT', 30)
+AUTH_STATE_FIELDS = ('is_active', 'is_superuser', 'district_id')
+
+
+class UserCache:
+    """
+    Bounded LRU of full user objects by id. Entries are evicted on user save/delete (signals)
+    and expire after USER_CACHE_TIMEOUT, so other processes see changes within that time.
+    """
+
+    def __init__(self, maxsize=USER_CACHE_SIZE, timeout=USER_CACHE_TIMEOUT):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.users = OrderedDict()
+
+    def peek(self, user_id):
+        with self.lock:
+            entry = self.users.get(user_id)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at < time.monotonic():
+                del self.users[user_id]
+                return None
+            self.users.move_to_end(user_id)
+            return user
+
+    def get(self, user_id):
+        user = self.peek(user_id)
+        if user is None:
+            user = get_user_model().objects.select_related('district').get(pk=user_id)
+            with self.lock:
+                self.users[user_id] = (user, time.monotonic() + self.timeout)
+                self.users.move_to_end(user_id)
+                while len(self.users) > self.maxsize:
+                    self.users.popitem(last=False)
+        return user
+
+    def invalidate(self, user_id):
+        with self.lock:
+            self.users.pop(user_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.users.clear()
+
+
+user_cache = UserCache()
+
+
+def auth_state_key(user_id):
+    return f'jwt-auth-state:{user_id}'
+
+
+def get_auth_state(user_id):
+    """
+    {is_active, is_superuser, district_id} of the user from the shared cache, or from the DB on a miss
+    (then cached for AUTH_STATE_TIMEOUT). None if the user does not exist.
+    """
+    key = auth_state_key(user_id)
+    state = cache.get(key)
+    if state is None:
+        state = get_user_model().objects.filter(pk=user_id).values(*AUTH_STATE_FIELDS).first() or {}
+        cache.set(key, state, AUTH_STATE_TIMEOUT)
+    return state or None
+
+
+def invalidate_auth_state(user_id):
+    cache.delete(auth_state_key(user_id))
+
+
+class ClaimsUser:
+    """
+    Пользователь по id из токена: is_active, district_id и is_superuser - из get_auth_state (общий кэш
+    с коротким сроком, не claims: токен живёт долго и не отражает смену прав).
+    Остальные атрибуты берутся у полного пользователя из user_cache.
+    """
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, token, user_id, state):
+        self.token = token
+        self.id = self.pk = user_id
+        self.is_active = state['is_active']
+        self.is_superuser = state['is_superuser']
+        self.district_id = state['district_id']
+
+    @cached_property
+    def full_user(self):
+        try:
+            return user_cache.get(self.id)
+        except get_user_model().DoesNotExist:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+
+    @property
+    def district(self):
+        if self.full_user.district_id != self.district_id:
+            # Полный пользователь в кэше процесса старше прав из get_auth_state: перечитать
+            user_cache.invalidate(self.pk)
+            del self.__dict__['full_user']
+        return self.full_user.district
+
+    def __getattr__(self, name):
+        if name.startswith('_') or name in ('token', 'id', 'pk'):
+            raise AttributeError(name)
+        return getattr(self.full_user, name)
+
+    def __eq__(self, other):
+        return getattr(other, 'pk', None) == self.pk and hasattr(other, 'is_authenticated')
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    def __str__(self):
+        return f'ClaimsUser {self.pk}'
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication без чтения полного пользователя из БД на каждый запрос: права и is_active
+    проверяются по get_auth_state, так что отключение и смена прав действуют сразу после сохранения.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+
+        state = get_auth_state(user_id)
+        if state is None:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+        if not state['is_active']:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        return ClaimsUser(validated_token, user_id, state)
@@ -0,0 +1,227 @@
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .plantation_models import Farmer
+
+AUTOCOMPLETE_VERSION_KEY = 'farmer-autocomplete:version'
+# Каждое изменение хранится в кэше под своей версией: другие процессы применяют его без перестроения
+AUTOCOMPLETE_CHANGE_TIMEOUT = getattr(settings, 'AUTOCOMPLETE_CHANGE_TIMEOUT', 60 * 60)
+# Отстав больше чем на столько изменений, процесс перестраивает индекс
+AUTOCOMPLETE_MAX_CHANGES = getattr(settings, 'AUTOCOMPLETE_MAX_CHANGES', 1000)
+# Начиная с этого числа изменения применяются одним проходом по массиву, а не вставками по одному
+AUTOCOMPLETE_BATCH_CHANGES = 32
+AUTOCOMPLETE_LIMIT = getattr(settings, 'AUTOCOMPLETE_LIMIT', 10)
+MAX_AUTOCOMPLETE_LIMIT = 50
+
+# Узбекская кириллица -> латиница (и русские буквы, которые встречаются в названиях);
+# апострофы (o', g') потом отбрасываются, так что "Боғбон", "Bog'bon" и "Bogʻbon" дают одно и то же
+CYRILLIC_TO_LATIN = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'yo', 'ж': 'j', 'з': 'z', 'и': 'i',
+    'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r', 'с': 's', 'т': 't',
+    'у': 'u', 'ф': 'f', 'х': 'x', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh', 'щ': 'sh', 'ъ': '', 'ы': 'i', 'ь': '',
+    'э': 'e', 'ю': 'yu', 'я': 'ya', 'ў': 'o', 'қ': 'q', 'ғ': 'g', 'ҳ': 'h',
+}
+TRANSLITERATION = str.maketrans(CYRILLIC_TO_LATIN)
+# "е" в начале слова и после гласной пишется "ye": Ергаш -> Yergash
+INITIAL_YE_RE = re.compile(r'(?:(?<=[аеёиоуўэюя])|(?<![а-яёўқғҳ]))е')
+APOSTROPHE_RE = re.compile(r"['`ʻʼ‘’]")
+SEPARATOR_RE = re.compile(r'[\W_]+')
+
+
+def normalize(text):
+    """
+    Lowercase Latin form of text: Cyrillic transliterated, apostrophes and diacritics dropped,
+    punctuation collapsed to single spaces.
+    """
+    text = INITIAL_YE_RE.sub('ye', text.lower()).translate(TRANSLITERATION)
+    text = unicodedata.normalize('NFKD', APOSTROPHE_RE.sub('', text))
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return SEPARATOR_RE.sub(' ', text).strip()
+
+
+def index_keys(name, inn):
+    """
+    Ключи фермера: название целиком и с каждого следующего слова ("водий" находит "Олтин водий"), цифры ИНН.
+    """
+    words = normalize(name).split()
+    keys = {' '.join(words[start:]) for start in range(len(words))}
+    digits = ''.join(char for char in inn if char.isdigit())
+    if digits:
+        keys.add(digits)
+    return sorted(keys)
+
+
+def autocomplete_version():
+    # Начальное значение уникально: ключ, вытесненный из кэша и созданный заново, не совпадёт со старым
+    return cache.get_or_set(AUTOCOMPLETE_VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def _bump_version():
+    try:
+        return cache.incr(AUTOCOMPLETE_VERSION_KEY)
+    except ValueError:
+        return autocomplete_version()
+
+
+def change_key(version):
+    return f'farmer-autocomplete:change:{version}'
+
+
+def entry(key, farmer_id):
+    # Ключ и id в одной строке: "\0" меньше любого символа ключа, поэтому порядок тот же, что у пар (key, id),
+    # а список вдвое короче пары параллельных списков
+    return f'{key}\0{farmer_id}'
+
+
+class FarmerAutocomplete:
+    """
+    Sorted array of "key\0farmer id" entries over normalized farmer names and INNs, searched with bisect.
+
+    Built on the first query. Every farmer save or delete (signals, after commit) bumps a version in the shared
+    cache and stores the change under that version; each process applies the changes it has not seen yet
+    before its next query. When changes are missing (expired, or the process is too far behind), the index
+    is rebuilt outside the lock, and queries in other threads keep using the old one until it is swapped in.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Одна пересборка на процесс
+        self.build_lock = threading.Lock()
+        self.version = None
+        self.entries = []
+        # id -> (name, inn)
+        self.farmers = {}
+
+    def build(self):
+        # Версия читается до выборки: изменения, сделанные во время неё, применятся поверх
+        version = autocomplete_version()
+        entries = []
+        farmers = {}
+        for farmer_id, name, inn in Farmer.objects.values_list('id', 'name', 'inn').iterator(chunk_size=10000):
+            farmers[farmer_id] = (name, inn)
+            entries += [entry(key, farmer_id) for key in index_keys(name, inn)]
+        entries.sort()
+        with self.lock:
+            self.entries, self.farmers, self.version = entries, farmers, version
+            self.catch_up(autocomplete_version())
+
+    def refresh(self, version):
+        with self.lock:
+            if self.version == version or self.catch_up(version):
+                return
+        # Без готового индекса ждём пересборки, иначе отвечаем по старому, пока его пересобирает другой поток
+        if not self.build_lock.acquire(blocking=self.version is None):
+            return
+        try:
+            if self.version != autocomplete_version():
+                self.build()
+        finally:
+            self.build_lock.release()
+
+    def catch_up(self, version):
+        """
+        Applies the stored changes after self.version up to version; False if some of them are missing.
+        """
+        if self.version is None or not 0 < version - self.version <= AUTOCOMPLETE_MAX_CHANGES:
+            return False
+        keys = [change_key(number) for number in range(self.version + 1, version + 1)]
+        changes = cache.get_many(keys)
+        if len(changes) < len(keys):
+            return False
+        changes = [changes[key] for key in keys]
+        if len(changes) < AUTOCOMPLETE_BATCH_CHANGES:
+            for farmer_id, farmer in changes:
+                self.apply_change(farmer_id, farmer)
+        else:
+            self.apply_batch(changes)
+        self.version = version
+        return True
+
+    def search(self, query, limit=AUTOCOMPLETE_LIMIT):
+        """
+        Up to limit farmers as [{id, name, inn}] whose name (from any word) or INN starts with the query.
+        """
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        self.refresh(autocomplete_version())
+        with self.lock:
+            results = []
+            seen = set()
+            position = bisect_left(self.entries, prefix)
+            while position < len(self.entries) and len(results) < limit and self.entries[position].startswith(prefix):
+                farmer_id = int(self.entries[position].rpartition('\0')[2])
+                position += 1
+                if farmer_id in seen:
+                    continue
+                seen.add(farmer_id)
+                name, inn = self.farmers[farmer_id]
+                results.append({'id': farmer_id, 'name': name, 'inn': inn})
+            return results
+
+    def update(self, farmer_id, name, inn):
+        self.apply(farmer_id, (name, inn))
+
+    def remove(self, farmer_id):
+        self.apply(farmer_id, None)
+
+    def apply(self, farmer_id, farmer):
+        version = _bump_version()
+        cache.set(change_key(version), (farmer_id, farmer), timeout=AUTOCOMPLETE_CHANGE_TIMEOUT)
+        with self.lock:
+            # Если версию меняли и другие процессы, их изменения и это применит catch_up при запросе
+            if self.version is not None and version == self.version + 1:
+                self.apply_change(farmer_id, farmer)
+                self.version = version
+
+    def apply_change(self, farmer_id, farmer):
+        # Повторное применение ничего не меняет: старые ключи фермера снимаются перед добавлением новых
+        if farmer_id in self.farmers:
+            for key in index_keys(*self.farmers.pop(farmer_id)):
+                del self.entries[bisect_left(self.entries, entry(key, farmer_id))]
+        if farmer is not None:
+            self.farmers[farmer_id] = farmer
+            for key in index_keys(*farmer):
+                insort(self.entries, entry(key, farmer_id))
+
+    def apply_batch(self, changes):
+        # Каждая вставка в середину массива сдвигает его хвост; пачку дешевле собрать из срезов за один проход
+        final = dict(changes)
+        # (позиция в текущем массиве, 0 - вставить запись перед ней / 1 - пропустить запись на ней, запись)
+        edits = [
+            (bisect_left(self.entries, entry(key, farmer_id)), 1, None)
+            for farmer_id in final if farmer_id in self.farmers
+            for key in index_keys(*self.farmers[farmer_id])
+        ]
+        for farmer_id, farmer in final.items():
+            self.farmers.pop(farmer_id, None)
+            if farmer is not None:
+                self.farmers[farmer_id] = farmer
+                edits += [
+                    (bisect_left(self.entries, item), 0, item)
+                    for item in (entry(key, farmer_id) for key in index_keys(*farmer))
+                ]
+        entries, start = [], 0
+        for position, skip, item in sorted(edits):
+            entries += self.entries[start:position]
+            if skip:
+                start = position + 1
+            else:
+                entries.append(item)
+                start = position
+        entries += self.entries[start:]
+        self.entries = entries
+
+    def clear(self):
+        with self.lock:
+            self.version = None
+            self.entries, self.farmers = [], {}
+
+
+farmer_autocomplete = FarmerAutocomplete()
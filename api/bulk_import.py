@@ -0,0 +1,253 @@
+import csv
+import json
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.db import DatabaseError, transaction
+from rest_framework import serializers
+
+from .geo import schedule_geometry_refresh
+from .images import schedule_variants
+from .plantation_models import (
+    SUMMARY_FIELDS, DistrictSummary, Investment, Plantation, PlantationCoordinates, PlantationFruitArea,
+    PlantationImage, Reservoir, Trellis,
+)
+from .response_cache import invalidate_districts_on_commit
+from .search import index_plantations
+from .tiles import invalidate_tiles
+
+IMPORT_CHUNK_SIZE = getattr(settings, 'PLANTATION_IMPORT_CHUNK_SIZE', 500)
+MAX_IMPORT_CHUNK_SIZE = 5000
+
+# Колонки CSV, в которых вложенные объекты записаны JSON-строкой
+CSV_JSON_COLUMNS = ('coordinates', 'fruit_areas', 'images', 'investment', 'reservoir', 'trellis')
+
+
+class CachedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField that memoises lookups in context['related_cache'] for the whole import,
+    so thousands of rows referencing the same district or fruit cost one query per distinct id.
+    """
+
+    def to_internal_value(self, data):
+        cache = self.context.get('related_cache')
+        if cache is None:
+            return super().to_internal_value(data)
+        key = (self.get_queryset().model, str(data))
+        if key not in cache:
+            try:
+                cache[key] = super().to_internal_value(data)
+            except serializers.ValidationError as error:
+                cache[key] = error
+        if isinstance(cache[key], serializers.ValidationError):
+            raise cache[key]
+        return cache[key]
+
+
+class ImportCoordinatesSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PlantationCoordinates
+        fields = ['latitude', 'longitude']
+
+
+class ImportFruitAreaSerializer(serializers.ModelSerializer):
+    serializer_related_field = CachedPrimaryKeyRelatedField
+
+    class Meta:
+        model = PlantationFruitArea
+        fields = ['fruit', 'variety', 'rootstock', 'planted_year', 'area']
+
+
+class ImportInvestmentSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Investment
+        fields = ['invest_type', 'investment_amount']
+
+
+class ImportReservoirSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Reservoir
+        fields = ['reservoir_type', 'reservoir_volume']
+
+
+class ImportTrellisSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Trellis
+        fields = ['trellis_installed_area', 'trellis_type', 'trellis_count']
+
+
+class PlantationImportSerializer(serializers.ModelSerializer):
+    """
+    Одна строка импорта: поля плантации и вложенные объекты. Изображения - пути в хранилище.
+    """
+    serializer_related_field = CachedPrimaryKeyRelatedField
+
+    coordinates = ImportCoordinatesSerializer(many=True, required=False)
+    fruit_areas = ImportFruitAreaSerializer(many=True, required=False)
+    images = serializers.ListField(child=serializers.CharField(max_length=100), required=False)
+    investment = ImportInvestmentSerializer(required=False)
+    reservoir = ImportReservoirSerializer(required=False)
+    trellis = ImportTrellisSerializer(required=False)
+
+    class Meta:
+        model = Plantation
+        fields = [
+            'garden_established_year', 'district', 'farmer', 'total_area', 'irrigation_area', 'not_usable_area',
+            'fertility_score', 'land_type', 'is_fertile', 'fenced', 'irrigation_systems_count', 'pump_station_count',
+            'reservoir_count', 'coordinates', 'fruit_areas', 'images', 'investment', 'reservoir', 'trellis',
+        ]
+
+    def validate_images(self, paths):
+        # bulk_create сохраняет путь как есть: файл должен уже лежать в хранилище, внутри MEDIA_ROOT
+        errors = []
+        for path in paths:
+            try:
+                if not default_storage.exists(path):
+                    errors.append(f'Файл не найден: {path}.')
+            except SuspiciousFileOperation:
+                errors.append(f'Путь вне хранилища: {path}.')
+        if errors:
+            raise serializers.ValidationError(errors)
+        return paths
+
+    def validate(self, attrs):
+        # Те же ограничения, что в Plantation.clean()/save(): bulk_create их не вызывает
+        total_area = attrs['total_area']
+        irrigation_area = attrs.get('irrigation_area', 0)
+        not_usable_area = attrs.get('not_usable_area', 0)
+        if min(total_area, irrigation_area, not_usable_area) < 0:
+            raise serializers.ValidationError('Все значения площадей должны быть положительными.')
+        if irrigation_area > total_area:
+            raise serializers.ValidationError({'irrigation_area': 'Площадь ирригации не может превышать общую площадь.'})
+        fruit_area = sum(fruit_area['area'] for fruit_area in attrs.get('fruit_areas', []))
+        if irrigation_area + not_usable_area + fruit_area > total_area:
+            raise serializers.ValidationError('Сумма всех под-площадей превышает общую площадь.')
+        return attrs
+
+
+def iter_ndjson(lines):
+    """
+    (line number, row dict, error) for every non-empty line of an NDJSON byte stream.
+    """
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as error:
+            yield number, None, f'Invalid JSON: {error}'
+            continue
+        if not isinstance(row, dict):
+            yield number, None, 'Each line must be a JSON object.'
+            continue
+        yield number, row, None
+
+
+def iter_csv(lines):
+    """
+    (line number, row dict, error) for every CSV record; CSV_JSON_COLUMNS hold JSON, empty cells are omitted.
+    """
+    reader = csv.DictReader(line.decode('utf-8-sig') for line in lines)
+    for record in reader:
+        row = {column: value for column, value in record.items() if column is not None and value not in ('', None)}
+        try:
+            for column in CSV_JSON_COLUMNS:
+                if column in row:
+                    row[column] = json.loads(row[column])
+        except ValueError as error:
+            yield reader.line_num, None, f'Invalid JSON in column {column}: {error}'
+            continue
+        yield reader.line_num, row, None
+
+
+def import_plantations(rows, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Validates rows from iter_ndjson/iter_csv one by one and writes valid ones in chunks of chunk_size,
+    one transaction per chunk. Returns {'created', 'failed', 'errors': [{'row', 'errors'}]}.
+    """
+    report = {'created': 0, 'failed': 0, 'errors': []}
+    # Один экземпляр сериализатора на весь импорт: построение полей дороже самой проверки строки
+    validator = PlantationImportSerializer(context={'related_cache': {}})
+    chunk = []
+
+    def fail(number, errors):
+        report['failed'] += 1
+        report['errors'].append({'row': number, 'errors': errors})
+
+    def flush():
+        try:
+            write_chunk([data for _, data in chunk])
+        except DatabaseError as error:
+            for number, _ in chunk:
+                fail(number, {'non_field_errors': [str(error)]})
+        else:
+            report['created'] += len(chunk)
+        chunk.clear()
+
+    for number, data, error in rows:
+        if error:
+            fail(number, {'non_field_errors': [error]})
+            continue
+        try:
+            validated_data = validator.run_validation(data)
+        except serializers.ValidationError as error:
+            fail(number, error.detail)
+            continue
+        chunk.append((number, validated_data))
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+    return report
+
+
+@transaction.atomic
+def write_chunk(rows):
+    """
+    Inserts validated plantations with all children using one bulk_create per model.
+    Denormalized sums, DistrictSummary, geometry, the search index and cached responses are maintained here,
+    since bulk_create bypasses save() and signals.
+    """
+    plantations = []
+    for data in rows:
+        plantation = Plantation(**{field: value for field, value in data.items() if field not in CSV_JSON_COLUMNS})
+        plantation.fruit_area_total = sum(fruit_area['area'] for fruit_area in data.get('fruit_areas', []))
+        plantation.used_area = plantation.calculate_used_area()
+        plantations.append(plantation)
+    Plantation.objects.bulk_create(plantations)
+
+    coordinates, fruit_areas, images, investments, reservoirs, trellises = [], [], [], [], [], []
+    for plantation, data in zip(plantations, rows):
+        coordinates += [PlantationCoordinates(plantation=plantation, **item) for item in data.get('coordinates', [])]
+        fruit_areas += [PlantationFruitArea(plantation=plantation, **item) for item in data.get('fruit_areas', [])]
+        images += [PlantationImage(plantation=plantation, image=image) for image in data.get('images', [])]
+        if data.get('investment'):
+            investments.append(Investment(plantation=plantation, **data['investment']))
+        if data.get('reservoir'):
+            reservoirs.append(Reservoir(plantation=plantation, **data['reservoir']))
+        if data.get('trellis'):
+            trellises.append(Trellis(plantation=plantation, **data['trellis']))
+    for model, objects in (
+        (PlantationCoordinates, coordinates), (PlantationFruitArea, fruit_areas), (PlantationImage, images),
+        (Investment, investments), (Reservoir, reservoirs), (Trellis, trellises),
+    ):
+        if objects:
+            model.objects.bulk_create(objects)
+
+    deltas = defaultdict(Counter)
+    for plantation in plantations:
+        state = {field: getattr(plantation, field) for field in SUMMARY_FIELDS}
+        deltas[plantation.district_id].update(DistrictSummary.contribution(state))
+    for district_id, delta in deltas.items():
+        DistrictSummary.apply_delta(district_id, delta)
+
+    index_plantations([plantation.id for plantation in plantations])
+    for plantation in plantations:
+        schedule_geometry_refresh(plantation.id)
+    for image in images:
+        schedule_variants(image.id)
+    transaction.on_commit(invalidate_tiles)
+    invalidate_districts_on_commit(deltas)
+    return plantations
@@ -0,0 +1,69 @@
+import hashlib
+import json
+import threading
+import time
+
+from django.core.cache import cache
+
+from .models import District, Region
+from .plantation_models import FruitVariety, Fruits, Rootstock
+
+CATALOG_VERSION_KEY = 'reference-catalog:version'
+
+# Собранный каталог хранится в памяти процесса, пока версия в кэше не изменится
+_catalog = {'version': None, 'body': None, 'etag': None}
+_catalog_lock = threading.Lock()
+
+
+def catalog_version():
+    # Начальное значение уникально: ключ, вытесненный из кэша и созданный заново, не совпадёт со старым
+    return cache.get_or_set(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def invalidate_catalog():
+    """
+    Bumps the catalog version: every process sharing the cache (settings.CACHES) rebuilds the catalog
+    on its next request.
+    """
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def get_catalog():
+    """
+    (body, etag) of the current catalog: rendered JSON bytes and a strong ETag derived from them.
+    """
+    version = catalog_version()
+    with _catalog_lock:
+        if _catalog['version'] != version:
+            body = json.dumps(build_catalog(), ensure_ascii=False, separators=(',', ':')).encode()
+            _catalog.update(version=version, body=body, etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+        return _catalog['body'], _catalog['etag']
+
+
+def build_catalog():
+    """
+    Regions -> districts and fruits -> varieties / rootstocks, five flat queries.
+    """
+    districts = {}
+    for district in District.objects.order_by('id').values('id', 'name', 'region_id'):
+        districts.setdefault(district.pop('region_id'), []).append(district)
+    varieties = {}
+    for variety in FruitVariety.objects.order_by('id').values('id', 'name', 'fruit_id'):
+        varieties.setdefault(variety.pop('fruit_id'), []).append(variety)
+    rootstocks = {}
+    for rootstock in Rootstock.objects.order_by('id').values('id', 'name', 'fruit_id'):
+        rootstocks.setdefault(rootstock.pop('fruit_id'), []).append(rootstock)
+
+    return {
+        'regions': [
+            {**region, 'districts': districts.get(region['id'], [])}
+            for region in Region.objects.order_by('id').values('id', 'name')
+        ],
+        'fruits': [
+            {**fruit, 'varieties': varieties.get(fruit['id'], []), 'rootstocks': rootstocks.get(fruit['id'], [])}
+            for fruit in Fruits.objects.order_by('id').values('id', 'name')
+        ],
+    }
@@ -0,0 +1,28 @@
+import threading
+
+from django.db import transaction
+
+_registered = threading.local()
+
+
+def on_commit_once(callback):
+    """
+    transaction.on_commit(callback), unless callback is already waiting for the current transaction to commit.
+
+    Signal handlers that fire per row (coordinates of a polygon) then register one callback per transaction,
+    not one per row. Django replaces connection.run_on_commit whenever callbacks are run or discarded
+    (commit, rollback, savepoint rollback), so a callback lost with a rolled back savepoint is registered again.
+    """
+    connection = transaction.get_connection()
+    registered = getattr(_registered, 'callbacks', None)
+    if registered is None:
+        registered = _registered.callbacks = {}
+    if registered.get(callback) is connection.run_on_commit:
+        return
+    registered[callback] = connection.run_on_commit
+
+    def run():
+        registered.pop(callback, None)
+        callback()
+
+    transaction.on_commit(run)
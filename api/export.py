@@ -0,0 +1,209 @@
+import csv
+import json
+import zipfile
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import Prefetch
+
+from .plantation_models import PlantationFruitArea
+
+EXPORT_CHUNK_SIZE = getattr(settings, 'PLANTATION_EXPORT_CHUNK_SIZE', 2000)
+
+# Колонки выгрузки: имя -> функция от плантации
+EXPORT_COLUMNS = {
+    'id': lambda plantation: plantation.id,
+    'region': lambda plantation: plantation.district.region.name,
+    'district': lambda plantation: plantation.district.name,
+    'farmer': lambda plantation: plantation.farmer.name if plantation.farmer else None,
+    'farmer_inn': lambda plantation: plantation.farmer.inn if plantation.farmer else None,
+    'garden_established_year': lambda plantation: plantation.garden_established_year,
+    'land_type': lambda plantation: plantation.land_type,
+    'total_area': lambda plantation: plantation.total_area,
+    'irrigation_area': lambda plantation: plantation.irrigation_area,
+    'not_usable_area': lambda plantation: plantation.not_usable_area,
+    'fruit_area_total': lambda plantation: plantation.fruit_area_total,
+    'empty_area': lambda plantation: plantation.empty_area,
+    'fertility_score': lambda plantation: plantation.fertility_score,
+    'is_fertile': lambda plantation: plantation.is_fertile,
+    'fenced': lambda plantation: plantation.fenced,
+    'is_checked': lambda plantation: plantation.is_checked,
+    'is_deleting': lambda plantation: plantation.is_deleting,
+    'fruit_areas': lambda plantation: [
+        {
+            'fruit': fruit_area.fruit.name,
+            'variety': fruit_area.variety.name if fruit_area.variety else None,
+            'planted_year': fruit_area.planted_year,
+            'area': fruit_area.area,
+        }
+        for fruit_area in plantation.fruit_areas.all()
+    ],
+    'subsidies': lambda plantation: [
+        {
+            'year': subsidy.year,
+            'contract_number': subsidy.contract_number,
+            'direction': subsidy.direction,
+            'amount': subsidy.amount,
+            'efficiency': subsidy.efficiency,
+        }
+        for subsidy in plantation.subsidies.all()
+    ],
+}
+
+
+def iter_export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Rows (lists in EXPORT_COLUMNS order) of the queryset, read with a chunked iterator:
+    related rows are prefetched per chunk, so memory is bounded by chunk_size, not by the export size.
+    The first chunk is read right away, so a failing query raises here rather than inside the stream.
+    """
+    queryset = (
+        queryset.order_by('id')
+        .select_related('district__region', 'farmer')
+        .prefetch_related(
+            Prefetch('fruit_areas', queryset=PlantationFruitArea.objects.select_related('fruit', 'variety')),
+            'subsidies',
+        )
+    )
+    plantations = queryset.iterator(chunk_size=chunk_size)
+    first = next(plantations, None)
+    return _export_rows(first, plantations)
+
+
+def _export_rows(first, plantations):
+    if first is None:
+        return
+    columns = list(EXPORT_COLUMNS.values())
+    yield [column(first) for column in columns]
+    for plantation in plantations:
+        yield [column(plantation) for column in columns]
+
+
+class _Echo:
+    """
+    Файлоподобный объект для csv.writer: write() возвращает строку, не сохраняя её.
+    """
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    # BOM: Excel иначе открывает кириллицу в неправильной кодировке
+    writer = csv.writer(_Echo())
+    yield '\ufeff' + writer.writerow(list(EXPORT_COLUMNS))
+    for row in rows:
+        yield writer.writerow([
+            json.dumps(value, ensure_ascii=False) if isinstance(value, list) else value for value in row
+        ])
+
+
+def stream_ndjson(rows):
+    names = list(EXPORT_COLUMNS)
+    for row in rows:
+        yield json.dumps(dict(zip(names, row)), ensure_ascii=False) + '\n'
+
+
+class _ZipSink:
+    """
+    Несмещаемый поток для zipfile: накапливает записанные байты до следующего take().
+    Без tell()/seek() zipfile пишет размеры в data descriptor после каждого файла.
+    """
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="Plantations" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+
+def xlsx_cell(value):
+    if value is None:
+        return '<c/>'
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c><v>{value}</v></c>'
+    if isinstance(value, list):
+        value = json.dumps(value, ensure_ascii=False)
+    return f'<c t="inlineStr"><is><t>{escape(str(value))}</t></is></c>'
+
+
+def stream_xlsx(rows, rows_per_part=500):
+    """
+    Minimal XLSX (one sheet, inline strings) written row by row into a streamed ZIP.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', XLSX_CONTENT_TYPES)
+        archive.writestr('_rels/.rels', XLSX_ROOT_RELS)
+        archive.writestr('xl/workbook.xml', XLSX_WORKBOOK)
+        archive.writestr('xl/_rels/workbook.xml.rels', XLSX_WORKBOOK_RELS)
+        yield sink.take()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            header = ''.join(xlsx_cell(name) for name in EXPORT_COLUMNS)
+            sheet.write(f'<row>{header}</row>'.encode())
+            for number, row in enumerate(rows, 1):
+                sheet.write(f'<row>{"".join(xlsx_cell(value) for value in row)}</row>'.encode())
+                if number % rows_per_part == 0:
+                    yield sink.take()
+            sheet.write(b'</sheetData></worksheet>')
+    yield sink.take()
+
+
+# format -> (генератор, Content-Type, расширение файла)
+EXPORT_FORMATS = {
+    'csv': (stream_csv, 'text/csv; charset=utf-8', 'csv'),
+    'ndjson': (stream_ndjson, 'application/x-ndjson', 'ndjson'),
+    'xlsx': (stream_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+}
@@ -1,17 +1,20 @@
 import django_filters
-from .plantation_models import Plantation
+from .plantation_models import DistrictSummary, Plantation
+from .search import filter_by_search
 
 class PlantationFilter(django_filters.FilterSet):
-    name = django_filters.CharFilter(lookup_expr='icontains')
-    inn = django_filters.NumberFilter()
+    # Полнотекстовый поиск по реквизитам фермера, району и региону (api.search)
+    q = django_filters.CharFilter(method='filter_search')
+    name = django_filters.CharFilter(field_name='farmer__name', lookup_expr='icontains')
+    inn = django_filters.CharFilter(field_name='farmer__inn')
     region_id = django_filters.NumberFilter(field_name='district__region__id')
     region_name = django_filters.CharFilter(field_name='district__region__name', lookup_expr='icontains')
     district_id = django_filters.NumberFilter(field_name='district__id')
-    plantation_type = django_filters.NumberFilter()
-    fruit_id = django_filters.NumberFilter(field_name='fruit_area__fruit__id')
-    fruit_name = django_filters.CharFilter(field_name='fruit_area__fruit__name', lookup_expr='icontains')
-    min_area = django_filters.NumberFilter(field_name='fruit_area__area', lookup_expr='gte')
-    max_area = django_filters.NumberFilter(field_name='fruit_area__area', lookup_expr='lte')
+    # distinct: у плантации несколько фруктовых площадей
+    fruit_id = django_filters.NumberFilter(field_name='fruit_areas__fruit__id', distinct=True)
+    fruit_name = django_filters.CharFilter(field_name='fruit_areas__fruit__name', lookup_expr='icontains', distinct=True)
+    min_area = django_filters.NumberFilter(field_name='fruit_areas__area', lookup_expr='gte', distinct=True)
+    max_area = django_filters.NumberFilter(field_name='fruit_areas__area', lookup_expr='lte', distinct=True)
 
     # Новые фильтры для is_deleting и is_checked
     is_deleting = django_filters.BooleanFilter(field_name='is_deleting')
@@ -20,10 +23,13 @@ class PlantationFilter(django_filters.FilterSet):
     class Meta:
         model = Plantation
         fields = [
-            'name', 'inn', 'region_name', 'district_id', 'plantation_type', 'fruit_id', 'fruit_name', 
+            'q', 'name', 'inn', 'region_name', 'district_id', 'fruit_id', 'fruit_name', 
             'min_area', 'max_area', 'is_deleting', 'is_checked'
         ]
 
+    def filter_search(self, queryset, name, value):
+        return filter_by_search(queryset, value)
+
 
 
 class StatisticsFilter(django_filters.FilterSet):
@@ -33,3 +39,10 @@ class StatisticsFilter(django_filters.FilterSet):
     class Meta:
         model = Plantation
         fields = ['region', 'district']
+
+
+class DistrictSummaryFilter(StatisticsFilter):
+    # Те же параметры, но над DistrictSummary (у неё тоже есть district)
+    class Meta:
+        model = DistrictSummary
+        fields = ['region', 'district']
@@ -0,0 +1,539 @@
+import json
+import math
+import threading
+from itertools import groupby
+from operator import itemgetter
+
+import numpy as np
+from django.db import connection, transaction
+from django.db.models.expressions import RawSQL
+
+from .commit_hooks import on_commit_once
+from .plantation_models import COMPUTED_GEOMETRY_FIELDS, Plantation, PlantationBoundary, PlantationCoordinates
+
+# Сколько строк забирать из курсора за раз и сколько объектов склеивать в один кусок ответа
+STREAM_CHUNK_SIZE = 2000
+FEATURES_PER_CHUNK = 200
+
+# Допуски упрощения контуров по уровням (градусы): ~1 м, ~10 м, ~100 м, ~1 км
+BOUNDARY_TOLERANCES = (0.00001, 0.0001, 0.001, 0.01)
+
+# Пространственный индекс (SQLite R*Tree), создаётся миграцией 0013
+RTREE_TABLE = 'api_plantation_rtree'
+BBOX_FIELDS = ('min_latitude', 'max_latitude', 'min_longitude', 'max_longitude')
+GEOMETRY_FIELDS = COMPUTED_GEOMETRY_FIELDS
+EARTH_RADIUS = 6378137.0
+
+
+def iter_plantation_rings(queryset, fields=('farmer__name', 'is_fertile'), level=None, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Yields (row, ring) for every plantation of the queryset, ordered by id.
+
+    row is a values_list tuple (id, *fields), ring is a list of (latitude, longitude):
+    the raw coordinates, or the stored PlantationBoundary of the given level.
+    Plantations and rings are read through two server-side cursors and merged
+    by plantation id, so memory does not depend on the number of plantations.
+    """
+    plantations = queryset.order_by('id').values_list('id', *fields).iterator(chunk_size=chunk_size)
+    if level is None:
+        rings = _coordinate_rings(queryset, chunk_size)
+    else:
+        rings = _boundary_rings(queryset, level, chunk_size)
+    current = next(rings, None)
+
+    for row in plantations:
+        plantation_id = row[0]
+        while current is not None and current[0] < plantation_id:
+            current = next(rings, None)
+
+        ring = []
+        if current is not None and current[0] == plantation_id:
+            ring = current[1]
+            current = next(rings, None)
+        yield row, ring
+
+
+def _coordinate_rings(queryset, chunk_size):
+    coordinates = (
+        PlantationCoordinates.objects
+        .filter(plantation__in=queryset.values('id'))
+        .order_by('plantation_id', 'id')
+        .values_list('plantation_id', 'latitude', 'longitude')
+        .iterator(chunk_size=chunk_size)
+    )
+    for plantation_id, points in groupby(coordinates, key=itemgetter(0)):
+        yield plantation_id, [(latitude, longitude) for _, latitude, longitude in points]
+
+
+def _boundary_rings(queryset, level, chunk_size):
+    boundaries = (
+        PlantationBoundary.objects
+        .filter(plantation__in=queryset.values('id'), level=level)
+        .order_by('plantation_id')
+        .values_list('plantation_id', 'ring')
+        .iterator(chunk_size=chunk_size)
+    )
+    for plantation_id, ring in boundaries:
+        yield plantation_id, [tuple(point) for point in ring]
+
+
+def boundary_level(tolerance):
+    """
+    Coarsest stored boundary level whose tolerance does not exceed the requested one,
+    or None when raw coordinates are needed.
+    """
+    level = None
+    for index, level_tolerance in enumerate(BOUNDARY_TOLERANCES):
+        if level_tolerance <= tolerance:
+            level = index
+    return level
+
+
+def zoom_tolerance(zoom):
+    """
+    Size of one 256px tile pixel in degrees at the given zoom.
+    """
+    return 360 / (256 * 2 ** zoom)
+
+
+def ring_to_geojson(ring):
+    """
+    GeoJSON Polygon geometry ([lng, lat], closed ring) or None if there are less than 3 vertices.
+    """
+    if len(ring) < 3:
+        return None
+    positions = [[longitude, latitude] for latitude, longitude in ring]
+    if positions[0] != positions[-1]:
+        positions.append(positions[0])
+    return {'type': 'Polygon', 'coordinates': [positions]}
+
+
+def encode_polyline(ring, precision=5):
+    """
+    Encodes (latitude, longitude) points with the Google encoded polyline algorithm.
+    """
+    factor = 10 ** precision
+    result = []
+    previous_latitude = previous_longitude = 0
+
+    for latitude, longitude in ring:
+        latitude, longitude = round(latitude * factor), round(longitude * factor)
+        for delta in (latitude - previous_latitude, longitude - previous_longitude):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                result.append(chr((0x20 | (value & 0x1f)) + 63))
+                value >>= 5
+            result.append(chr(value + 63))
+        previous_latitude, previous_longitude = latitude, longitude
+
+    return ''.join(result)
+
+
+def _stream_json_array(prefix, items, suffix):
+    """
+    Streams prefix + comma separated items + suffix, FEATURES_PER_CHUNK items per chunk.
+    """
+    yield prefix
+    buffer = []
+    first = True
+    for item in items:
+        buffer.append(json.dumps(item, ensure_ascii=False, separators=(',', ':')))
+        if len(buffer) >= FEATURES_PER_CHUNK:
+            yield ('' if first else ',') + ','.join(buffer)
+            buffer = []
+            first = False
+    if buffer:
+        yield ('' if first else ',') + ','.join(buffer)
+    yield suffix
+
+
+def stream_geojson(queryset, level=None, markers=False):
+    """
+    Streams a GeoJSON FeatureCollection: one Polygon feature per plantation.
+    level selects a stored simplified boundary instead of the raw coordinates,
+    markers replaces polygons with Points at the stored centroids.
+    """
+    if markers:
+        return _stream_json_array('{"type":"FeatureCollection","features":[', _marker_features(queryset), ']}')
+
+    features = (
+        {
+            'type': 'Feature',
+            'id': plantation_id,
+            'properties': {'name': name, 'is_fertile': is_fertile},
+            'geometry': ring_to_geojson(ring),
+        }
+        for (plantation_id, name, is_fertile), ring in iter_plantation_rings(queryset, level=level)
+    )
+    return _stream_json_array('{"type":"FeatureCollection","features":[', features, ']}')
+
+
+def _iter_markers(queryset):
+    return (
+        queryset.order_by('id')
+        .values_list('id', 'farmer__name', 'is_fertile', 'centroid_latitude', 'centroid_longitude')
+        .iterator(chunk_size=STREAM_CHUNK_SIZE)
+    )
+
+
+def _marker_features(queryset):
+    for plantation_id, name, is_fertile, latitude, longitude in _iter_markers(queryset):
+        yield {
+            'type': 'Feature',
+            'id': plantation_id,
+            'properties': {'name': name, 'is_fertile': is_fertile},
+            'geometry': None if latitude is None else {'type': 'Point', 'coordinates': [longitude, latitude]},
+        }
+
+
+def stream_polylines(queryset, level=None, markers=False):
+    """
+    Streams a JSON array of plantations with the boundary as an encoded polyline;
+    with markers, the stored centroid (latitude, longitude) instead of the boundary.
+    """
+    if markers:
+        items = (
+            {'id': plantation_id, 'name': name, 'is_fertile': is_fertile, 'latitude': latitude, 'longitude': longitude}
+            for plantation_id, name, is_fertile, latitude, longitude in _iter_markers(queryset)
+        )
+        return _stream_json_array('[', items, ']')
+
+    items = (
+        {'id': plantation_id, 'name': name, 'is_fertile': is_fertile, 'polyline': encode_polyline(ring)}
+        for (plantation_id, name, is_fertile), ring in iter_plantation_rings(queryset, level=level)
+    )
+    return _stream_json_array('[', items, ']')
+
+
+def tile_bounds(z, x, y):
+    """
+    (south, west, north, east) of a Web Mercator (XYZ) tile in degrees.
+    """
+    n = 2 ** z
+    west = x / n * 360 - 180
+    east = (x + 1) / n * 360 - 180
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return south, west, north, east
+
+
+def tile_position(z, x, y, latitude, longitude):
+    """
+    Position of a point inside tile (z, x, y) as fractions 0..1 from the top-left corner.
+    """
+    n = 2 ** z
+    latitude = max(min(latitude, 85.0511), -85.0511)
+    column = (longitude + 180) / 360 * n - x
+    row = (1 - math.asinh(math.tan(math.radians(latitude))) / math.pi) / 2 * n - y
+    return column, row
+
+
+def clip_ring(ring, bounds):
+    """
+    Clips a polygon ring of (latitude, longitude) to bounds (Sutherland-Hodgman).
+    """
+    south, west, north, east = bounds
+    edges = (
+        (lambda p: p[1] >= west, lambda a, b: _intersect(a, b, 1, west)),
+        (lambda p: p[1] <= east, lambda a, b: _intersect(a, b, 1, east)),
+        (lambda p: p[0] >= south, lambda a, b: _intersect(a, b, 0, south)),
+        (lambda p: p[0] <= north, lambda a, b: _intersect(a, b, 0, north)),
+    )
+    output = list(ring)
+    for inside, intersect in edges:
+        points, output = output, []
+        if not points:
+            break
+        previous = points[-1]
+        for point in points:
+            if inside(point):
+                if not inside(previous):
+                    output.append(intersect(previous, point))
+                output.append(point)
+            elif inside(previous):
+                output.append(intersect(previous, point))
+            previous = point
+    return output
+
+
+def _intersect(a, b, axis, value):
+    t = (value - a[axis]) / (b[axis] - a[axis])
+    point = [a[0] + t * (b[0] - a[0]), a[1] + t * (b[1] - a[1])]
+    point[axis] = value
+    return tuple(point)
+
+
+def simplify_points(points, tolerance):
+    """
+    Douglas-Peucker simplification of an (n, 2) NumPy array of points, tolerance in degrees.
+    Returns the original points if the simplified ring would have less than 3 vertices.
+    """
+    count = len(points)
+    if tolerance <= 0 or count <= 3:
+        return points
+
+    keep = np.zeros(count, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, count - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        segment = points[start + 1:end]
+        origin = points[start]
+        direction = points[end] - origin
+        length = math.hypot(direction[0], direction[1])
+        offsets = segment - origin
+        if length:
+            distances = np.abs(direction[0] * offsets[:, 1] - direction[1] * offsets[:, 0]) / length
+        else:
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        index = int(np.argmax(distances))
+        if distances[index] > tolerance:
+            index += start + 1
+            keep[index] = True
+            stack.append((start, index))
+            stack.append((index, end))
+
+    simplified = points[keep]
+    return simplified if len(simplified) >= 3 else points
+
+
+def simplify_ring(ring, tolerance):
+    """
+    Douglas-Peucker simplification of a list of (latitude, longitude) points.
+    """
+    if len(ring) <= 3:
+        return list(ring)
+    return [tuple(point) for point in simplify_points(np.asarray(ring, dtype=float), tolerance).tolist()]
+
+
+def load_coordinates(plantation_ids):
+    """
+    Coordinates of the given plantations loaded with one query as a flat batch:
+    (ids, starts, points) - plantation id and start row of every ring, (n, 2) array of latitude, longitude.
+    """
+    rows = list(
+        PlantationCoordinates.objects
+        .filter(plantation_id__in=plantation_ids)
+        .order_by('plantation_id', 'id')
+        .values_list('plantation_id', 'latitude', 'longitude')
+    )
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty((0, 2))
+    data = np.array(rows, dtype=float)
+    row_ids = data[:, 0].astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, row_ids[1:] != row_ids[:-1]])
+    return row_ids[starts], starts, data[:, 1:]
+
+
+def load_coordinate_arrays(plantation_ids):
+    """
+    Coordinates of the given plantations as {plantation_id: (n, 2) array of latitude, longitude}.
+    """
+    ids, starts, points = load_coordinates(plantation_ids)
+    return dict(zip(ids.tolist(), np.split(points, starts[1:]))) if len(ids) else {}
+
+
+def polygon_metrics(starts, points):
+    """
+    Geodesic metrics of a batch of rings (see load_coordinates), vectorised over all vertices at once.
+
+    Returns arrays per ring: area (ha, spherical excess on the WGS84 equatorial radius),
+    perimeter (m, haversine) and centroid latitude, longitude.
+    """
+    count = len(points)
+    ends = np.r_[starts[1:], count]
+    sizes = ends - starts
+    # Индекс следующей вершины с замыканием каждого контура на его первую вершину
+    following = np.arange(1, count + 1)
+    following[ends - 1] = starts
+
+    latitude, longitude = np.radians(points[:, 0]), np.radians(points[:, 1])
+    next_latitude, next_longitude = latitude[following], longitude[following]
+    delta_longitude = (next_longitude - longitude + np.pi) % (2 * np.pi) - np.pi
+
+    excess = delta_longitude * (2 + np.sin(latitude) + np.sin(next_latitude))
+    area = np.abs(np.add.reduceat(excess, starts)) * EARTH_RADIUS ** 2 / 2 / 10000
+    area[sizes < 3] = 0
+
+    haversine = (
+        np.sin((next_latitude - latitude) / 2) ** 2
+        + np.cos(latitude) * np.cos(next_latitude) * np.sin(delta_longitude / 2) ** 2
+    )
+    perimeter = np.add.reduceat(2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.clip(haversine, 0, 1))), starts)
+    perimeter[sizes < 2] = 0
+
+    # Центроид считается в локальной равнопромежуточной проекции вокруг первой вершины контура
+    origin = np.repeat(starts, sizes)
+    scale = np.cos(latitude[origin])
+    x = (longitude - longitude[origin] + np.pi) % (2 * np.pi) - np.pi
+    x *= scale
+    y = latitude - latitude[origin]
+    next_x, next_y = x[following], y[following]
+    cross = x * next_y - next_x * y
+    doubled_area = np.add.reduceat(cross, starts)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        centroid_x = np.add.reduceat((x + next_x) * cross, starts) / (3 * doubled_area)
+        centroid_y = np.add.reduceat((y + next_y) * cross, starts) / (3 * doubled_area)
+    degenerate = ~np.isfinite(centroid_x) | ~np.isfinite(centroid_y) | (np.abs(doubled_area) < 1e-18)
+    centroid_x[degenerate] = (np.add.reduceat(x, starts) / sizes)[degenerate]
+    centroid_y[degenerate] = (np.add.reduceat(y, starts) / sizes)[degenerate]
+
+    centroid_latitude = np.degrees(latitude[starts] + centroid_y)
+    centroid_longitude = np.degrees(longitude[starts] + centroid_x / scale[starts])
+    return area, perimeter, centroid_latitude, centroid_longitude
+
+
+def refresh_plantation_geometry(plantation_ids):
+    """
+    Recomputes the stored geometry of the given plantations: simplified boundaries,
+    bounding box (columns and spatial index), geodesic area, perimeter and centroid.
+    """
+    plantations = {
+        plantation.id: plantation
+        for plantation in Plantation.objects.filter(id__in=list(plantation_ids)).only('id')
+    }
+    if not plantations:
+        return
+    plantation_ids = list(plantations)
+    ids, starts, points = load_coordinates(plantation_ids)
+
+    for plantation in plantations.values():
+        for field in GEOMETRY_FIELDS:
+            setattr(plantation, field, None)
+
+    boundaries = []
+    if len(ids):
+        minimum = np.minimum.reduceat(points, starts)
+        maximum = np.maximum.reduceat(points, starts)
+        metrics = np.column_stack(polygon_metrics(starts, points))
+        for plantation_id, low, high, (area, perimeter, centroid_latitude, centroid_longitude), ring in zip(
+            ids.tolist(), minimum.tolist(), maximum.tolist(), metrics.tolist(), np.split(points, starts[1:]),
+        ):
+            plantation = plantations[plantation_id]
+            plantation.min_latitude, plantation.min_longitude = low
+            plantation.max_latitude, plantation.max_longitude = high
+            plantation.drawn_area, plantation.perimeter = area, perimeter
+            plantation.centroid_latitude, plantation.centroid_longitude = centroid_latitude, centroid_longitude
+
+            # Каждый следующий уровень упрощается из предыдущего, а не из исходного контура
+            for level, tolerance in enumerate(BOUNDARY_TOLERANCES):
+                ring = simplify_points(ring, tolerance)
+                boundaries.append(PlantationBoundary(
+                    plantation_id=plantation_id, level=level, tolerance=tolerance,
+                    vertex_count=len(ring), ring=ring.tolist(),
+                ))
+
+    with transaction.atomic():
+        PlantationBoundary.objects.filter(plantation_id__in=plantation_ids).delete()
+        PlantationBoundary.objects.bulk_create(boundaries)
+        store_geometry_fields(plantations.values())
+        update_spatial_index(plantations.values())
+
+
+def store_geometry_fields(plantations):
+    """
+    Writes GEOMETRY_FIELDS with one executemany UPDATE (bulk_update builds a slow CASE per field).
+    """
+    quote = connection.ops.quote_name
+    assignments = ', '.join(f'{quote(Plantation._meta.get_field(field).column)} = %s' for field in GEOMETRY_FIELDS)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'UPDATE {quote(Plantation._meta.db_table)} SET {assignments} WHERE id = %s',
+            [(*(getattr(plantation, field) for field in GEOMETRY_FIELDS), plantation.id) for plantation in plantations],
+        )
+
+
+def _use_rtree():
+    return connection.vendor == 'sqlite'
+
+
+def update_spatial_index(plantations):
+    """
+    Writes bounding boxes of the plantations to the SQLite R*Tree (no-op on other databases).
+    """
+    if not _use_rtree():
+        return
+    remove_from_spatial_index([plantation.id for plantation in plantations])
+    rows = [
+        (plantation.id, *(getattr(plantation, field) for field in BBOX_FIELDS))
+        for plantation in plantations
+        if plantation.min_latitude is not None
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {RTREE_TABLE} (id, {", ".join(BBOX_FIELDS)}) VALUES (%s, %s, %s, %s, %s)', rows,
+        )
+
+
+def remove_from_spatial_index(plantation_ids):
+    if not _use_rtree() or not plantation_ids:
+        return
+    placeholders = ', '.join(['%s'] * len(plantation_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {RTREE_TABLE} WHERE id IN ({placeholders})', list(plantation_ids))
+
+
+def filter_by_bbox(queryset, south, west, north, east):
+    """
+    Plantations whose bounding box intersects the given box: R*Tree on SQLite, bbox columns elsewhere.
+    """
+    if _use_rtree():
+        return queryset.filter(id__in=RawSQL(
+            f'SELECT id FROM {RTREE_TABLE} '
+            'WHERE max_latitude >= %s AND min_latitude <= %s AND max_longitude >= %s AND min_longitude <= %s',
+            (south, north, west, east),
+        ))
+    return queryset.filter(
+        max_latitude__gte=south, min_latitude__lte=north, max_longitude__gte=west, min_longitude__lte=east,
+    )
+
+
+def point_in_ring(points, latitude, longitude):
+    """
+    Ray casting point-in-polygon test, vectorised over the edges of an (n, 2) ring.
+    """
+    if len(points) < 3:
+        return False
+    y1, x1 = points[:, 0], points[:, 1]
+    y2, x2 = np.roll(y1, -1), np.roll(x1, -1)
+    crosses = (y1 > latitude) != (y2 > latitude)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        intersection = x1 + (latitude - y1) * (x2 - x1) / (y2 - y1)
+    return bool(np.count_nonzero(crosses & (longitude < intersection)) % 2)
+
+
+def plantations_at(queryset, latitude, longitude):
+    """
+    Ids of plantations whose polygon contains the point: spatial index candidates, then an exact test.
+    """
+    candidates = list(filter_by_bbox(queryset, latitude, longitude, latitude, longitude).values_list('id', flat=True))
+    arrays = load_coordinate_arrays(candidates)
+    return [
+        plantation_id for plantation_id in candidates
+        if plantation_id in arrays and point_in_ring(arrays[plantation_id], latitude, longitude)
+    ]
+
+
+_pending_geometry = threading.local()
+
+
+def schedule_geometry_refresh(plantation_id):
+    """
+    Refreshes plantation geometry once after the current transaction commits,
+    however many coordinates were written in it.
+    """
+    pending = getattr(_pending_geometry, 'ids', None)
+    if pending is None:
+        pending = _pending_geometry.ids = set()
+    pending.add(plantation_id)
+    on_commit_once(_flush_geometry_refresh)
+
+
+def _flush_geometry_refresh():
+    # Пересчёт идемпотентен: id из откаченных транзакций просто пересчитаются по текущим данным
+    plantation_ids = getattr(_pending_geometry, 'ids', None)
+    _pending_geometry.ids = None
+    if plantation_ids:
+        refresh_plantation_geometry(plantation_ids)
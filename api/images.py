@@ -0,0 +1,112 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+from .plantation_models import PlantationImage
+from .response_cache import schedule_plantation_invalidation
+from .storage import image_storage, touch
+
+logger = logging.getLogger(__name__)
+
+# Производные версии фото: имя -> (максимальная сторона в пикселях, формат, расширение)
+IMAGE_VARIANTS = {
+    'thumb': (320, 'JPEG', 'jpg'),
+    'medium': (1280, 'JPEG', 'jpg'),
+    'webp': (1280, 'WEBP', 'webp'),
+}
+VARIANT_QUALITY = 82
+VARIANTS_DIR = 'plantation_images/variants'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'IMAGE_VARIANT_WORKERS', 2), thread_name_prefix='image-variants',
+            )
+        return _executor
+
+
+def schedule_variants(image_id):
+    """
+    Builds variants of the image in the worker pool once the current transaction commits.
+    With IMAGE_VARIANTS_ASYNC = False (tests, serverless deployments) they are built right in the on_commit callback.
+    """
+    if getattr(settings, 'IMAGE_VARIANTS_ASYNC', True):
+        transaction.on_commit(lambda: get_executor().submit(_build_in_worker, image_id))
+    else:
+        transaction.on_commit(lambda: build_variants(image_id))
+
+
+def _build_in_worker(image_id):
+    try:
+        build_variants(image_id)
+    except Exception:
+        logger.exception('Failed to build variants for PlantationImage %s', image_id)
+    finally:
+        # У потока пула своё соединение, держать его открытым между задачами незачем
+        connection.close()
+
+
+def render_variant(source, max_side, image_format):
+    image = source.copy()
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    buffer = BytesIO()
+    image.save(buffer, image_format, quality=VARIANT_QUALITY, optimize=image_format == 'JPEG')
+    return buffer.getvalue()
+
+
+def build_variants(image_id, force=False):
+    """
+    Renders IMAGE_VARIANTS of PlantationImage image_id and stores their paths in PlantationImage.variants.
+    Variant names follow the source name, so images sharing a content-addressed file share variants
+    and existing ones are reused unless force is set.
+    """
+    image = PlantationImage.objects.filter(pk=image_id).values_list('image', 'plantation_id').first()
+    if not image or not image[0]:
+        return None
+    image_path, plantation_id = image
+
+    if not image_storage.exists(image_path):
+        logger.warning('PlantationImage %s: file %s is missing', image_id, image_path)
+        return None
+    stem = os.path.splitext(os.path.basename(image_path))[0]
+    paths = {
+        name: f'{VARIANTS_DIR}/{stem}_{name}.{extension}'
+        for name, (max_side, image_format, extension) in IMAGE_VARIANTS.items()
+    }
+    if not force and all(default_storage.exists(path) for path in paths.values()):
+        # Как и общий исходный файл: свежее время изменения защищает версии от sweep_media_blobs до записи ссылок
+        for path in paths.values():
+            touch(default_storage, path)
+        PlantationImage.objects.filter(pk=image_id).update(variants=paths)
+        # URL версий выводятся в списке плантаций
+        schedule_plantation_invalidation(plantation_id)
+        return paths
+
+    with image_storage.open(image_path) as file:
+        source = ImageOps.exif_transpose(Image.open(file))
+        # JPEG не умеет прозрачность и палитру
+        source = source.convert('RGB')
+
+    variants = {}
+    for name, (max_side, image_format, extension) in IMAGE_VARIANTS.items():
+        if default_storage.exists(paths[name]):
+            default_storage.delete(paths[name])
+        variants[name] = default_storage.save(paths[name], ContentFile(render_variant(source, max_side, image_format)))
+
+    PlantationImage.objects.filter(pk=image_id).update(variants=variants)
+    schedule_plantation_invalidation(plantation_id)
+    return variants
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+
+from api.plantation_models import Plantation, PlantationFruitArea
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает Plantation.fruit_area_total и used_area для существующих плантаций пачками"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Количество плантаций в одной транзакции")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        updated = 0
+
+        while True:
+            batch = list(
+                Plantation.objects.filter(id__gt=last_id).order_by('id')
+                .only('id', 'irrigation_area', 'not_usable_area', 'fruit_area_total', 'used_area')[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            totals = dict(
+                PlantationFruitArea.objects.filter(plantation_id__in=[plantation.id for plantation in batch])
+                .values('plantation_id').annotate(total=Sum('area')).values_list('plantation_id', 'total')
+            )
+            for plantation in batch:
+                plantation.fruit_area_total = totals.get(plantation.id) or 0
+                plantation.used_area = plantation.calculate_used_area()
+
+            with transaction.atomic():
+                Plantation.objects.bulk_update(batch, ['fruit_area_total', 'used_area'])
+            updated += len(batch)
+            self.stdout.write(f"Обработано плантаций: {updated}")
+
+        self.stdout.write(self.style.SUCCESS(f"Готово, обновлено плантаций: {updated}"))
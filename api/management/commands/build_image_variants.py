@@ -0,0 +1,56 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from api.images import build_variants
+from api.plantation_models import PlantationImage
+
+
+class Command(BaseCommand):
+    help = "Строит производные версии (thumb, medium, webp) для существующих изображений плантаций параллельно"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help="Количество потоков (1 - без пула)")
+        parser.add_argument('--force', action='store_true', help="Перестроить и уже готовые версии")
+
+    def handle(self, *args, **options):
+        force = options['force']
+        images = PlantationImage.objects.order_by('id')
+        if not force:
+            images = images.filter(variants={})
+        image_ids = list(images.values_list('id', flat=True))
+        self.stdout.write(f"Изображений к обработке: {len(image_ids)}")
+
+        built = failed = 0
+        with ThreadPoolExecutor(max_workers=max(options['workers'], 1)) as executor:
+            if options['workers'] > 1:
+                results = executor.map(self.build_in_worker, image_ids, [force] * len(image_ids))
+            else:
+                results = map(self.build, image_ids, [force] * len(image_ids))
+            for image_id, error in results:
+                if error is None:
+                    built += 1
+                else:
+                    failed += 1
+                    self.stderr.write(f"Изображение {image_id}: {error}")
+                if (built + failed) % 100 == 0:
+                    self.stdout.write(f"Обработано: {built + failed}")
+
+        self.stdout.write(self.style.SUCCESS(f"Готово, построено: {built}, с ошибками: {failed}"))
+
+    @staticmethod
+    def build(image_id, force=False):
+        try:
+            build_variants(image_id, force=force)
+        except Exception as error:
+            return image_id, error
+        return image_id, None
+
+    @classmethod
+    def build_in_worker(cls, image_id, force=False):
+        # У потока пула своё соединение, закрываем его после задачи
+        try:
+            return cls.build(image_id, force)
+        finally:
+            connection.close()
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.snapshots import SNAPSHOT_BATCH_SIZE, SNAPSHOT_FORMATS, SNAPSHOT_ROOT, SnapshotUnavailable, write_snapshot
+
+
+class Command(BaseCommand):
+    help = "Пишет колоночный снимок (Parquet или Arrow IPC) плантаций, фруктовых площадей, субсидий, инвестиций и координат"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=SNAPSHOT_ROOT, help="Каталог для файлов снимка")
+        parser.add_argument('--format', choices=list(SNAPSHOT_FORMATS), default='parquet')
+        parser.add_argument('--batch-size', type=int, default=SNAPSHOT_BATCH_SIZE, help="Строк в одной группе строк")
+
+    def handle(self, *args, **options):
+        try:
+            manifest = write_snapshot(options['output'], options['format'], max(options['batch_size'], 1))
+        except SnapshotUnavailable as error:
+            raise CommandError(str(error))
+        for file_name, rows in manifest.items():
+            self.stdout.write(f"{file_name}: {rows}")
+        self.stdout.write(self.style.SUCCESS(f"Снимок записан в {options['output']}"))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from api.geo import refresh_plantation_geometry
+from api.plantation_models import Plantation
+from api.tiles import invalidate_tiles
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает сохранённую геометрию плантаций (контуры, bbox, площадь, периметр, центроид) пачками"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help="Количество плантаций в одной пачке")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        processed = 0
+
+        while True:
+            batch = list(Plantation.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1]
+
+            refresh_plantation_geometry(batch)
+            processed += len(batch)
+            self.stdout.write(f"Обработано плантаций: {processed}")
+
+        invalidate_tiles()
+        self.stdout.write(self.style.SUCCESS(f"Готово, обработано плантаций: {processed}"))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.search import SEARCH_TABLE, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Пересобирает поисковый индекс фермеров и плантаций (после загрузки данных в обход сигналов)"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(f"Готово: индекс {SEARCH_TABLE} пересобран"))
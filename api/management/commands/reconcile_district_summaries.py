@@ -0,0 +1,50 @@
+import math
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.plantation_models import DistrictSummary, Plantation
+from api.statistics import METRICS, compute_statistics
+
+
+class Command(BaseCommand):
+    help = "Сверяет DistrictSummary с плантациями и исправляет расхождения (также заполняет таблицу с нуля)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Только показать расхождения, не исправляя")
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        with transaction.atomic():
+            expected = {}
+            for row in compute_statistics(Plantation.objects.all(), ['district']):
+                row.pop('district_name')
+                expected[row.pop('district_id')] = row
+            stored = {
+                summary.district_id: summary
+                for summary in DistrictSummary.objects.select_for_update()
+            }
+            empty = dict.fromkeys(METRICS, 0)
+
+            drifted = 0
+            for district_id in expected.keys() | stored.keys():
+                values = expected.get(district_id, empty)
+                summary = stored.get(district_id)
+                if summary is not None and all(
+                    math.isclose(getattr(summary, metric), values[metric], abs_tol=1e-6) for metric in METRICS
+                ):
+                    continue
+
+                drifted += 1
+                current = {metric: getattr(summary, metric) for metric in METRICS} if summary else None
+                self.stdout.write(f"Район {district_id}: {current} -> {values}")
+                if not dry_run:
+                    DistrictSummary.objects.update_or_create(district_id=district_id, defaults=values)
+
+            if dry_run:
+                transaction.set_rollback(True)
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING(f"Расхождений: {drifted} (dry run, ничего не изменено)"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Готово, исправлено районов: {drifted}"))
@@ -0,0 +1,44 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.plantation_models import PlantationImage
+from api.storage import image_storage
+
+
+class Command(BaseCommand):
+    help = "Удаляет из storage/plantation_images файлы, на которые не ссылается ни одно PlantationImage"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Только показать, что будет удалено")
+        parser.add_argument(
+            '--min-age', type=int, default=24 * 60 * 60,
+            help="Не трогать файлы моложе стольких секунд (загрузки, ещё не сохранённые в БД)",
+        )
+
+    def handle(self, *args, **options):
+        referenced = set()
+        for image_path, variants in PlantationImage.objects.values_list('image', 'variants').iterator():
+            referenced.add(image_path)
+            referenced.update((variants or {}).values())
+
+        root = image_storage.path('plantation_images')
+        cutoff = time.time() - options['min_age']
+        removed = freed = 0
+        for directory, _, files in os.walk(root):
+            for filename in files:
+                full_path = os.path.join(directory, filename)
+                name = os.path.relpath(full_path, image_storage.location).replace(os.sep, '/')
+                if name in referenced or os.path.getmtime(full_path) > cutoff:
+                    continue
+                size = os.path.getsize(full_path)
+                self.stdout.write(f"{'Будет удалён' if options['dry_run'] else 'Удалён'}: {name} ({size} байт)")
+                if not options['dry_run']:
+                    image_storage.delete(name)
+                removed += 1
+                freed += size
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Файлов без ссылок: {removed}, {freed / 1024 / 1024:.1f} МБ"
+        ))
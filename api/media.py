@@ -0,0 +1,152 @@
+import mimetypes
+import os
+import re
+from email.utils import formatdate
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import parse_etags, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+# settings.MEDIA_SENDFILE: 'x-accel' (nginx) или 'x-sendfile' (Apache, lighttpd) - тело файла отдаёт фронт-сервер;
+# settings.MEDIA_ACCEL_PREFIX: internal-location nginx, под которым доступен MEDIA_ROOT
+# Файлы с хешем содержимого в имени не меняются - кэшируются на год
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+MEDIA_MAX_AGE = getattr(settings, 'MEDIA_MAX_AGE', 60 * 60)
+STREAM_CHUNK_SIZE = 64 * 1024
+
+CONTENT_HASH_RE = re.compile(r'[0-9a-f]{64}')
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def media_etag(name, stat):
+    stem = os.path.splitext(os.path.basename(name))[0]
+    if CONTENT_HASH_RE.search(stem):
+        # Имя уже определяется содержимым (хеш, для вариантов - хеш исходника и имя варианта)
+        return f'"{stem}"'
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single 'bytes=' range, None to serve the whole file,
+    or False if the range cannot be satisfied. Multiple ranges are answered with the whole file.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first == '':
+        # bytes=-N: последние N байт
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def iter_file_range(path, start, length):
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(STREAM_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Отдаёт файл из MEDIA_ROOT: ETag/Last-Modified с ответом 304, диапазоны байт (206),
+    долгий кэш для файлов с хешем содержимого в имени. При MEDIA_SENDFILE тело отдаёт
+    фронт-сервер, иначе FileResponse (wsgi.file_wrapper / sendfile).
+    """
+    accel_prefix = getattr(settings, 'MEDIA_ACCEL_PREFIX', '/protected-storage/')
+    return serve_file(request, settings.MEDIA_ROOT, path, accel_prefix)
+
+
+def serve_file(request, root, path, accel_prefix=None):
+    """
+    Same as serve_media for a file under any root; X-Accel-Redirect is used only with accel_prefix.
+    """
+    try:
+        full_path = safe_join(root, path)
+    except SuspiciousFileOperation:
+        raise Http404('Файл не найден')
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        raise Http404('Файл не найден')
+    if not os.path.isfile(full_path):
+        raise Http404('Файл не найден')
+
+    etag = media_etag(path, stat)
+    last_modified = formatdate(stat.st_mtime, usegmt=True)
+    immutable = CONTENT_HASH_RE.search(etag) is not None
+    headers = {
+        'ETag': etag,
+        'Last-Modified': last_modified,
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': (
+            f'public, max-age={IMMUTABLE_MAX_AGE}, immutable' if immutable else f'public, max-age={MEDIA_MAX_AGE}'
+        ),
+    }
+
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        not_modified = etag in parse_etags(if_none_match) or if_none_match.strip() == '*'
+    else:
+        modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        not_modified = modified_since is not None and int(stat.st_mtime) <= modified_since
+    if not_modified:
+        response = HttpResponseNotModified()
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+
+    sendfile = getattr(settings, 'MEDIA_SENDFILE', None)
+    if sendfile == 'x-sendfile' or (sendfile == 'x-accel' and accel_prefix):
+        # Диапазоны и отправку тела выполняет фронт-сервер
+        response = HttpResponse(content_type=content_type)
+        if sendfile == 'x-accel':
+            response['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + path.lstrip('/')
+        else:
+            response['X-Sendfile'] = full_path
+    else:
+        byte_range = None
+        range_header = request.headers.get('Range')
+        if_range = request.headers.get('If-Range')
+        if range_header and (if_range is None or if_range.strip() in (etag, last_modified)):
+            byte_range = parse_range(range_header, stat.st_size)
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+        if byte_range:
+            start, end = byte_range
+            length = end - start + 1
+            response = StreamingHttpResponse(
+                iter_file_range(full_path, start, length), status=206, content_type=content_type,
+            )
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+            response['Content-Length'] = str(length)
+        else:
+            response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+
+    if encoding:
+        response['Content-Encoding'] = encoding
+    for header, value in headers.items():
+        response[header] = value
+    return response
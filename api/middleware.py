@@ -1,8 +1,87 @@
+import atexit
+import threading
+import time
+import zlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Case, DateTimeField, Value, When
+from django.http import FileResponse
 from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# last_login одного пользователя записывается не чаще раза в окно (секунды)
+LAST_LOGIN_WINDOW = getattr(settings, 'LAST_LOGIN_WINDOW', 5 * 60)
+# Буфер сбрасывается в БД через интервал после первой отметки или при накоплении LAST_LOGIN_FLUSH_SIZE пользователей
+LAST_LOGIN_FLUSH_INTERVAL = getattr(settings, 'LAST_LOGIN_FLUSH_INTERVAL', 30)
+LAST_LOGIN_FLUSH_SIZE = getattr(settings, 'LAST_LOGIN_FLUSH_SIZE', 500)
+
+
+class LastLoginBuffer:
+    """
+    Collects last-seen timestamps in memory and writes them with one bulk UPDATE.
+    The shared cache throttles each user to one timestamp per LAST_LOGIN_WINDOW across processes.
+    A timer writes pending timestamps LAST_LOGIN_FLUSH_INTERVAL after the first one, even if no other
+    request arrives; whatever is left is written at interpreter exit.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.timer = None
+
+    def touch(self, user_id, timestamp):
+        if not cache.add(f'last-login:{user_id}', 1, timeout=LAST_LOGIN_WINDOW):
+            return
+        with self.lock:
+            self.pending[user_id] = timestamp
+            due = len(self.pending) >= LAST_LOGIN_FLUSH_SIZE
+            if not due and self.timer is None:
+                self.timer = threading.Timer(LAST_LOGIN_FLUSH_INTERVAL, self.flush_from_timer)
+                self.timer.daemon = True
+                self.timer.start()
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            if self.timer is not None and self.timer is not threading.current_thread():
+                self.timer.cancel()
+            self.timer = None
+        if not pending:
+            return 0
+        return get_user_model().objects.filter(pk__in=pending).update(
+            last_login=Case(
+                *(When(pk=user_id, then=Value(timestamp)) for user_id, timestamp in pending.items()),
+                output_field=DateTimeField(),
+            )
+        )
+
+    def flush_from_timer(self):
+        try:
+            self.flush()
+        finally:
+            # Соединение потока таймера больше не понадобится
+            connections.close_all()
+
+
+# При аварийной остановке процесса теряется не больше одного интервала отметок - для last_login это допустимо
+last_login_buffer = LastLoginBuffer()
+atexit.register(last_login_buffer.flush)
+
 
 class UpdateLastLoginMiddleware:
     """
     Middleware для обновления поля last_login для каждого аутентифицированного пользователя.
+    Запись в БД накапливается в last_login_buffer, а не выполняется на каждый запрос.
     """
 
     def __init__(self, get_response):
@@ -11,12 +90,127 @@ class UpdateLastLoginMiddleware:
     def __call__(self, request):
         # Получаем аутентифицированного пользователя
         user = request.user
-        
+
         if user.is_authenticated:
-            # Обновляем поле last_login на текущее время
             user.last_login = timezone.now()
-            user.save(update_fields=['last_login'])  # Обновляем только last_login, чтобы избежать излишних сохранений
-        
+            last_login_buffer.touch(user.pk, user.last_login)
+
         # Пропускаем запрос дальше
         response = self.get_response(request)
         return response
+
+
+# Ответы меньше порога не сжимаются: выигрыш меньше накладных расходов
+COMPRESSION_MIN_SIZE = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+COMPRESSION_GZIP_LEVEL = getattr(settings, 'COMPRESSION_GZIP_LEVEL', 6)
+# 4-5 - почти как gzip по скорости, но заметно плотнее; 11 годится только для статики
+COMPRESSION_BROTLI_QUALITY = getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 5)
+# Уже сжатые форматы
+INCOMPRESSIBLE_TYPES = ('image/', 'video/', 'audio/', 'application/zip', 'application/vnd.openxmlformats')
+
+
+def accepted_encodings(header):
+    """
+    {coding: q} from an Accept-Encoding header; codings with q=0 are left out.
+    """
+    encodings = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                continue
+        if q > 0:
+            encodings[coding] = q
+    return encodings
+
+
+class _Compressor:
+    """
+    Единый интерфейс над zlib (gzip) и brotli: compress() для части потока, finish() в конце.
+    """
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == 'br':
+            self.compressor = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+            self.compress = self.compressor.process
+        else:
+            # wbits=31: формат gzip (заголовок и CRC)
+            self.compressor = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+            self.compress = self.compressor.compress
+
+    def finish(self):
+        return self.compressor.finish() if self.encoding == 'br' else self.compressor.flush()
+
+
+class CompressionMiddleware:
+    """
+    Сжимает ответы brotli или gzip по Accept-Encoding клиента (brotli - если установлен пакет brotli).
+    Обычные ответы сжимаются целиком от COMPRESSION_MIN_SIZE байт, потоковые - по мере генерации,
+    без буферизации всего тела. Файлы (FileResponse, диапазоны) и уже сжатые форматы не трогаются.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not self.compressible(response):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = self.choose_encoding(request.headers.get('Accept-Encoding', ''))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = self.compress_stream(response.streaming_content, _Compressor(encoding))
+            del response['Content-Length']
+        else:
+            compressor = _Compressor(encoding)
+            compressed = compressor.compress(response.content) + compressor.finish()
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        # Тело другое - сильный ETag становится слабым (как в GZipMiddleware)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
+
+    @staticmethod
+    def compressible(response):
+        if response.has_header('Content-Encoding') or response.status_code in (204, 206, 304):
+            return False
+        if isinstance(response, FileResponse) or getattr(response, 'is_async', False):
+            return False
+        if response.get('Content-Type', '').startswith(INCOMPRESSIBLE_TYPES):
+            return False
+        return response.streaming or len(response.content) >= COMPRESSION_MIN_SIZE
+
+    @staticmethod
+    def choose_encoding(header):
+        encodings = accepted_encodings(header)
+        candidates = [coding for coding in ('br', 'gzip') if coding in encodings and (coding != 'br' or brotli)]
+        if not candidates:
+            return None
+        # При равном q предпочитается brotli
+        return max(candidates, key=lambda coding: encodings[coding])
+
+    @staticmethod
+    def compress_stream(content, compressor):
+        for chunk in content:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.finish()
@@ -0,0 +1,28 @@
+# Generated by Django 4.2 on 2026-10-18 07:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_alter_plantation_land_type_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plantation',
+            name='fruit_area_total',
+            field=models.FloatField(default=0, editable=False, verbose_name='Сумма площадей фруктов'),
+        ),
+        migrations.AddField(
+            model_name='plantation',
+            name='used_area',
+            field=models.FloatField(default=0, editable=False, verbose_name='Занятая площадь'),
+        ),
+        migrations.AlterField(
+            model_name='reservoir',
+            name='reservoir_type',
+            field=models.CharField(blank=True, choices=[('beton', 'Beton'), ('qoplama', 'Qoplama')], max_length=50, null=True, verbose_name='Ҳовуз тури'),
+        ),
+    ]
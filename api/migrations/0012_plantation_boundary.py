@@ -0,0 +1,28 @@
+# Generated by Django 4.2 on 2026-10-18 07:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_plantation_fruit_area_total'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlantationBoundary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.PositiveSmallIntegerField(verbose_name='Уровень детализации')),
+                ('tolerance', models.FloatField(verbose_name='Допуск упрощения (градусы)')),
+                ('vertex_count', models.IntegerField(default=0, verbose_name='Количество вершин')),
+                ('ring', models.JSONField(default=list, verbose_name='Контур [[lat, lng], ...]')),
+                ('plantation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='boundaries', to='api.plantation')),
+            ],
+            options={
+                'unique_together': {('plantation', 'level')},
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.2 on 2026-10-18 07:49
+
+from django.db import migrations, models
+
+
+# R*Tree есть только в SQLite, на других СУБД используется индекс plantation_bbox_idx
+def create_rtree(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE IF NOT EXISTS api_plantation_rtree '
+            'USING rtree(id, min_latitude, max_latitude, min_longitude, max_longitude)'
+        )
+
+
+def drop_rtree(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS api_plantation_rtree')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_plantation_boundary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plantation',
+            name='max_latitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='plantation',
+            name='max_longitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='plantation',
+            name='min_latitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='plantation',
+            name='min_longitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='plantation',
+            index=models.Index(fields=['min_latitude', 'max_latitude', 'min_longitude', 'max_longitude'], name='plantation_bbox_idx'),
+        ),
+        migrations.RunPython(create_rtree, drop_rtree),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2 on 2026-10-18 07:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_plantation_bbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plantation',
+            name='centroid_latitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='plantation',
+            name='centroid_longitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='plantation',
+            name='drawn_area',
+            field=models.FloatField(blank=True, editable=False, null=True, verbose_name='Площадь по контуру (га)'),
+        ),
+        migrations.AddField(
+            model_name='plantation',
+            name='perimeter',
+            field=models.FloatField(blank=True, editable=False, null=True, verbose_name='Периметр контура (м)'),
+        ),
+    ]
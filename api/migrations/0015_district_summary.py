@@ -0,0 +1,29 @@
+# Generated by Django 4.2 on 2026-10-18 07:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_plantation_drawn_area'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DistrictSummary',
+            fields=[
+                ('district', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='api.district')),
+                ('plantation_count', models.IntegerField(default=0, verbose_name='Количество плантаций')),
+                ('total_area', models.FloatField(default=0, verbose_name='Общая площадь')),
+                ('irrigation_area', models.FloatField(default=0, verbose_name='Площадь ирригации')),
+                ('not_usable_area', models.FloatField(default=0, verbose_name='Непригодная площадь')),
+                ('fruit_area', models.FloatField(default=0, verbose_name='Площадь фруктов')),
+                ('fertile_count', models.IntegerField(default=0, verbose_name='Ҳосилли')),
+                ('checked_count', models.IntegerField(default=0, verbose_name='Проверено')),
+                ('unchecked_count', models.IntegerField(default=0, verbose_name='Не проверено')),
+                ('deleting_count', models.IntegerField(default=0, verbose_name='Ожидают удаления')),
+            ],
+        ),
+    ]
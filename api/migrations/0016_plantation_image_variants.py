@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 08:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_district_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plantationimage',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Версии изображения'),
+        ),
+    ]
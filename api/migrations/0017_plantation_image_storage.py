@@ -0,0 +1,19 @@
+# Generated by Django 4.2 on 2026-10-18 08:15
+
+import api.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_plantation_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='plantationimage',
+            name='image',
+            field=models.ImageField(storage=api.storage.ContentAddressedStorage(), upload_to='plantation_images/', verbose_name='Расм'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2 on 2026-10-18 09:40
+
+from django.db import migrations
+
+
+# FTS5 есть только в SQLite, на других СУБД поиск идёт через LIKE (api.search)
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    # remove_diacritics снимает диакритику только с латиницы; кириллица сводится к латинице
+    # до индексации (0019_normalize_search_index);
+    # prefix: отдельные индексы для префиксов из 2 и 3 символов, чтобы короткий запрос не перебирал весь словарь
+    schema_editor.execute(
+        'CREATE VIRTUAL TABLE IF NOT EXISTS api_search_index USING fts5('
+        'kind UNINDEXED, object_id UNINDEXED, name, founder_name, director_name, inn, address, district, region, '
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    columns = 'rowid, kind, object_id, name, founder_name, director_name, inn, address, district, region'
+    schema_editor.execute(
+        f'INSERT INTO api_search_index ({columns}) '
+        "SELECT f.id * 2, 'farmer', f.id, f.name, f.founder_name, f.director_name, f.inn, f.address, '', '' "
+        'FROM api_farmer f'
+    )
+    schema_editor.execute(
+        f'INSERT INTO api_search_index ({columns}) '
+        "SELECT p.id * 2 + 1, 'plantation', p.id, COALESCE(f.name, ''), COALESCE(f.founder_name, ''), "
+        "COALESCE(f.director_name, ''), COALESCE(f.inn, ''), COALESCE(f.address, ''), d.name, r.name "
+        'FROM api_plantation p '
+        'LEFT JOIN api_farmer f ON f.id = p.farmer_id '
+        'JOIN api_district d ON d.id = p.district_id '
+        'JOIN api_region r ON r.id = d.region_id'
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS api_search_index')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_plantation_image_storage'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2 on 2026-10-18 11:05
+
+from importlib import import_module
+
+from django.db import migrations
+
+
+# Индекс заполняется нормализованным текстом (api.search.NORMALIZE_FUNCTION)
+def normalize_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    from api.search import register_search_function, rebuild_search_index
+
+    register_search_function(schema_editor.connection)
+    rebuild_search_index()
+
+
+def restore_search_index(apps, schema_editor):
+    initial = import_module('api.migrations.0018_search_index')
+    initial.drop_search_index(apps, schema_editor)
+    initial.create_search_index(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_search_index, restore_search_index),
+    ]
@@ -0,0 +1,115 @@
+from collections import OrderedDict
+
+from rest_framework import exceptions
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(PageNumberPagination):
+    """
+    Постраничный вывод с двумя необязательными режимами:
+    ?cursor= - keyset по id: страница - WHERE id > cursor ORDER BY id LIMIT n, цена не зависит от глубины;
+    доступен при порядке по id или -id, с другим порядком - 400;
+    ?count=false - обычные страницы без COUNT(*), наличие следующей определяется по лишней строке.
+    Курсор первой страницы - пустой ?cursor=, следующий приходит в поле next ответа.
+    """
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    # False: без ?cursor= список отдаётся целиком, как до появления пагинации
+    page_numbers = True
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.mode = None
+        if self.cursor_query_param in request.query_params:
+            self.mode = 'cursor'
+            return self.paginate_by_cursor(queryset, request)
+        if not self.page_numbers:
+            return None
+        if request.query_params.get(self.count_query_param, '').lower() in ('0', 'false'):
+            self.mode = 'uncounted'
+            return self.paginate_without_count(queryset, request)
+        return super().paginate_queryset(queryset, request, view)
+
+    def paginate_by_cursor(self, queryset, request):
+        cursor = request.query_params[self.cursor_query_param]
+        query = queryset.query
+        ordering = tuple(query.order_by) or (tuple(queryset.model._meta.ordering) if query.default_ordering else ())
+        # Ключ курсора - id, поэтому и порядок должен быть по id; другой порядок (?ordering=, -area_difference)
+        # курсор молча заменил бы на id
+        if ordering in ((), ('id',), ('pk',)):
+            descending = False
+        elif ordering in (('-id',), ('-pk',)):
+            descending = True
+        else:
+            raise exceptions.ValidationError({self.cursor_query_param: 'Cursor pagination requires ordering by id.'})
+        queryset = queryset.order_by('-id' if descending else 'id')
+        if cursor:
+            try:
+                queryset = queryset.filter(**{'id__lt' if descending else 'id__gt': int(cursor)})
+            except ValueError:
+                raise exceptions.ValidationError({self.cursor_query_param: 'Invalid cursor.'})
+        page_size = self.get_page_size(request)
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        self.page_rows = rows[:page_size]
+        return self.page_rows
+
+    def paginate_without_count(self, queryset, request):
+        try:
+            self.page_number = int(request.query_params.get(self.page_query_param, 1))
+        except ValueError:
+            raise exceptions.NotFound('Invalid page.')
+        if self.page_number < 1:
+            raise exceptions.NotFound('Invalid page.')
+        page_size = self.get_page_size(request)
+        offset = (self.page_number - 1) * page_size
+        rows = list(queryset[offset:offset + page_size + 1])
+        self.has_next = len(rows) > page_size
+        self.page_rows = rows[:page_size]
+        return self.page_rows
+
+    def get_next_link(self):
+        if self.mode is None:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.mode == 'cursor':
+            last = self.page_rows[-1]
+            # Строки страницы - экземпляры моделей или словари values() (projections)
+            last_id = last['id'] if isinstance(last, dict) else last.id
+            return replace_query_param(url, self.cursor_query_param, last_id)
+        return replace_query_param(url, self.page_query_param, self.page_number + 1)
+
+    def get_previous_link(self):
+        if self.mode is None:
+            return super().get_previous_link()
+        # Keyset идёт только вперёд
+        if self.mode == 'cursor' or self.page_number == 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.page_number - 1)
+
+    def get_paginated_response(self, data):
+        if self.mode is None:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('count', None),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+
+class CursorOnlyPagination(KeysetPagination):
+    """
+    Для CRUD-списков: без ?cursor= ответ остаётся прежним списком без пагинации.
+    """
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    page_numbers = False
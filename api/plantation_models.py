@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Subquery
+from api.storage import image_storage
 from api.utils import LAND_TYPE, INVEST_TYPE, RESERVOIR_TYPE, TRELLIS_TYPE
 from django.utils import timezone
 
@@ -39,6 +41,27 @@ class Plantation(models.Model):
 
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
 
+    # Денормализованные суммы, поддерживаются PlantationFruitArea.save()/delete()
+    fruit_area_total = models.FloatField(default=0, editable=False, verbose_name="Сумма площадей фруктов")
+    used_area = models.FloatField(default=0, editable=False, verbose_name="Занятая площадь")
+
+    # Ограничивающий прямоугольник контура, пересчитывается в api.geo.refresh_plantation_geometry
+    min_latitude = models.FloatField(null=True, blank=True, editable=False)
+    max_latitude = models.FloatField(null=True, blank=True, editable=False)
+    min_longitude = models.FloatField(null=True, blank=True, editable=False)
+    max_longitude = models.FloatField(null=True, blank=True, editable=False)
+
+    # Геодезические метрики нарисованного контура, считаются там же
+    drawn_area = models.FloatField(null=True, blank=True, editable=False, verbose_name="Площадь по контуру (га)")
+    perimeter = models.FloatField(null=True, blank=True, editable=False, verbose_name="Периметр контура (м)")
+    centroid_latitude = models.FloatField(null=True, blank=True, editable=False)
+    centroid_longitude = models.FloatField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['min_latitude', 'max_latitude', 'min_longitude', 'max_longitude'], name='plantation_bbox_idx'),
+        ]
+
     def clean(self):
         """
         Validate the model fields before saving.
@@ -54,10 +77,7 @@ class Plantation(models.Model):
         # Проверяем, если у объекта уже есть PK
         if self.pk:
             # Проверяем сумму всех под-площадей
-            total_used_area = self.irrigation_area + self.not_usable_area + sum(
-                fruit_area.area for fruit_area in self.fruit_areas.all()
-            )
-            if total_used_area > self.total_area:
+            if self.calculate_used_area() > self.total_area:
                 raise ValidationError('Сумма всех под-площадей не должна превышать общую площадь.')
 
         # Validate fertility_score
@@ -65,28 +85,84 @@ class Plantation(models.Model):
             raise ValidationError({'fertility_score': 'Балли унумдорлиги должна быть в диапазоне от 1 до 100.'})
 
 
+    def calculate_used_area(self):
+        """
+        Used area: irrigation_area + not_usable_area + stored sum of fruit areas.
+        """
+        return self.irrigation_area + self.not_usable_area + self.fruit_area_total
+
     @property
     def empty_area(self):
         """
         Calculate empty area: total_area - (irrigation_area + areas of all fruit areas + not_usable_area).
         """
-        used_area = self.irrigation_area + self.not_usable_area + sum(
-            fruit_area.area for fruit_area in self.fruit_areas.all()
-        )
-        return self.total_area - used_area
+        return self.total_area - self.calculate_used_area()
+
+    @classmethod
+    def add_fruit_area(cls, plantation_id, delta):
+        """
+        Incrementally adjust the stored fruit area sum of a plantation and of its district summary.
+        """
+        if delta:
+            cls.objects.filter(pk=plantation_id).update(
+                fruit_area_total=F('fruit_area_total') + delta,
+                used_area=F('used_area') + delta,
+            )
+            DistrictSummary.objects.filter(
+                district_id=Subquery(cls.objects.filter(pk=plantation_id).values('district_id')),
+            ).update(fruit_area=F('fruit_area') + delta)
+
+    def stored_summary_state(self):
+        """
+        SUMMARY_FIELDS and COMPUTED_GEOMETRY_FIELDS as currently stored in the database, or None for a new plantation.
+        """
+        if not self.pk:
+            return None
+        return Plantation.objects.filter(pk=self.pk).values(*SUMMARY_FIELDS, *COMPUTED_GEOMETRY_FIELDS).first()
 
     def save(self, *args, **kwargs):
         """
         Validate and save the plantation data.
         """
-        super().save(*args, **kwargs)  # Сначала сохраняем объект, чтобы получить PK
-
-        # Теперь объект имеет PK, и мы можем выполнить валидацию
-        total_used_area = self.irrigation_area + self.not_usable_area + sum(
-            fruit_area.area for fruit_area in self.fruit_areas.all()
-        )
-        if total_used_area > self.total_area:
-            raise ValidationError('Сумма всех под-площадей превышает общую площадь.')
+        with transaction.atomic():
+            stored = self.stored_summary_state()
+            # Прежний район нужен сигналам: при переносе сбрасывается кэш ответов обоих районов
+            self._stored_district_id = stored['district_id'] if stored else None
+            if stored is not None:
+                # Сумма в памяти могла устареть: её меняют PlantationFruitArea напрямую в БД
+                self.fruit_area_total = stored['fruit_area_total']
+                # Геометрию пишет только refresh_plantation_geometry (on_commit, queryset.update)
+                for field in COMPUTED_GEOMETRY_FIELDS:
+                    setattr(self, field, stored[field])
+
+            self.used_area = self.calculate_used_area()
+            if self.used_area > self.total_area:
+                raise ValidationError('Сумма всех под-площадей превышает общую площадь.')
+
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'used_area'}
+            elif stored is not None and not kwargs.get('force_insert'):
+                # Полное сохранение не перезаписывает геометрию, даже если её пересчитали между чтением и записью
+                kwargs['update_fields'] = [
+                    field.name for field in self._meta.concrete_fields
+                    if not field.primary_key and field.attname not in COMPUTED_GEOMETRY_FIELDS
+                ]
+            super().save(*args, **kwargs)
+
+            saved = {field: getattr(self, field) for field in SUMMARY_FIELDS}
+            if stored is not None and update_fields is not None:
+                # Поля, не вошедшие в update_fields, в БД остались прежними
+                written = {self._meta.get_field(field).attname for field in update_fields}
+                saved = {field: saved[field] if field in written else stored[field] for field in SUMMARY_FIELDS}
+            DistrictSummary.replace_contribution(stored, saved)
+
+    def delete(self, *args, **kwargs):
+        # Вклад в DistrictSummary снимает сигнал post_delete (он же срабатывает при каскадном удалении),
+        # поэтому сумма фруктовых площадей должна быть актуальной
+        if self.pk:
+            self.refresh_from_db(fields=['fruit_area_total'])
+        return super().delete(*args, **kwargs)
 
 
     def clear_prev_data(self):
@@ -101,6 +177,89 @@ class Plantation(models.Model):
 
 
 
+# Поля, которые пишет только api.geo.refresh_plantation_geometry: сохранение плантации их не трогает
+COMPUTED_GEOMETRY_FIELDS = (
+    'min_latitude', 'max_latitude', 'min_longitude', 'max_longitude',
+    'drawn_area', 'perimeter', 'centroid_latitude', 'centroid_longitude',
+)
+
+# Поля плантации, из которых складывается её вклад в DistrictSummary
+SUMMARY_FIELDS = (
+    'district_id', 'total_area', 'irrigation_area', 'not_usable_area', 'fruit_area_total',
+    'is_fertile', 'is_checked', 'is_deleting',
+)
+
+
+class DistrictSummary(models.Model):
+    """
+    Итоги по району, поддерживаются Plantation.save()/delete() и PlantationFruitArea в той же транзакции.
+    Расхождения исправляет команда reconcile_district_summaries.
+    """
+    district = models.OneToOneField('api.District', primary_key=True, on_delete=models.CASCADE, related_name='summary')
+    plantation_count = models.IntegerField(default=0, verbose_name="Количество плантаций")
+    total_area = models.FloatField(default=0, verbose_name="Общая площадь")
+    irrigation_area = models.FloatField(default=0, verbose_name="Площадь ирригации")
+    not_usable_area = models.FloatField(default=0, verbose_name="Непригодная площадь")
+    fruit_area = models.FloatField(default=0, verbose_name="Площадь фруктов")
+    fertile_count = models.IntegerField(default=0, verbose_name="Ҳосилли")
+    checked_count = models.IntegerField(default=0, verbose_name="Проверено")
+    unchecked_count = models.IntegerField(default=0, verbose_name="Не проверено")
+    deleting_count = models.IntegerField(default=0, verbose_name="Ожидают удаления")
+
+    METRICS = (
+        'plantation_count', 'total_area', 'irrigation_area', 'not_usable_area', 'fruit_area',
+        'fertile_count', 'checked_count', 'unchecked_count', 'deleting_count',
+    )
+
+    @staticmethod
+    def contribution(state):
+        """
+        Metrics one plantation (SUMMARY_FIELDS dict) adds to its district.
+        """
+        return {
+            'plantation_count': 1,
+            'total_area': state['total_area'],
+            'irrigation_area': state['irrigation_area'],
+            'not_usable_area': state['not_usable_area'],
+            'fruit_area': state['fruit_area_total'],
+            'fertile_count': int(bool(state['is_fertile'])),
+            'checked_count': int(bool(state['is_checked'])),
+            'unchecked_count': int(not state['is_checked']),
+            'deleting_count': int(bool(state['is_deleting'])),
+        }
+
+    @classmethod
+    def apply_delta(cls, district_id, deltas, create=True):
+        deltas = {metric: delta for metric, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        changes = {metric: F(metric) + delta for metric, delta in deltas.items()}
+        if not cls.objects.filter(district_id=district_id).update(**changes) and create:
+            cls.objects.get_or_create(district_id=district_id)
+            cls.objects.filter(district_id=district_id).update(**changes)
+
+    @classmethod
+    def replace_contribution(cls, old_state, new_state):
+        """
+        Replaces a plantation's contribution old_state -> new_state (either may be None).
+        """
+        old = cls.contribution(old_state) if old_state else None
+        new = cls.contribution(new_state) if new_state else None
+        if old and new and old_state['district_id'] == new_state['district_id']:
+            cls.apply_delta(new_state['district_id'], {metric: new[metric] - old[metric] for metric in new})
+            return
+        if old:
+            # Строки может уже не быть (район удаляется каскадом) - вычитать не из чего
+            cls.apply_delta(old_state['district_id'], {metric: -value for metric, value in old.items()}, create=False)
+        if new:
+            cls.apply_delta(new_state['district_id'], new)
+
+    def __str__(self):
+        return f"Summary for District {self.district_id}"
+
+
+
+
 class Farmer(models.Model):
     name = models.CharField(max_length=100, verbose_name="Фермер хўжалиги номи")
     founder_name = models.CharField(max_length=100, verbose_name="Таъсисчи ismi")
@@ -155,7 +314,9 @@ class Subsidy(models.Model):
 
 class PlantationImage(models.Model):
     plantation = models.ForeignKey(Plantation, related_name="images", on_delete=models.CASCADE)
-    image = models.ImageField(upload_to="plantation_images/", verbose_name="Расм")
+    image = models.ImageField(upload_to="plantation_images/", storage=image_storage, verbose_name="Расм")
+    # Пути производных версий (api.images.IMAGE_VARIANTS), заполняются в фоне после сохранения
+    variants = models.JSONField(default=dict, blank=True, editable=False, verbose_name="Версии изображения")
 
     def __str__(self):
         return f"Image for Plantation {self.plantation.farmer.name}"
@@ -218,6 +379,37 @@ class PlantationFruitArea(models.Model):
     planted_year = models.IntegerField(verbose_name="Экилган йили")
     area = models.FloatField(verbose_name="Экин ер майдони гектар")
 
+    def stored_state(self):
+        """
+        (plantation_id, area) as currently stored in the database, or None for a new row.
+        """
+        if self._state.adding or not self.pk:
+            return None
+        return PlantationFruitArea.objects.filter(pk=self.pk).values_list('plantation_id', 'area').first()
+
+    def save(self, *args, **kwargs):
+        """
+        Save the fruit area and update Plantation.fruit_area_total in the same transaction.
+        """
+        with transaction.atomic():
+            stored = self.stored_state()
+            super().save(*args, **kwargs)
+            if stored is None:
+                Plantation.add_fruit_area(self.plantation_id, self.area)
+            elif stored[0] == self.plantation_id:
+                Plantation.add_fruit_area(self.plantation_id, self.area - stored[1])
+            else:
+                Plantation.add_fruit_area(stored[0], -stored[1])
+                Plantation.add_fruit_area(self.plantation_id, self.area)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            stored = self.stored_state()
+            result = super().delete(*args, **kwargs)
+            if stored is not None:
+                Plantation.add_fruit_area(stored[0], -stored[1])
+        return result
+
     def __str__(self):
         return f"Fruit area in Plantation {self.plantation.id} - {self.fruit.name}"
 
@@ -232,3 +424,20 @@ class PlantationCoordinates(models.Model):
     def __str__(self):
         return f"Coordinates for Plantation {self.plantation.id}"
 
+
+
+class PlantationBoundary(models.Model):
+    """
+    Упрощённый контур плантации для одного уровня детализации (см. api.geo.BOUNDARY_TOLERANCES).
+    """
+    plantation = models.ForeignKey(Plantation, related_name='boundaries', on_delete=models.CASCADE)
+    level = models.PositiveSmallIntegerField(verbose_name="Уровень детализации")
+    tolerance = models.FloatField(verbose_name="Допуск упрощения (градусы)")
+    vertex_count = models.IntegerField(default=0, verbose_name="Количество вершин")
+    ring = models.JSONField(default=list, verbose_name="Контур [[lat, lng], ...]")
+
+    class Meta:
+        unique_together = ('plantation', 'level')
+
+    def __str__(self):
+        return f"Boundary level {self.level} for Plantation {self.plantation_id}"
@@ -1,10 +1,45 @@
 from rest_framework import serializers
+from django.db import transaction
+from django.db.models import Prefetch
+from django.core.files.storage import default_storage
 from core.settings import BASE_URL
 from .models import *
 from .plantation_models import *
 
 # Сериализаторы для Plantation
 
+class DynamicFieldsMixin:
+    """
+    Sparse fieldsets for GET requests: ?fields=id,total_area keeps only the listed fields,
+    ?expand=farmer,subsidies keeps the flat fields plus the listed nested blocks (Meta.expandable_fields).
+    Without either parameter all fields are returned. Unknown names are ignored.
+    """
+
+    @classmethod
+    def selected_fields(cls, request):
+        """
+        Field names to serialize for the request in Meta.fields order, or None for all of them.
+        """
+        if request is None or request.method not in ('GET', 'HEAD'):
+            return None
+        fields = [name for name in request.query_params.get('fields', '').split(',') if name]
+        expand = [name for name in request.query_params.get('expand', '').split(',') if name]
+        if not fields and not expand:
+            return None
+        if not fields:
+            expandable = set(getattr(cls.Meta, 'expandable_fields', ()))
+            fields = [name for name in cls.Meta.fields if name not in expandable]
+        selected = set(fields) | set(expand)
+        return [name for name in cls.Meta.fields if name in selected]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = self.selected_fields(self.context.get('request'))
+        if selected is not None:
+            for name in set(self.fields) - set(selected):
+                self.fields.pop(name)
+
+
 # Сериализатор для Subsidy
 class SubsidySerializer(serializers.ModelSerializer):
     class Meta:
@@ -58,9 +93,20 @@ class FarmerSerializer(serializers.ModelSerializer):
 
 # Сериализатор для изображений
 class PlantationImageSerializer(serializers.ModelSerializer):
+    # URL производных версий (thumb, medium, webp); пусто, пока они не построены
+    variants = serializers.SerializerMethodField()
+
     class Meta:
         model = PlantationImage
-        fields = ['id', 'image']
+        fields = ['id', 'image', 'variants']
+
+    def get_variants(self, obj):
+        request = self.context.get('request')
+        urls = {}
+        for name, path in (obj.variants or {}).items():
+            url = default_storage.url(path)
+            urls[name] = request.build_absolute_uri(url) if request is not None else url
+        return urls
 
 
 # Сериализатор для координат
@@ -81,7 +127,7 @@ class PlantationFruitAreaSerializer(serializers.ModelSerializer):
 
 
 # Сериализатор для списка плантаций
-class PlantationListSerializer(serializers.ModelSerializer):
+class PlantationListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     district_name = serializers.CharField(source='district.name', read_only=True)
     region_name = serializers.CharField(source='district.region.name', read_only=True)
 
@@ -91,13 +137,30 @@ class PlantationListSerializer(serializers.ModelSerializer):
 
 
 # Сериализатор для отображения на карте
-class MapPlantationSerializer(serializers.ModelSerializer):
-    coordinates = PlantationCoordinatesSerializer(many=True, read_only=True)
+class MapPlantationSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    coordinates = serializers.SerializerMethodField()
     name = serializers.SerializerMethodField()
 
     class Meta:
         model = Plantation
         fields = ['id', 'name', 'coordinates','is_fertile']
+        expandable_fields = ['coordinates']
+
+    @staticmethod
+    def setup_eager_loading(queryset, level=None, fields=None):
+        """
+        level - уровень упрощённого контура (PlantationBoundary) вместо исходных координат.
+        fields - выбранные поля (selected_fields): невыбранные не загружаются.
+        """
+        if fields is None or 'name' in fields:
+            queryset = queryset.select_related('farmer')
+        if fields is not None and 'coordinates' not in fields:
+            return queryset
+        if level is None:
+            return queryset.prefetch_related('coordinates')
+        return queryset.prefetch_related(
+            Prefetch('boundaries', queryset=PlantationBoundary.objects.filter(level=level), to_attr='selected_boundaries')
+        )
 
     def get_name(self, obj):
         """
@@ -105,12 +168,39 @@ class MapPlantationSerializer(serializers.ModelSerializer):
         """
         return obj.farmer.name if obj.farmer else None
 
+    def get_coordinates(self, obj):
+        """
+        Исходные координаты или, если в контексте задан boundary_level, упрощённый контур (вершины без id).
+        """
+        if self.context.get('boundary_level') is None:
+            return PlantationCoordinatesSerializer(obj.coordinates.all(), many=True).data
+        return [
+            {'latitude': latitude, 'longitude': longitude}
+            for boundary in obj.selected_boundaries
+            for latitude, longitude in boundary.ring
+        ]
+
+
+
+# Сериализатор для отчёта о расхождении площади по контуру и total_area
+class PlantationAreaMismatchSerializer(serializers.ModelSerializer):
+    district_name = serializers.CharField(source='district.name', read_only=True)
+    farmer_name = serializers.CharField(source='farmer.name', read_only=True)
+    area_difference = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Plantation
+        fields = [
+            'id', 'district_name', 'farmer_name', 'total_area', 'drawn_area', 'area_difference', 'perimeter',
+            'centroid_latitude', 'centroid_longitude',
+        ]
+
 
 
 #! LOGIC
 
 # Детализированный сериализатор плантации
-class PlantationDetailSerializer(serializers.ModelSerializer):
+class PlantationDetailSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     district = serializers.SerializerMethodField()
     farmer = serializers.SerializerMethodField()
     investment = serializers.SerializerMethodField()
@@ -130,6 +220,39 @@ class PlantationDetailSerializer(serializers.ModelSerializer):
             'reservoir_count', 'district', 'farmer', 'investment', 'reservoir', 'trellis',
             'fruit_areas', 'images', 'coordinates', 'subsidies', 'not_usable_area', 'empty_area',
         ]
+        expandable_fields = [
+            'district', 'farmer', 'investment', 'reservoir', 'trellis', 'fruit_areas', 'images', 'coordinates',
+            'subsidies',
+        ]
+
+    # Поле -> что загрузить для него: FK и OneToOne через JOIN, дочерние списки через prefetch
+    select_related_fields = {
+        'district': 'district__region',
+        'farmer': 'farmer',
+        'investment': 'investment',
+        'reservoir': 'reservoir',
+        'trellis': 'trellis',
+    }
+    prefetch_related_fields = {
+        'fruit_areas': Prefetch('fruit_areas', queryset=PlantationFruitArea.objects.select_related('fruit', 'variety')),
+        'images': 'images',
+        'coordinates': 'coordinates',
+        'subsidies': 'subsidies',
+    }
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, fields=None):
+        """
+        План загрузки для выбранных полей (selected_fields, None - все поля).
+        Количество запросов не зависит от количества плантаций на странице.
+        """
+        if fields is None:
+            fields = cls.Meta.fields
+        return queryset.select_related(
+            *(lookup for name, lookup in cls.select_related_fields.items() if name in fields)
+        ).prefetch_related(
+            *(lookup for name, lookup in cls.prefetch_related_fields.items() if name in fields)
+        )
 
     def get_district(self, obj):
         district = obj.district
@@ -201,6 +324,7 @@ class PlantationCreateSerializer(serializers.ModelSerializer):
             'reservoir_count', 'coordinates', 'fruit_areas', 'images', 'investment', 'reservoir', 'trellis'
         ]
 
+    @transaction.atomic
     def create(self, validated_data):
         coordinates_data = validated_data.pop('coordinates', [])
         fruit_areas_data = validated_data.pop('fruit_areas', [])
@@ -229,6 +353,9 @@ class PlantationCreateSerializer(serializers.ModelSerializer):
         if trellis_data:
             Trellis.objects.create(plantation=plantation, **trellis_data)
 
+        # Суммы обновлены в БД при создании PlantationFruitArea
+        plantation.refresh_from_db(fields=['fruit_area_total', 'used_area'])
+
         return plantation
 
 
@@ -0,0 +1,238 @@
+from collections import defaultdict
+
+from django.core.files.storage import default_storage
+
+from .plantation_models import PlantationBoundary, PlantationCoordinates, PlantationFruitArea, PlantationImage, Subsidy
+from .plantations import MapPlantationSerializer, PlantationDetailSerializer, PlantationListSerializer
+from .storage import image_storage
+
+
+def _float(value):
+    return None if value is None else float(value)
+
+
+def _int(value):
+    return None if value is None else int(value)
+
+
+def _str(value):
+    return None if value is None else str(value)
+
+
+def _same(value):
+    return value
+
+
+def children_of(queryset, plantation_ids, *columns):
+    """
+    {plantation_id: [row tuple, ...]} - то же, что prefetch_related, но без экземпляров моделей.
+    """
+    children = defaultdict(list)
+    for row in queryset.filter(plantation_id__in=plantation_ids).values_list('plantation_id', *columns):
+        children[row[0]].append(row[1:])
+    return children
+
+
+def coordinates_of(plantation_ids):
+    # PlantationCoordinatesSerializer
+    rows = children_of(PlantationCoordinates.objects.all(), plantation_ids, 'id', 'latitude', 'longitude')
+    return {
+        plantation_id: [
+            {'id': id, 'latitude': float(latitude), 'longitude': float(longitude)}
+            for id, latitude, longitude in coordinates
+        ]
+        for plantation_id, coordinates in rows.items()
+    }
+
+
+class Projection:
+    """
+    Read-only rendering of a serializer from values() rows: no model instances and no DRF fields per row.
+    Output is identical to serializer_class(..., many=True).data for the same request (?fields=/?expand= included).
+
+    Subclasses describe each output field in `columns` (field -> (values() lookups, function of the row))
+    and nested lists in `children` (field -> method loading them for a page of plantation ids).
+    """
+    serializer_class = None
+    columns = {}
+    children = {}
+
+    def __init__(self, context=None):
+        self.context = context or {}
+        self.request = self.context.get('request')
+        selected = self.serializer_class.selected_fields(self.request)
+        self.fields = list(self.serializer_class.Meta.fields) if selected is None else selected
+
+    def values(self, queryset):
+        lookups = {'id'}
+        for name in self.fields:
+            if name in self.columns:
+                lookups.update(self.columns[name][0])
+        # prefetch_related из setup_eager_loading к словарям неприменим
+        return queryset.prefetch_related(None).values(*sorted(lookups))
+
+    def render(self, rows):
+        rows = list(rows)
+        plantation_ids = [row['id'] for row in rows]
+        loaded = {
+            name: getattr(self, self.children[name])(plantation_ids) for name in self.fields if name in self.children
+        }
+        return [
+            {
+                name: loaded[name].get(row['id'], []) if name in loaded else self.columns[name][1](row)
+                for name in self.fields
+            }
+            for row in rows
+        ]
+
+    def absolute_url(self, url):
+        return self.request.build_absolute_uri(url) if self.request is not None else url
+
+
+def column(lookup, convert=_same):
+    return (lookup,), lambda row: convert(row[lookup])
+
+
+class PlantationListProjection(Projection):
+    serializer_class = PlantationListSerializer
+    columns = {
+        'id': column('id', _int),
+        'garden_established_year': column('garden_established_year', _int),
+        'district_name': column('district__name', _str),
+        'region_name': column('district__region__name', _str),
+        'total_area': column('total_area', _float),
+        'is_deleting': column('is_deleting'),
+        'is_checked': column('is_checked'),
+        'prev_data': column('prev_data'),
+    }
+
+
+class MapPlantationProjection(Projection):
+    serializer_class = MapPlantationSerializer
+    columns = {
+        'id': column('id', _int),
+        'name': column('farmer__name'),
+        'is_fertile': column('is_fertile'),
+    }
+    children = {'coordinates': 'load_coordinates'}
+
+    def load_coordinates(self, plantation_ids):
+        level = self.context.get('boundary_level')
+        if level is None:
+            return coordinates_of(plantation_ids)
+        rows = children_of(PlantationBoundary.objects.filter(level=level), plantation_ids, 'ring')
+        return {
+            plantation_id: [
+                {'latitude': latitude, 'longitude': longitude}
+                for (ring,) in rings
+                for latitude, longitude in ring
+            ]
+            for plantation_id, rings in rows.items()
+        }
+
+
+FARMER_COLUMNS = ('name', 'founder_name', 'director_name', 'phone_number', 'address', 'inn', 'email', 'established_year')
+
+
+def related(prefix, names, null_lookup):
+    """
+    Вложенный объект из колонок prefix__name; None, если null_lookup пуст (нет связанной строки).
+    """
+    lookups = (null_lookup,) + tuple(f'{prefix}__{name}' for name in names)
+
+    def render(row):
+        if row[null_lookup] is None:
+            return None
+        return {name: row[f'{prefix}__{name}'] for name in names}
+    return lookups, render
+
+
+class PlantationDetailProjection(Projection):
+    serializer_class = PlantationDetailSerializer
+    columns = {
+        'id': column('id', _int),
+        'garden_established_year': column('garden_established_year', _int),
+        'total_area': column('total_area', _float),
+        'irrigation_area': column('irrigation_area', _float),
+        'fertility_score': column('fertility_score', _float),
+        'land_type': column('land_type', _str),
+        'is_fertile': column('is_fertile'),
+        'fenced': column('fenced'),
+        'irrigation_systems_count': column('irrigation_systems_count', _int),
+        'pump_station_count': column('pump_station_count', _int),
+        'reservoir_count': column('reservoir_count', _int),
+        'district': (
+            ('district__name', 'district__region__name'),
+            lambda row: {'name': row['district__name'], 'region': row['district__region__name']},
+        ),
+        'farmer': related('farmer', FARMER_COLUMNS, 'farmer_id'),
+        'investment': related('investment', ('invest_type', 'investment_amount'), 'investment__id'),
+        'reservoir': related('reservoir', ('reservoir_type', 'reservoir_volume'), 'reservoir__id'),
+        'trellis': related('trellis', ('trellis_installed_area', 'trellis_type', 'trellis_count'), 'trellis__id'),
+        'not_usable_area': column('not_usable_area', _float),
+        'empty_area': (
+            ('total_area', 'irrigation_area', 'not_usable_area', 'fruit_area_total'),
+            # Plantation.empty_area
+            lambda row: float(
+                row['total_area'] - (row['irrigation_area'] + row['not_usable_area'] + row['fruit_area_total'])
+            ),
+        ),
+    }
+    children = {
+        'fruit_areas': 'load_fruit_areas',
+        'images': 'load_images',
+        'coordinates': 'load_coordinates',
+        'subsidies': 'load_subsidies',
+    }
+
+    def load_fruit_areas(self, plantation_ids):
+        rows = children_of(
+            PlantationFruitArea.objects.all(), plantation_ids,
+            'id', 'fruit_id', 'fruit__name', 'variety_id', 'variety__name', 'rootstock_id', 'planted_year', 'area',
+        )
+        result = {}
+        for plantation_id, fruit_areas in rows.items():
+            result[plantation_id] = []
+            for id, fruit_id, fruit_name, variety_id, variety_name, rootstock_id, planted_year, area in fruit_areas:
+                fruit_area = {'id': id, 'fruit': fruit_id, 'fruit_name': str(fruit_name), 'variety': variety_id}
+                # variety_name (source='variety.name') пропускается сериализатором, если сорта нет
+                if variety_id is not None:
+                    fruit_area['variety_name'] = str(variety_name)
+                fruit_area.update({'rootstock': rootstock_id, 'planted_year': int(planted_year), 'area': float(area)})
+                result[plantation_id].append(fruit_area)
+        return result
+
+    def load_images(self, plantation_ids):
+        rows = children_of(PlantationImage.objects.all(), plantation_ids, 'id', 'image', 'variants')
+        return {
+            plantation_id: [
+                {
+                    'id': id,
+                    'image': self.absolute_url(image_storage.url(image)) if image else None,
+                    'variants': {
+                        name: self.absolute_url(default_storage.url(path)) for name, path in (variants or {}).items()
+                    },
+                }
+                for id, image, variants in images
+            ]
+            for plantation_id, images in rows.items()
+        }
+
+    def load_coordinates(self, plantation_ids):
+        return coordinates_of(plantation_ids)
+
+    def load_subsidies(self, plantation_ids):
+        rows = children_of(Subsidy.objects.all(), plantation_ids, 'year', 'contract_number', 'direction', 'amount', 'efficiency')
+        return {
+            plantation_id: [
+                {
+                    'year': year,
+                    'contract_number': contract_number,
+                    'direction': direction,
+                    'amount': amount,
+                    'efficiency': 'Самарали' if efficiency else 'Самарасиз',
+                }
+                for year, contract_number, direction, amount, efficiency in subsidies
+            ]
+            for plantation_id, subsidies in rows.items()
+        }
@@ -0,0 +1,54 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer on orjson: same compact UTF-8 output, several times faster on large lists.
+    Without orjson, and for indented output (browsable API, ?indent=), the stdlib renderer is used.
+    Types orjson does not know (Decimal, lazy strings, datetimes) go through DRF's JSONEncoder.
+    """
+    options = orjson and (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=self.encoder_class().default, option=self.options)
+        # Как и JSONRenderer: U+2028/U+2029 экранируются, чтобы ответ оставался подмножеством JavaScript
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+# Рендереры нужны для согласования ?format=geojson / ?format=polyline,
+# сами данные карты отдаются потоком из MapPlantationListAPIView
+class GeoJSONRenderer(FastJSONRenderer):
+    media_type = 'application/geo+json'
+    format = 'geojson'
+
+
+class PolylineRenderer(FastJSONRenderer):
+    format = 'polyline'
+
+
+# ?format=csv|ndjson|xlsx для PlantationExportAPIView; выгрузка отдаётся потоком,
+# через рендерер проходят только ответы с ошибками
+class CSVRenderer(FastJSONRenderer):
+    format = 'csv'
+
+
+class NDJSONRenderer(FastJSONRenderer):
+    format = 'ndjson'
+
+
+class XLSXRenderer(FastJSONRenderer):
+    format = 'xlsx'
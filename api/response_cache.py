@@ -0,0 +1,194 @@
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from rest_framework.response import Response
+
+from .commit_hooks import on_commit_once
+from .plantation_models import Plantation
+
+# Отдельный алиас из CACHES (locmem, file, ...); по умолчанию - 'default'
+RESPONSE_CACHE_ALIAS = getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')
+RESPONSE_CACHE_TIMEOUT = getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 5 * 60)
+PREFIX = 'plantation-responses'
+# Ответы без фильтра по району зависят от всех плантаций
+ALL_DISTRICTS = f'{PREFIX}:generation:all'
+# Справочники (регионы, районы, фрукты, сорта): их названия есть в ответах любого района
+REFERENCE = f'{PREFIX}:generation:reference'
+HITS_KEY = f'{PREFIX}:hits'
+MISSES_KEY = f'{PREFIX}:misses'
+
+
+def get_cache():
+    return caches[RESPONSE_CACHE_ALIAS]
+
+
+@checks.register(checks.Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    # Поколения и счётчики должны быть общими для воркеров: LocMemCache у каждого процесса свой
+    if isinstance(get_cache(), LocMemCache):
+        return [checks.Warning(
+            f'RESPONSE_CACHE_ALIAS "{RESPONSE_CACHE_ALIAS}" is a per-process LocMemCache: invalidation and '
+            '/api/cache/stats/ only cover the worker that handles the request.',
+            hint='Point RESPONSE_CACHE_ALIAS at a shared backend (file, Redis) in settings.CACHES.',
+            id='api.W001',
+        )]
+    return []
+
+
+def district_generation_key(district_id):
+    return f'{PREFIX}:generation:district:{district_id}'
+
+
+def _new_generation():
+    # Уникальное значение: счётчик, вытесненный из кэша и созданный заново, не совпадёт со старым
+    return time.time_ns()
+
+
+def current_generations(keys):
+    cache = get_cache()
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, _new_generation(), timeout=None)
+            generations[key] = cache.get(key)
+    return generations
+
+
+def bump(keys):
+    cache = get_cache()
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _new_generation(), timeout=None)
+
+
+def invalidate_districts(district_ids):
+    """
+    Drops cached responses covering any of district_ids and all unscoped ones.
+    """
+    bump([ALL_DISTRICTS, *(district_generation_key(district_id) for district_id in set(district_ids) if district_id)])
+
+
+def invalidate_reference():
+    bump([REFERENCE])
+
+
+def invalidate_districts_on_commit(district_ids):
+    # После фиксации: иначе параллельный запрос успеет закэшировать данные до изменения
+    district_ids = set(district_ids)
+    transaction.on_commit(lambda: invalidate_districts(district_ids))
+
+
+_pending_plantations = threading.local()
+
+
+def schedule_plantation_invalidation(plantation_id):
+    """
+    Invalidates the districts of changed child rows once after commit, with one query however many rows changed.
+    """
+    pending = getattr(_pending_plantations, 'ids', None)
+    if pending is None:
+        pending = _pending_plantations.ids = set()
+    pending.add(plantation_id)
+    on_commit_once(_flush_plantation_invalidation)
+
+
+def _flush_plantation_invalidation():
+    plantation_ids = getattr(_pending_plantations, 'ids', None)
+    _pending_plantations.ids = None
+    if plantation_ids:
+        # Удалённые вместе с детьми плантации сбрасывают свой район сами (post_delete Plantation)
+        invalidate_districts(Plantation.objects.filter(pk__in=plantation_ids).values_list('district_id', flat=True))
+
+
+def _count(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def cache_stats():
+    cache = get_cache()
+    counts = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits, misses = counts.get(HITS_KEY, 0), counts.get(MISSES_KEY, 0)
+    return {
+        'backend': cache.__class__.__name__,
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / (hits + misses), 4) if hits + misses else None,
+    }
+
+
+def reset_stats():
+    get_cache().delete_many([HITS_KEY, MISSES_KEY])
+
+
+class ResponseCacheKey:
+    """
+    Key of one list response: path, host, user scope and normalized query parameters,
+    plus the generation counters it depends on (its district, or all districts, and the reference data).
+    """
+
+    def __init__(self, request, district_param='district_id'):
+        params = sorted((name, sorted(request.query_params.getlist(name))) for name in request.query_params)
+        user = request.user
+        if user.is_authenticated:
+            scope = f'{user.pk}:{int(user.is_superuser)}:{getattr(user, "district_id", None)}'
+        else:
+            scope = 'anonymous'
+        # Хост входит в ключ: ссылки next/previous в ответе абсолютные
+        raw = repr((request.path, request.get_host(), scope, params))
+        self.key = f'{PREFIX}:{hashlib.sha1(raw.encode()).hexdigest()}'
+
+        district_id = request.query_params.get(district_param)
+        if district_id and district_id.isdigit() and len(request.query_params.getlist(district_param)) == 1:
+            self.dependencies = [district_generation_key(int(district_id)), REFERENCE]
+        else:
+            self.dependencies = [ALL_DISTRICTS, REFERENCE]
+
+    def get(self, generations):
+        """
+        Cached data if the entry was stored with the current generations, else None.
+        """
+        entry = get_cache().get(self.key)
+        if entry is not None and entry['generations'] == generations:
+            _count(HITS_KEY)
+            return entry['data']
+        _count(MISSES_KEY)
+        return None
+
+    def set(self, data, generations):
+        get_cache().set(self.key, {'data': data, 'generations': generations}, RESPONSE_CACHE_TIMEOUT)
+
+
+class CachedListMixin:
+    """
+    Caches GET list responses (response.data) with ResponseCacheKey. An entry is reused until a plantation
+    or child row in its district changes (any district for unfiltered lists) or reference data changes.
+    Streaming responses are not cached.
+    """
+    cache_district_param = 'district_id'
+
+    # get(), а не list(): представления переопределяют list() (карта - потоковые форматы)
+    def get(self, request, *args, **kwargs):
+        cache_key = ResponseCacheKey(request, self.cache_district_param)
+        # Поколения читаются до построения ответа: изменение во время запроса сделает запись устаревшей
+        generations = current_generations(cache_key.dependencies)
+        data = cache_key.get(generations)
+        if data is not None:
+            return Response(data)
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200 and isinstance(response, Response):
+            cache_key.set(response.data, generations)
+        return response
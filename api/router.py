@@ -15,6 +15,11 @@ urlpatterns = [
     path('plantations/', PlantationListAPIView.as_view(), name='plantation-list'),
     path('plantations/full/', PlantationFullListAPIView.as_view(), name='plantation-fulllist-create'),
     path('plantations/map/', MapPlantationListAPIView.as_view(), name='plantation-map-list'),
+    path('plantations/area-mismatch/', PlantationAreaMismatchAPIView.as_view(), name='plantation-area-mismatch'),
+    path('plantations/at/', PlantationAtPointAPIView.as_view(), name='plantation-at-point'),
+    path('plantations/map/tiles/<int:z>/<int:x>/<int:y>/', MapTileAPIView.as_view(), name='plantation-map-tile'),
+    path('plantations/export/', PlantationExportAPIView.as_view(), name='plantation-export'),
+    path('plantations/bulk/', PlantationBulkImportAPIView.as_view(), name='plantation-bulk-import'),
     path('plantations/create/', PlantationCreateAPIView.as_view(), name='plantation-create'),
     path('plantations/<int:pk>/', PlantationRetrieveUpdateDestroyAPIView.as_view(), name='plantation-retrieve-update-destroy'),
         # subplantations 
@@ -28,6 +33,7 @@ urlpatterns = [
     path('investments/<int:pk>/', InvestmentRetrieveUpdateDestroyAPIView.as_view(), name='investment-detail'),
     path('rootstocks/', RootstockListCreateAPIView.as_view(), name='rootstock-list-create'),
     path('rootstocks/<int:pk>/', RootstockRetrieveUpdateDestroyAPIView.as_view(), name='rootstock-detail'),
+    path('farmers/autocomplete/', FarmerAutocompleteAPIView.as_view(), name='farmer-autocomplete'),
     path('farmers/', FarmerListCreateAPIView.as_view(), name='farmer-list-create'),
     path('farmers/<int:pk>/', FarmerRetrieveUpdateDestroyAPIView.as_view(), name='farmer-detail'),
     path('fruits/', get_fruits, name='get-fruits'),  
@@ -36,7 +42,12 @@ urlpatterns = [
     path('districts/create/', create_district, name='create-district'),  # Путь для создания округа
     path('districts/', get_districts, name='get-districts'),  
     path('regions/', get_regions, name='get-regions'),  
+    path('catalog/', CatalogAPIView.as_view(), name='catalog'),
     # OTHER
+    path('search/', SearchAPIView.as_view(), name='search'),
+    path('cache/stats/', ResponseCacheStatsAPIView.as_view(), name='response-cache-stats'),
+    path('snapshots/', SnapshotListAPIView.as_view(), name='snapshot-list'),
+    path('snapshots/<str:name>', snapshot_file, name='snapshot-file'),
     path('statistics/', StatisticsAPIView.as_view(), name='statistics-for-admin'),
 ]
 
@@ -0,0 +1,254 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .autocomplete import normalize
+from .plantation_models import Farmer, Plantation
+
+SEARCH_TABLE = 'api_search_index'
+SEARCH_LIMIT = getattr(settings, 'SEARCH_LIMIT', 20)
+MAX_SEARCH_LIMIT = 100
+# SQLite ограничивает число параметров запроса
+INDEX_CHUNK_SIZE = 500
+
+# Одна таблица FTS5 на фермеров и плантации: rowid = id * 2 (фермер) или id * 2 + 1 (плантация),
+# так строку можно удалить по rowid (UNINDEXED-колонки в FTS5 не индексируются)
+SEARCH_KINDS = {'farmer': 0, 'plantation': 1}
+SEARCH_COLUMNS = ('name', 'founder_name', 'director_name', 'inn', 'address', 'district', 'region')
+# Ранжирование по колонкам, в которых нашлись все слова запроса: сначала название и ИНН, затем
+# учредитель и директор, затем всё остальное. bm25 не используется: он оценивает каждое совпадение
+# и считает их общее число, при частом слове это десятки миллисекунд на миллионе строк
+SEARCH_TIERS = (('name', 'inn'), ('name', 'inn', 'founder_name', 'director_name'), None)
+
+# Индексируется нормализованный текст (autocomplete.normalize): токенизатор unicode61 не сводит
+# "ў", "қ", "ғ" ни к "у", "к", "г", ни к латинице, а названия набирают и кириллицей, и латиницей.
+# Функция регистрируется в каждом соединении с SQLite (signals.register_search_function)
+NORMALIZE_FUNCTION = 'search_normalize'
+FARMER_ROWS_SQL = (
+    'SELECT f.id * 2, \'farmer\', f.id, search_normalize(f.name), search_normalize(f.founder_name), '
+    'search_normalize(f.director_name), f.inn, search_normalize(f.address), \'\', \'\' '
+    'FROM api_farmer f'
+)
+# Плантация находится по реквизитам своего фермера и по названию района и региона
+PLANTATION_ROWS_SQL = (
+    'SELECT p.id * 2 + 1, \'plantation\', p.id, '
+    'search_normalize(f.name), search_normalize(f.founder_name), search_normalize(f.director_name), '
+    'COALESCE(f.inn, \'\'), search_normalize(f.address), search_normalize(d.name), search_normalize(r.name) '
+    'FROM api_plantation p '
+    'LEFT JOIN api_farmer f ON f.id = p.farmer_id '
+    'JOIN api_district d ON d.id = p.district_id '
+    'JOIN api_region r ON r.id = d.region_id'
+)
+INSERT_SQL = f'INSERT INTO {SEARCH_TABLE} (rowid, kind, object_id, {", ".join(SEARCH_COLUMNS)}) '
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def _use_fts():
+    return connection.vendor == 'sqlite'
+
+
+def register_search_function(db_connection):
+    """
+    Registers search_normalize() (NULL -> '') in the SQLite connection used by the index SQL.
+    """
+    db_connection.ensure_connection()
+    db_connection.connection.create_function(
+        NORMALIZE_FUNCTION, 1, lambda value: normalize(value) if value else '', deterministic=True,
+    )
+
+
+def _chunks(ids):
+    ids = sorted(set(ids))
+    for start in range(0, len(ids), INDEX_CHUNK_SIZE):
+        yield ids[start:start + INDEX_CHUNK_SIZE]
+
+
+def _remove(kind, object_ids):
+    with connection.cursor() as cursor:
+        for chunk in _chunks(object_ids):
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(
+                f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})',
+                [object_id * 2 + SEARCH_KINDS[kind] for object_id in chunk],
+            )
+
+
+def _index(kind, rows_sql, alias, object_ids):
+    _remove(kind, object_ids)
+    with connection.cursor() as cursor:
+        for chunk in _chunks(object_ids):
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f'{INSERT_SQL}{rows_sql} WHERE {alias}.id IN ({placeholders})', chunk)
+
+
+def index_farmers(farmer_ids):
+    """
+    Writes the current state of the farmers to the search index (no-op on other databases).
+    """
+    if _use_fts():
+        _index('farmer', FARMER_ROWS_SQL, 'f', farmer_ids)
+
+
+def index_plantations(plantation_ids):
+    """
+    Writes the current state of the plantations (with their farmer, district and region names) to the search index.
+    """
+    if _use_fts():
+        _index('plantation', PLANTATION_ROWS_SQL, 'p', plantation_ids)
+
+
+def remove_farmers(farmer_ids):
+    if _use_fts():
+        _remove('farmer', farmer_ids)
+
+
+def remove_plantations(plantation_ids):
+    if _use_fts():
+        _remove('plantation', plantation_ids)
+
+
+def rebuild_search_index():
+    """
+    Пересобирает индекс целиком (после загрузки данных в обход сигналов).
+    """
+    if not _use_fts():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        cursor.execute(INSERT_SQL + FARMER_ROWS_SQL)
+        cursor.execute(INSERT_SQL + PLANTATION_ROWS_SQL)
+        # Слияние сегментов после массовой вставки ускоряет поиск
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+
+
+def search_tokens(query):
+    """
+    Query words in the form they are indexed in (see NORMALIZE_FUNCTION).
+    """
+    return normalize(query).split()
+
+
+def match_expression(tokens, columns=None):
+    """
+    FTS5 MATCH for the tokens: all of them must occur, the last one as a prefix of a word
+    (it is still being typed); columns restricts the match to those columns.
+    """
+    # Токены \w+ не содержат кавычек, так что в кавычках они не разбираются как синтаксис FTS5;
+    # префиксом ищется только последнее слово: префикс в каждом слове перебирает слишком много терминов
+    expression = ' '.join(f'"{token}"' for token in tokens) + '*'
+    if columns:
+        return f'{{{" ".join(columns)}}} : ({expression})'
+    return expression
+
+
+def search(query, kind=None, limit=SEARCH_LIMIT):
+    """
+    Best matches for the query as [{type, id, name, inn, district, region, rank}]. rank is the SEARCH_TIERS
+    entry that matched (1 - name or INN), newer rows first within a tier. kind restricts the results
+    to 'farmer' or 'plantation'.
+    """
+    if not _use_fts():
+        tokens = TOKEN_RE.findall(query)
+        return _search_without_index(tokens, kind, limit) if tokens else []
+    tokens = search_tokens(query)
+    if not tokens:
+        return []
+
+    where = f'{SEARCH_TABLE} MATCH %s'
+    if kind is not None:
+        where += f' AND rowid %% 2 = {SEARCH_KINDS[kind]}'
+    found = {}
+    with connection.cursor() as cursor:
+        for rank, columns in enumerate(SEARCH_TIERS, 1):
+            # Совпадения прошлых уровней встретятся снова, поэтому их число добавляется к лимиту
+            cursor.execute(
+                f'SELECT rowid, kind, object_id FROM {SEARCH_TABLE} WHERE {where} ORDER BY rowid DESC LIMIT %s',
+                [match_expression(tokens, columns), limit + len(found)],
+            )
+            for rowid, kind_name, object_id in cursor.fetchall():
+                if rowid not in found and len(found) < limit:
+                    found[rowid] = (kind_name, object_id, rank)
+            if len(found) >= limit:
+                break
+    return _search_results(found.values())
+
+
+def _search_results(matches):
+    # В индексе нормализованный текст, названия для ответа читаются из таблиц по первичному ключу
+    ids = {'farmer': [], 'plantation': []}
+    for kind_name, object_id, rank in matches:
+        ids[kind_name].append(object_id)
+    rows = {}
+    if ids['farmer']:
+        for id, name, inn in Farmer.objects.filter(id__in=ids['farmer']).values_list('id', 'name', 'inn'):
+            rows['farmer', id] = (name, inn, None, None)
+    if ids['plantation']:
+        plantations = Plantation.objects.filter(id__in=ids['plantation']).values_list(
+            'id', 'farmer__name', 'farmer__inn', 'district__name', 'district__region__name',
+        )
+        for id, name, inn, district, region in plantations:
+            rows['plantation', id] = (name or '', inn or '', district, region)
+    results = []
+    for kind_name, object_id, rank in matches:
+        # Строка могла быть удалена между запросами
+        if (kind_name, object_id) in rows:
+            name, inn, district, region = rows[kind_name, object_id]
+            results.append({
+                'type': kind_name, 'id': object_id, 'name': name, 'inn': inn,
+                'district': district, 'region': region, 'rank': rank,
+            })
+    return results
+
+
+def _token_filter(tokens, fields):
+    condition = Q()
+    for token in tokens:
+        condition &= Q(*(Q(**{f'{field}__icontains': token}) for field in fields), _connector=Q.OR)
+    return condition
+
+
+def _search_without_index(tokens, kind, limit):
+    # Без FTS5: LIKE по тем же полям, без ранжирования
+    farmer_fields = ('name', 'founder_name', 'director_name', 'inn', 'address')
+    results = []
+    if kind in (None, 'farmer'):
+        farmers = Farmer.objects.filter(_token_filter(tokens, farmer_fields)).order_by('id')[:limit]
+        results += [
+            {'type': 'farmer', 'id': farmer.id, 'name': farmer.name, 'inn': farmer.inn,
+             'district': None, 'region': None, 'rank': None}
+            for farmer in farmers
+        ]
+    if kind in (None, 'plantation'):
+        fields = tuple(f'farmer__{field}' for field in farmer_fields) + ('district__name', 'district__region__name')
+        plantations = (
+            Plantation.objects.filter(_token_filter(tokens, fields))
+            .values_list('id', 'farmer__name', 'farmer__inn', 'district__name', 'district__region__name')
+            .order_by('id')[:limit]
+        )
+        results += [
+            {'type': 'plantation', 'id': id, 'name': name or '', 'inn': inn or '',
+             'district': district, 'region': region, 'rank': None}
+            for id, name, inn, district, region in plantations
+        ]
+    return results[:limit]
+
+
+def filter_by_search(queryset, query):
+    """
+    Plantations matching the query in the search index (LIKE over the same fields on other databases).
+    """
+    if not _use_fts():
+        fields = ('farmer__name', 'farmer__founder_name', 'farmer__director_name', 'farmer__inn', 'farmer__address',
+                  'district__name', 'district__region__name')
+        return queryset.filter(_token_filter(TOKEN_RE.findall(query), fields))
+    tokens = search_tokens(query)
+    if not tokens:
+        return queryset
+    return queryset.filter(id__in=RawSQL(
+        f'SELECT object_id FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s AND rowid %% 2 = 1',
+        (match_expression(tokens),),
+    ))
@@ -30,14 +30,21 @@ class DistrictSerializer(serializers.ModelSerializer):
         return district
 
 class StatisticsSerializer(serializers.Serializer):
-    total_issiqxonas = serializers.FloatField()
-    total_uzumzors = serializers.FloatField()
-    total_bogs = serializers.FloatField()
-    total_area = serializers.FloatField() 
-    total_fruit_areas = serializers.FloatField() 
+    plantation_count = serializers.IntegerField()
+    total_area = serializers.FloatField()
+    irrigation_area = serializers.FloatField()
+    not_usable_area = serializers.FloatField()
+    fruit_area = serializers.FloatField()
+    fertile_count = serializers.IntegerField()
+    checked_count = serializers.IntegerField()
+    unchecked_count = serializers.IntegerField()
+    deleting_count = serializers.IntegerField()
 
     class Meta:
-        fields = ['total_issiqxonas', 'total_uzumzors', 'total_bogs', 'total_area', 'total_fruit_areas']
+        fields = [
+            'plantation_count', 'total_area', 'irrigation_area', 'not_usable_area', 'fruit_area',
+            'fertile_count', 'checked_count', 'unchecked_count', 'deleting_count',
+        ]
 
 
 
@@ -0,0 +1,151 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .authentication import invalidate_auth_state, user_cache
+from .autocomplete import farmer_autocomplete
+from .catalog import invalidate_catalog
+from .commit_hooks import on_commit_once
+from .images import schedule_variants
+from .geo import remove_from_spatial_index, schedule_geometry_refresh
+from .models import CustomUser, District, Region
+from .plantation_models import (
+    SUMMARY_FIELDS, DistrictSummary, Farmer, FruitVariety, Fruits, Investment, Plantation, PlantationCoordinates,
+    PlantationFruitArea, PlantationImage, Reservoir, Rootstock, Subsidy, Trellis,
+)
+from .response_cache import invalidate_districts_on_commit, invalidate_reference, schedule_plantation_invalidation
+from .search import index_farmers, index_plantations, register_search_function, remove_farmers, remove_plantations
+from .tiles import invalidate_tiles
+
+
+@receiver(connection_created)
+def register_search_normalize(sender, connection, **kwargs):
+    if connection.vendor == 'sqlite':
+        register_search_function(connection)
+
+
+@receiver([post_save, post_delete], sender=PlantationCoordinates)
+def refresh_geometry_on_coordinates_change(sender, instance, **kwargs):
+    schedule_geometry_refresh(instance.plantation_id)
+    # Тайлы сбрасываются после пересчёта контуров, он тоже выполняется в on_commit
+    on_commit_once(invalidate_tiles)
+
+
+# Тайлы карты зависят и от полей плантации (площадь, фермер, плодородность)
+@receiver([post_save, post_delete], sender=Plantation)
+def invalidate_map_tiles(sender, **kwargs):
+    invalidate_tiles()
+
+
+@receiver(post_delete, sender=Plantation)
+def remove_plantation_from_spatial_index(sender, instance, **kwargs):
+    remove_from_spatial_index([instance.id])
+
+
+@receiver(post_delete, sender=Plantation)
+def subtract_plantation_from_district_summary(sender, instance, **kwargs):
+    DistrictSummary.replace_contribution({field: getattr(instance, field) for field in SUMMARY_FIELDS}, None)
+
+
+# Справочники каталога: версия меняется после фиксации транзакции, чтобы не закэшировать старые данные
+@receiver([post_save, post_delete], sender=Region)
+@receiver([post_save, post_delete], sender=District)
+@receiver([post_save, post_delete], sender=Fruits)
+@receiver([post_save, post_delete], sender=FruitVariety)
+@receiver([post_save, post_delete], sender=Rootstock)
+def invalidate_reference_catalog(sender, **kwargs):
+    transaction.on_commit(invalidate_catalog)
+    transaction.on_commit(invalidate_reference)
+
+
+# Кэш ответов списков плантаций: сбрасываются только затронутые районы
+@receiver([post_save, post_delete], sender=Plantation)
+def invalidate_plantation_responses(sender, instance, **kwargs):
+    invalidate_districts_on_commit({instance.district_id, getattr(instance, '_stored_district_id', None)})
+
+
+@receiver([post_save, post_delete], sender=PlantationCoordinates)
+@receiver([post_save, post_delete], sender=PlantationFruitArea)
+@receiver([post_save, post_delete], sender=PlantationImage)
+@receiver([post_save, post_delete], sender=Subsidy)
+@receiver([post_save, post_delete], sender=Investment)
+@receiver([post_save, post_delete], sender=Reservoir)
+@receiver([post_save, post_delete], sender=Trellis)
+def invalidate_child_responses(sender, instance, **kwargs):
+    schedule_plantation_invalidation(instance.plantation_id)
+
+
+# pre_delete: после удаления фермера его плантации уже отвязаны (SET_NULL)
+@receiver([post_save, pre_delete], sender=Farmer)
+def invalidate_farmer_responses(sender, instance, **kwargs):
+    # Имя и реквизиты фермера выводятся в списках его плантаций
+    invalidate_districts_on_commit(Plantation.objects.filter(farmer_id=instance.pk).values_list('district_id', flat=True))
+
+
+# Поисковый индекс (FTS5) обновляется в той же транзакции, что и данные
+@receiver(post_save, sender=Plantation)
+def index_plantation_for_search(sender, instance, **kwargs):
+    index_plantations([instance.pk])
+
+
+@receiver(post_delete, sender=Plantation)
+def remove_plantation_from_search_index(sender, instance, **kwargs):
+    remove_plantations([instance.pk])
+
+
+@receiver(post_save, sender=Farmer)
+def index_farmer_for_search(sender, instance, **kwargs):
+    index_farmers([instance.pk])
+    # Строки плантаций содержат реквизиты фермера
+    index_plantations(Plantation.objects.filter(farmer_id=instance.pk).values_list('id', flat=True))
+
+
+@receiver(pre_delete, sender=Farmer)
+def remember_farmer_plantations(sender, instance, **kwargs):
+    instance._search_plantation_ids = list(Plantation.objects.filter(farmer_id=instance.pk).values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Farmer)
+def remove_farmer_from_search_index(sender, instance, **kwargs):
+    remove_farmers([instance.pk])
+    # К post_delete плантации уже отвязаны от фермера (SET_NULL)
+    index_plantations(getattr(instance, '_search_plantation_ids', []))
+
+
+# Индекс автодополнения в памяти процесса: только после фиксации, откат его не затрагивает
+@receiver(post_save, sender=Farmer)
+def update_farmer_autocomplete(sender, instance, **kwargs):
+    farmer_id, name, inn = instance.pk, instance.name, instance.inn
+    transaction.on_commit(lambda: farmer_autocomplete.update(farmer_id, name, inn))
+
+
+@receiver(post_delete, sender=Farmer)
+def remove_farmer_from_autocomplete(sender, instance, **kwargs):
+    farmer_id = instance.pk
+    transaction.on_commit(lambda: farmer_autocomplete.remove(farmer_id))
+
+
+@receiver(post_save, sender=Region)
+@receiver(post_save, sender=District)
+def reindex_renamed_area(sender, instance, created, **kwargs):
+    if created:
+        return
+    lookup = 'district__region_id' if sender is Region else 'district_id'
+    index_plantations(Plantation.objects.filter(**{lookup: instance.pk}).values_list('id', flat=True))
+
+
+@receiver([post_save, post_delete], sender=CustomUser)
+def evict_cached_user(sender, instance, **kwargs):
+    user_cache.invalidate(instance.pk)
+    # И после фиксации: иначе параллельный запрос успеет закэшировать права до изменения
+    user_id = instance.pk
+    invalidate_auth_state(user_id)
+    transaction.on_commit(lambda: invalidate_auth_state(user_id))
+
+
+@receiver(post_save, sender=PlantationImage)
+def build_image_variants(sender, instance, created, update_fields=None, **kwargs):
+    # Новое фото или замена файла; сохранение самих variants сюда не попадает (queryset.update)
+    if created or update_fields is None or 'image' in update_fields:
+        schedule_variants(instance.pk)
@@ -0,0 +1,140 @@
+import os
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import models
+
+from .plantation_models import Investment, Plantation, PlantationCoordinates, PlantationFruitArea, Subsidy
+
+# Каталог должен быть доступен на запись (settings.SNAPSHOT_ROOT)
+SNAPSHOT_ROOT = getattr(settings, 'SNAPSHOT_ROOT', os.path.join(settings.BASE_DIR, 'snapshots'))
+SNAPSHOT_BATCH_SIZE = getattr(settings, 'SNAPSHOT_BATCH_SIZE', 50000)
+# format -> расширение файла
+SNAPSHOT_FORMATS = {'parquet': 'parquet', 'arrow': 'arrow'}
+
+# Имя таблицы -> (модель, колонки); внешние ключи выгружаются как *_id
+SNAPSHOT_TABLES = {
+    'plantations': (Plantation, [
+        'id', 'district_id', 'farmer_id', 'garden_established_year', 'total_area', 'irrigation_area',
+        'not_usable_area', 'fruit_area_total', 'used_area', 'fertility_score', 'land_type',
+        'irrigation_systems_count', 'pump_station_count', 'reservoir_count', 'fenced', 'is_fertile',
+        'is_deleting', 'is_checked', 'drawn_area', 'perimeter', 'centroid_latitude', 'centroid_longitude',
+        'updated_at',
+    ]),
+    'fruit_areas': (PlantationFruitArea, [
+        'id', 'plantation_id', 'fruit_id', 'variety_id', 'rootstock_id', 'planted_year', 'area',
+    ]),
+    'subsidies': (Subsidy, ['id', 'plantation_id', 'year', 'contract_number', 'direction', 'amount', 'efficiency']),
+    'investments': (Investment, ['id', 'plantation_id', 'invest_type', 'investment_amount']),
+    'coordinates': (PlantationCoordinates, ['id', 'plantation_id', 'latitude', 'longitude']),
+}
+
+
+class SnapshotUnavailable(Exception):
+    pass
+
+
+def _pyarrow():
+    # pyarrow (requirements.txt) импортируется лениво: без него недоступны только снимки
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise SnapshotUnavailable('pyarrow is not installed: pip install pyarrow')
+    return pyarrow
+
+
+def arrow_type(pa, field):
+    if isinstance(field, (models.AutoField, models.BigAutoField, models.IntegerField, models.ForeignKey)):
+        return pa.int64()
+    if isinstance(field, models.FloatField):
+        return pa.float64()
+    if isinstance(field, models.BooleanField):
+        return pa.bool_()
+    if isinstance(field, models.DateTimeField):
+        return pa.timestamp('us', tz='UTC')
+    if isinstance(field, models.DateField):
+        return pa.date32()
+    return pa.string()
+
+
+def table_schema(pa, model, columns):
+    fields = {field.attname: field for field in model._meta.concrete_fields}
+    return pa.schema([pa.field(column, arrow_type(pa, fields[column]), nullable=fields[column].null) for column in columns])
+
+
+def write_table(pa, path, snapshot_format, model, columns, batch_size=SNAPSHOT_BATCH_SIZE):
+    """
+    Writes one model to path, batch_size rows per record batch (Parquet row group),
+    reading the rows with a chunked cursor. Returns the row count.
+    """
+    schema = table_schema(pa, model, columns)
+    temporary_path = f'{path}.tmp'
+    if snapshot_format == 'parquet':
+        writer = pa.parquet.ParquetWriter(temporary_path, schema, compression='zstd')
+        write_batch = lambda batch: writer.write_batch(batch, row_group_size=batch_size)
+    else:
+        writer = pa.ipc.new_file(temporary_path, schema)
+        write_batch = writer.write_batch
+
+    rows = model.objects.order_by('pk').values_list(*columns).iterator(chunk_size=batch_size)
+    total = 0
+    try:
+        while True:
+            batch = [row for _, row in zip(range(batch_size), rows)]
+            if not batch:
+                break
+            arrays = [
+                pa.array(values, type=field.type)
+                for values, field in zip(zip(*batch), schema)
+            ]
+            write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            total += len(batch)
+    finally:
+        writer.close()
+    # Читатели никогда не видят недописанный файл
+    os.replace(temporary_path, path)
+    return total
+
+
+def write_snapshot(directory=SNAPSHOT_ROOT, snapshot_format='parquet', batch_size=SNAPSHOT_BATCH_SIZE):
+    """
+    One file per SNAPSHOT_TABLES entry in directory, replacing the snapshot in any other format.
+    Returns {file name: row count}.
+    """
+    pa = _pyarrow()
+    os.makedirs(directory, exist_ok=True)
+    extension = SNAPSHOT_FORMATS[snapshot_format]
+    manifest = {}
+    for name, (model, columns) in SNAPSHOT_TABLES.items():
+        file_name = f'{name}.{extension}'
+        manifest[file_name] = write_table(
+            pa, os.path.join(directory, file_name), snapshot_format, model, columns, batch_size,
+        )
+    # Снимок в другом формате устарел: иначе в списке рядом с новым лежал бы старый
+    for name in SNAPSHOT_TABLES:
+        for other_extension in set(SNAPSHOT_FORMATS.values()) - {extension}:
+            path = os.path.join(directory, f'{name}.{other_extension}')
+            if os.path.exists(path):
+                os.remove(path)
+    return manifest
+
+
+def list_snapshots(directory=SNAPSHOT_ROOT):
+    """
+    Готовые файлы снимка: имя, размер, время записи (UTC, ISO 8601).
+    """
+    if not os.path.isdir(directory):
+        return []
+    snapshots = []
+    extensions = tuple(f'.{extension}' for extension in SNAPSHOT_FORMATS.values())
+    for file_name in sorted(os.listdir(directory)):
+        if not file_name.endswith(extensions):
+            continue
+        stat = os.stat(os.path.join(directory, file_name))
+        snapshots.append({
+            'name': file_name,
+            'size': stat.st_size,
+            'written_at': datetime.fromtimestamp(stat.st_mtime, tz=dt_timezone.utc).isoformat(),
+        })
+    return snapshots
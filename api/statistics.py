@@ -0,0 +1,130 @@
+from django.db import connections
+from django.db.models import F, Sum
+
+# Измерения группировки: имя параметра -> {псевдоним колонки: путь поля}
+GROUP_FIELDS = {
+    'region': {'region_id': 'district__region_id', 'region_name': 'district__region__name'},
+    'district': {'district_id': 'district_id', 'district_name': 'district__name'},
+    'land_type': {'land_type': 'land_type'},
+    'is_fertile': {'is_fertile': 'is_fertile'},
+    'fruit': {'fruit_id': 'fruit_areas__fruit_id', 'fruit_name': 'fruit_areas__fruit__name'},
+    'planted_year': {'planted_year': 'fruit_areas__planted_year'},
+}
+# Измерения уровня PlantationFruitArea: плантация попадает в несколько групп
+FRUIT_GROUPS = {'fruit', 'planted_year'}
+
+# Поля плантации, по которым считаются метрики во внешнем запросе
+PLANTATION_COLUMNS = {
+    'p_total_area': 'total_area',
+    'p_irrigation_area': 'irrigation_area',
+    'p_not_usable_area': 'not_usable_area',
+    'p_is_fertile': 'is_fertile',
+    'p_is_checked': 'is_checked',
+    'p_is_deleting': 'is_deleting',
+}
+
+# Метрика -> SQL-агрегат над колонками внутреннего запроса
+METRICS = {
+    'plantation_count': 'COUNT(*)',
+    'total_area': 'SUM(p_total_area)',
+    'irrigation_area': 'SUM(p_irrigation_area)',
+    'not_usable_area': 'SUM(p_not_usable_area)',
+    'fruit_area': 'SUM(p_fruit_area)',
+    'fertile_count': 'SUM(CASE WHEN p_is_fertile THEN 1 ELSE 0 END)',
+    'checked_count': 'SUM(CASE WHEN p_is_checked THEN 1 ELSE 0 END)',
+    'unchecked_count': 'SUM(CASE WHEN p_is_checked THEN 0 ELSE 1 END)',
+    'deleting_count': 'SUM(CASE WHEN p_is_deleting THEN 1 ELSE 0 END)',
+}
+AREA_METRICS = ('total_area', 'irrigation_area', 'not_usable_area', 'fruit_area')
+
+
+class InvalidGroup(ValueError):
+    pass
+
+
+def parse_group_by(value):
+    """
+    'region,fruit' -> ['region', 'fruit'], unknown names raise InvalidGroup.
+    """
+    groups = [group.strip() for group in (value or '').split(',') if group.strip()]
+    unknown = [group for group in groups if group not in GROUP_FIELDS]
+    if unknown:
+        raise InvalidGroup(f"Unknown group_by: {', '.join(unknown)}. Allowed: {', '.join(GROUP_FIELDS)}.")
+    return list(dict.fromkeys(groups))
+
+
+def compute_statistics(queryset, groups=()):
+    """
+    Area, count, irrigation, not-usable and fruit-area totals of the plantation queryset,
+    grouped by the given GROUP_FIELDS names, in one SQL query.
+
+    The inner query yields one row per plantation (per plantation and fruit group when grouping
+    by fruit or planted_year, with the fruit area summed for that group only), so plantation-level
+    areas are never multiplied by the fruit-area join. The outer query aggregates it with
+    conditional sums.
+    """
+    # Внутренние псевдонимы с префиксом g_, чтобы не конфликтовать с полями модели
+    aliases = {f'g_{alias}': path for group in groups for alias, path in GROUP_FIELDS[group].items()}
+    inner = queryset.order_by().annotate(
+        **{alias: F(path) for alias, path in aliases.items()},
+        **{alias: F(field) for alias, field in PLANTATION_COLUMNS.items()},
+    )
+    if FRUIT_GROUPS.intersection(groups):
+        # Плантации без фруктовых площадей попадают в группу с fruit_id / planted_year = NULL
+        inner = inner.values('id', *aliases, *PLANTATION_COLUMNS).annotate(p_fruit_area=Sum('fruit_areas__area'))
+    else:
+        inner = inner.annotate(p_fruit_area=F('fruit_area_total')).values(
+            'id', *aliases, *PLANTATION_COLUMNS, 'p_fruit_area',
+        )
+
+    inner_sql, params = inner.query.sql_with_params()
+    select = [
+        *(f'{alias} AS {alias[2:]}' for alias in aliases),
+        *(f'{expression} AS {metric}' for metric, expression in METRICS.items()),
+    ]
+    sql = f'SELECT {", ".join(select)} FROM ({inner_sql}) statistics'
+    if aliases:
+        sql += f' GROUP BY {", ".join(aliases)} ORDER BY {", ".join(aliases)}'
+
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        names = [column[0] for column in cursor.description]
+        rows = [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    for row in rows:
+        for metric in AREA_METRICS:
+            row[metric] = row[metric] or 0
+        for metric in METRICS:
+            if metric not in AREA_METRICS:
+                row[metric] = int(row[metric] or 0)
+        if 'is_fertile' in row:
+            row['is_fertile'] = bool(row['is_fertile'])
+    return rows
+
+
+# Группировки, которые можно посчитать по таблице DistrictSummary
+SUMMARY_GROUPS = {'region', 'district'}
+
+
+def summary_statistics(queryset, groups=()):
+    """
+    Same rows as compute_statistics, summed over the DistrictSummary queryset (one row per district)
+    instead of scanning plantations. Only region and district groups are supported.
+    """
+    aliases = {f'g_{alias}': path for group in groups for alias, path in GROUP_FIELDS[group].items()}
+    totals = {f's_{metric}': Sum(metric) for metric in METRICS}
+    queryset = queryset.order_by()
+    if aliases:
+        queryset = queryset.values(**{alias: F(path) for alias, path in aliases.items()}).order_by(*aliases)
+        rows = list(queryset.annotate(**totals))
+    else:
+        rows = [queryset.aggregate(**totals)]
+
+    result = []
+    for row in rows:
+        item = {alias[2:]: row[alias] for alias in aliases}
+        for metric in METRICS:
+            value = row[f's_{metric}'] or 0
+            item[metric] = value if metric in AREA_METRICS else int(value)
+        result.append(item)
+    return result
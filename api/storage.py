@@ -0,0 +1,38 @@
+import hashlib
+import os
+import posixpath
+
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Хранилище с именами по содержимому: <каталог upload_to>/<sha256[:2]>/<sha256><расширение>.
+    Одинаковые файлы хранятся один раз, ссылки на них считаются запросом к моделям,
+    файлы без ссылок удаляет только команда sweep_media_blobs, и только файлы старше --min-age:
+    удаление сразу после удаления записи гонялось бы с загрузкой того же содержимого.
+    """
+
+    def content_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content_hash = digest.hexdigest()
+        extension = os.path.splitext(name)[1].lower()
+        return posixpath.join(posixpath.dirname(name), content_hash[:2], content_hash + extension)
+
+    def _save(self, name, content):
+        name = self.content_name(name, content)
+        if self.exists(name):
+            # Такой файл уже загружен - новая запись ссылается на существующий. Время изменения
+            # обновляется: пока запись не сохранена, sweep_media_blobs считает файл новой загрузкой
+            touch(self, name)
+            return name
+        return super()._save(name, content)
+
+
+def touch(storage, name):
+    os.utime(storage.path(name))
+
+
+image_storage = ContentAddressedStorage()
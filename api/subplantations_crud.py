@@ -1,11 +1,13 @@
 from api.plantation_models import *
 from api.plantations import *
 from rest_framework import generics
+from api.pagination import CursorOnlyPagination
 
 # Subsidy CRUD
 class SubsidyListCreateAPIView(generics.ListCreateAPIView):
     queryset = Subsidy.objects.all()
     serializer_class = SubsidySerializer
+    pagination_class = CursorOnlyPagination
 
 
 class SubsidyRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
@@ -18,6 +20,7 @@ class SubsidyRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView)
 class ReservoirListCreateAPIView(generics.ListCreateAPIView):
     queryset = Reservoir.objects.all()
     serializer_class = ReservoirSerializer
+    pagination_class = CursorOnlyPagination
 
 
 class ReservoirRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
@@ -29,6 +32,7 @@ class ReservoirRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIVie
 class TrellisListCreateAPIView(generics.ListCreateAPIView):
     queryset = Trellis.objects.all()
     serializer_class = TrellisSerializer
+    pagination_class = CursorOnlyPagination
 
 
 class TrellisRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
@@ -41,6 +45,7 @@ class TrellisRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView)
 class InvestmentListCreateAPIView(generics.ListCreateAPIView):
     queryset = Investment.objects.all()
     serializer_class = InvestmentSerializer
+    pagination_class = CursorOnlyPagination
 
 
 class InvestmentRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
@@ -52,6 +57,7 @@ class InvestmentRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIVi
 class FarmerListCreateAPIView(generics.ListCreateAPIView):
     queryset = Farmer.objects.all()
     serializer_class = FarmerSerializer
+    pagination_class = CursorOnlyPagination
 
 
 class FarmerRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
@@ -63,6 +69,7 @@ class FarmerRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
 class RootstockListCreateAPIView(generics.ListCreateAPIView):
     queryset = Rootstock.objects.all()
     serializer_class = RootstockSerializer
+    pagination_class = CursorOnlyPagination
 
 class RootstockRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Rootstock.objects.all()
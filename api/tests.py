@@ -1,3 +1,1154 @@
-from django.test import TestCase
+import csv
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image as PilImage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from .authentication import user_cache
+from .catalog import CATALOG_VERSION_KEY
+from .export import iter_export_rows
+from .autocomplete import (
+    AUTOCOMPLETE_BATCH_CHANGES, AUTOCOMPLETE_VERSION_KEY, FarmerAutocomplete, change_key, farmer_autocomplete,
+)
+from .geo import BOUNDARY_TOLERANCES, RTREE_TABLE, encode_polyline, plantations_at, tile_bounds
+from .middleware import last_login_buffer
+from .models import *
+from .plantation_models import *
+from .plantations import MapPlantationSerializer, PlantationDetailSerializer, PlantationListSerializer
+from .renderers import FastJSONRenderer
+from .response_cache import cache_stats, check_shared_cache
+from .search import rebuild_search_index, search
+from .projections import MapPlantationProjection, PlantationDetailProjection, PlantationListProjection
+from .snapshots import SNAPSHOT_TABLES
+from .statistics import compute_statistics
+from .storage import image_storage
+from .tiles import TILE_VERSION_KEY, invalidate_tiles, tiles_version
+
+
+def create_plantation(district, farmer, fruit, variety, **kwargs):
+    """
+    Создаёт плантацию со всеми дочерними объектами для тестов.
+    """
+    plantation = Plantation.objects.create(
+        district=district,
+        farmer=farmer,
+        total_area=kwargs.get('total_area', 10),
+        irrigation_area=kwargs.get('irrigation_area', 1),
+        land_type='адир',
+    )
+    Investment.objects.create(plantation=plantation, invest_type='махаллий', investment_amount=100)
+    Reservoir.objects.create(plantation=plantation, reservoir_type='beton', reservoir_volume=20)
+    Trellis.objects.create(plantation=plantation, trellis_installed_area=1, trellis_type='temir', trellis_count=5)
+    Subsidy.objects.create(
+        plantation=plantation, year=2023, contract_number='A-1', direction='Боғ', amount=1000, efficiency=True
+    )
+    PlantationImage.objects.create(plantation=plantation, image='plantation_images/test.png')
+    PlantationFruitArea.objects.create(plantation=plantation, fruit=fruit, variety=variety, planted_year=2020, area=2)
+    PlantationFruitArea.objects.create(plantation=plantation, fruit=fruit, planted_year=2021, area=1)
+    for latitude, longitude in ((41.0, 69.0), (41.0, 69.01), (41.01, 69.01), (41.01, 69.0)):
+        PlantationCoordinates.objects.create(plantation=plantation, latitude=latitude, longitude=longitude)
+    return plantation
+
+
+class PlantationTestMixin:
+    @classmethod
+    def setUpTestData(cls):
+        cls.region = Region.objects.create(name='Тошкент вилояти')
+        cls.district = District.objects.create(region=cls.region, name='Чирчиқ')
+        cls.farmer = Farmer.objects.create(
+            name='Боғбон', founder_name='Али', director_name='Вали', phone_number='998901234567',
+            address='Чирчиқ', inn='123456789', established_year=2010,
+        )
+        cls.fruit = Fruits.objects.create(name='Олма')
+        cls.variety = FruitVariety.objects.create(fruit=cls.fruit, name='Семеренко')
+
+    def setUp(self):
+        self.client = APIClient()
+        # Кэш (ответы, каталог, тайлы) переживает откат транзакции теста, а id в SQLite повторяются
+        cache.clear()
+        # Файлы - во временном каталоге; фото из create_plantation существует, по нему строятся версии
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(self.settings(MEDIA_ROOT=media_root))
+        buffer = BytesIO()
+        PilImage.new('RGB', (16, 16), 'green').save(buffer, 'PNG')
+        default_storage.save('plantation_images/test.png', ContentFile(buffer.getvalue()))
+
+    def create_plantations(self, count, **kwargs):
+        # Геометрия пересчитывается в on_commit, внутри TestCase его нужно выполнить явно;
+        # версии изображений строятся там же, а не в пуле потоков
+        with self.settings(IMAGE_VARIANTS_ASYNC=False), self.captureOnCommitCallbacks(execute=True):
+            return [
+                create_plantation(self.district, self.farmer, self.fruit, self.variety, **kwargs)
+                for _ in range(count)
+            ]
+
+
+class PlantationQueryCountTests(PlantationTestMixin, TestCase):
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_full_list_query_count_does_not_grow_with_rows(self):
+        self.create_plantations(2)
+        small_page = self.count_queries('/api/plantations/full/?page_size=100')
+
+        self.create_plantations(8)
+        large_page = self.count_queries('/api/plantations/full/?page_size=100')
+
+        self.assertEqual(small_page, large_page)
+
+    def test_detail_reads_prefetched_children(self):
+        plantation = self.create_plantations(1)[0]
+        url = f'/api/plantations/{plantation.id}/'
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['empty_area'], 6)
+        self.assertEqual(len(response.data['fruit_areas']), 2)
+        # 1 запрос на плантацию с JOIN + 4 prefetch (fruit_areas, images, coordinates, subsidies)
+        self.assertEqual(len(context.captured_queries), 5)
+
+    def test_sparse_fields_skip_unrequested_loading(self):
+        plantation = self.create_plantations(1)[0]
+        url = f'/api/plantations/{plantation.id}/'
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(f'{url}?fields=id,total_area,farmer')
+        self.assertEqual(response.json(), {'id': plantation.id, 'total_area': 10, 'farmer': response.data['farmer']})
+        self.assertEqual(response.data['farmer']['name'], 'Боғбон')
+        self.assertEqual(len(context.captured_queries), 1)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(f'{url}?expand=subsidies')
+        self.assertIn('subsidies', response.data)
+        self.assertIn('empty_area', response.data)
+        self.assertNotIn('coordinates', response.data)
+        self.assertEqual(len(context.captured_queries), 2)
+
+        page = self.client.get('/api/plantations/map/?fields=id,is_fertile').json()
+        self.assertEqual(page['results'], [{'id': plantation.id, 'is_fertile': True}])
+
+
+class FruitAreaTotalTests(PlantationTestMixin, TestCase):
+    def test_total_follows_fruit_area_writes(self):
+        plantation = self.create_plantations(1)[0]
+        plantation.refresh_from_db()
+        self.assertEqual(plantation.fruit_area_total, 3)
+        self.assertEqual(plantation.used_area, 4)
+
+        fruit_area = plantation.fruit_areas.first()
+        fruit_area.area = 5
+        fruit_area.save()
+        plantation.fruit_areas.last().delete()
+
+        plantation.refresh_from_db()
+        self.assertEqual(plantation.fruit_area_total, 5)
+        self.assertEqual(plantation.empty_area, 4)
+
+    def test_stale_instance_does_not_overwrite_total(self):
+        plantation = self.create_plantations(1)[0]
+        PlantationFruitArea.objects.create(plantation=plantation, fruit=self.fruit, planted_year=2022, area=1)
+        plantation.fenced = True
+        plantation.save()
+
+        plantation.refresh_from_db()
+        self.assertEqual(plantation.fruit_area_total, 4)
+
+    def test_backfill_command_recalculates_totals(self):
+        plantation = self.create_plantations(1)[0]
+        Plantation.objects.filter(pk=plantation.pk).update(fruit_area_total=0, used_area=0)
+
+        call_command('backfill_fruit_area_total', batch_size=1, stdout=StringIO())
+
+        plantation.refresh_from_db()
+        self.assertEqual(plantation.fruit_area_total, 3)
+        self.assertEqual(plantation.used_area, 4)
+
+
+class MapStreamingTests(PlantationTestMixin, TestCase):
+    def test_geojson_feature_collection(self):
+        self.create_plantations(3)
+        Plantation.objects.create(district=self.district, total_area=1, land_type='адир')
+
+        response = self.client.get('/api/plantations/map/?format=geojson')
+        self.assertEqual(response.status_code, 200)
+        collection = json.loads(b''.join(response.streaming_content))
+
+        self.assertEqual(collection['type'], 'FeatureCollection')
+        self.assertEqual(len(collection['features']), 4)
+        ring = collection['features'][0]['geometry']['coordinates'][0]
+        self.assertEqual(ring[0], [69.0, 41.0])
+        self.assertEqual(ring[0], ring[-1])
+        self.assertIsNone(collection['features'][-1]['geometry'])
+
+    def test_encode_polyline(self):
+        points = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+        self.assertEqual(encode_polyline(points), '_p~iF~ps|U_ulLnnqC_mqNvxq`@')
+
+    def test_tiles_cluster_at_low_zoom_and_clip_at_high_zoom(self):
+        self.create_plantations(2)
+        low = self.client.get('/api/plantations/map/tiles/4/11/5/').data
+        self.assertEqual(len(low['features']), 1)
+        self.assertEqual(low['features'][0]['properties']['count'], 2)
+        self.assertEqual(low['features'][0]['properties']['total_area'], 20)
+
+        # Тайл z=16, в который попадает юго-западный угол плантаций
+        high = self.client.get('/api/plantations/map/tiles/16/45329/24571/').data
+        self.assertEqual(len(high['features']), 2)
+        south, west, north, east = tile_bounds(16, 45329, 24571)
+        for longitude, latitude in high['features'][0]['geometry']['coordinates'][0]:
+            self.assertTrue(west <= longitude <= east and south <= latitude <= north)
+
+    def test_tiles_invalidated_on_coordinates_change(self):
+        plantation = self.create_plantations(1)[0]
+        self.assertEqual(len(self.client.get('/api/plantations/map/tiles/4/11/5/').data['features']), 1)
+        plantation.coordinates.update(latitude=-41)
+        with self.captureOnCommitCallbacks(execute=True):
+            plantation.coordinates.first().save()
+        self.assertEqual(len(self.client.get('/api/plantations/map/tiles/4/11/5/').data['features']), 0)
+
+    def test_tile_version_not_reused_after_eviction(self):
+        version = tiles_version()
+        invalidate_tiles()
+        self.assertEqual(tiles_version(), version + 1)
+        # Версия, созданная заново, не совпадает ни с одной прежней: старые тайлы в кэше недоступны
+        cache.delete(TILE_VERSION_KEY)
+        self.assertGreater(tiles_version(), version + 1)
+
+
+class PlantationBoundaryTests(PlantationTestMixin, TestCase):
+    def create_detailed_plantation(self):
+        plantation = Plantation.objects.create(district=self.district, farmer=self.farmer, total_area=10, land_type='адир')
+        # Южная сторона с отклонениями ~5 м: сохраняется только на самом детальном уровне
+        south_edge = [(41.0 + (5e-5 if i % 2 else 0), 69.0 + i * 1e-3) for i in range(11)]
+        with self.captureOnCommitCallbacks(execute=True):
+            for latitude, longitude in south_edge + [(41.01, 69.01), (41.01, 69.0)]:
+                PlantationCoordinates.objects.create(plantation=plantation, latitude=latitude, longitude=longitude)
+        return plantation
+
+    def test_boundaries_refreshed_on_coordinates_write(self):
+        plantation = self.create_detailed_plantation()
+        vertex_counts = list(plantation.boundaries.order_by('level').values_list('vertex_count', flat=True))
+        self.assertEqual(len(vertex_counts), len(BOUNDARY_TOLERANCES))
+        self.assertEqual(vertex_counts[0], 13)
+        self.assertEqual(vertex_counts[-1], 3)
+
+    def test_one_commit_callback_per_transaction(self):
+        plantation = Plantation.objects.create(district=self.district, total_area=10, land_type='адир')
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            for i in range(10):
+                PlantationCoordinates.objects.create(plantation=plantation, latitude=41 + i * 1e-3, longitude=69.0)
+            # Откат точки сохранения отменяет и зарегистрированные в ней колбэки - регистрация повторяется
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                PlantationCoordinates.objects.create(plantation=plantation, latitude=41.01, longitude=69.01)
+                raise RuntimeError
+            PlantationCoordinates.objects.create(plantation=plantation, latitude=41.01, longitude=69.01)
+        # Пересчёт контура, сброс тайлов и кэша ответов: по разу до отката точки сохранения и после него
+        self.assertEqual(len(callbacks), 6)
+        plantation.refresh_from_db()
+        self.assertEqual(plantation.max_longitude, 69.01)
+
+    def test_map_uses_level_for_zoom(self):
+        plantation = self.create_detailed_plantation()
+        response = self.client.get('/api/plantations/map/?zoom=8')
+        self.assertEqual(len(response.data['results'][0]['coordinates']), 4)
+
+        response = self.client.get('/api/plantations/map/?format=geojson&tolerance=0.00001')
+        collection = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(len(collection['features'][0]['geometry']['coordinates'][0]), 14)
+
+        response = self.client.get('/api/plantations/map/')
+        self.assertEqual(len(response.data['results'][0]['coordinates']), plantation.coordinates.count())
+
+    def test_rebuild_command(self):
+        plantation = self.create_detailed_plantation()
+        PlantationBoundary.objects.all().delete()
+        call_command('rebuild_plantation_geometry', batch_size=1, stdout=StringIO())
+        self.assertEqual(plantation.boundaries.count(), len(BOUNDARY_TOLERANCES))
+
+
+class SpatialIndexTests(PlantationTestMixin, TestCase):
+    def test_bbox_filter_and_point_lookup(self):
+        inside, = self.create_plantations(1)
+        with self.captureOnCommitCallbacks(execute=True):
+            triangle = Plantation.objects.create(district=self.district, total_area=1, land_type='адир')
+            for latitude, longitude in ((42.0, 70.0), (42.0, 70.02), (42.02, 70.0)):
+                PlantationCoordinates.objects.create(plantation=triangle, latitude=latitude, longitude=longitude)
+
+        inside.refresh_from_db()
+        self.assertEqual((inside.min_latitude, inside.max_longitude), (41.0, 69.01))
+
+        response = self.client.get('/api/plantations/map/?bbox=69.9,41.9,70.1,42.1')
+        self.assertEqual([item['id'] for item in response.data['results']], [triangle.id])
+
+        response = self.client.get('/api/plantations/at/?lat=42.005&lng=70.005')
+        self.assertEqual([item['id'] for item in response.data], [triangle.id])
+        # Внутри bbox треугольника, но вне самого полигона
+        response = self.client.get('/api/plantations/at/?lat=42.015&lng=70.015')
+        self.assertEqual(response.data, [])
+
+    def test_deleted_plantation_leaves_spatial_index(self):
+        plantation, = self.create_plantations(1)
+        plantation.delete()
+        self.assertEqual(plantations_at(Plantation.objects.all(), 41.005, 69.005), [])
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {RTREE_TABLE}')
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_stale_instance_save_keeps_bbox(self):
+        # Экземпляр создан до пересчёта геометрии (он выполняется в on_commit)
+        plantation, = self.create_plantations(1)
+        self.assertIsNone(plantation.min_latitude)
+        plantation.total_area = 12
+        plantation.save()
+
+        self.assertEqual(plantation.min_latitude, 41.0)
+        stored = Plantation.objects.values('total_area', 'min_latitude', 'max_longitude').get(pk=plantation.pk)
+        self.assertEqual(stored, {'total_area': 12, 'min_latitude': 41.0, 'max_longitude': 69.01})
+        self.assertEqual(plantations_at(Plantation.objects.all(), 41.005, 69.005), [plantation.id])
+
+
+class PlantationMetricsTests(PlantationTestMixin, TestCase):
+    def test_geodesic_metrics_stored(self):
+        plantation, = self.create_plantations(1)
+        plantation.refresh_from_db()
+        # Квадрат 0.01° x 0.01° на широте 41°: ~1113 м x ~840 м
+        self.assertAlmostEqual(plantation.drawn_area, 93.5, places=1)
+        self.assertAlmostEqual(plantation.perimeter, 3906.5, places=0)
+        self.assertAlmostEqual(plantation.centroid_latitude, 41.005)
+        self.assertAlmostEqual(plantation.centroid_longitude, 69.005)
+
+    def test_area_mismatch_report(self):
+        plantation, = self.create_plantations(1)
+        matching, = self.create_plantations(1, total_area=93)
+
+        response = self.client.get('/api/plantations/area-mismatch/?tolerance=0.05')
+        self.assertEqual([item['id'] for item in response.data['results']], [plantation.id])
+        self.assertAlmostEqual(response.data['results'][0]['area_difference'], 83.5, places=1)
+
+        # Сохранение экземпляра, созданного до пересчёта метрик, не стирает их
+        plantation.is_checked = True
+        plantation.save()
+        response = self.client.get('/api/plantations/area-mismatch/?tolerance=0.05')
+        self.assertEqual([item['id'] for item in response.data['results']], [plantation.id])
+        self.assertAlmostEqual(plantation.centroid_latitude, 41.005)
+
+    def test_geojson_markers_use_centroids(self):
+        self.create_plantations(1)
+        response = self.client.get('/api/plantations/map/?format=geojson&markers=true')
+        feature, = json.loads(b''.join(response.streaming_content))['features']
+        self.assertEqual(feature['geometry']['type'], 'Point')
+        self.assertAlmostEqual(feature['geometry']['coordinates'][0], 69.005)
+
+        response = self.client.get('/api/plantations/map/?format=polyline&markers=true')
+        item, = json.loads(b''.join(response.streaming_content))
+        self.assertNotIn('polyline', item)
+        self.assertAlmostEqual(item['latitude'], 41.005)
+        self.assertAlmostEqual(item['longitude'], 69.005)
+
+
+class StatisticsTests(PlantationTestMixin, TestCase):
+    def test_totals(self):
+        self.create_plantations(2)
+        data = self.client.get('/api/statistics/').data
+        self.assertEqual(data['plantation_count'], 2)
+        self.assertEqual(data['total_area'], 20)
+        self.assertEqual(data['irrigation_area'], 2)
+        self.assertEqual(data['fruit_area'], 6)
+        self.assertEqual(data['unchecked_count'], 2)
+
+    def test_group_by_fruit_does_not_multiply_plantation_areas(self):
+        self.create_plantations(2)
+        other_fruit = Fruits.objects.create(name='Нок')
+        plantation = Plantation.objects.create(district=self.district, total_area=5, land_type='адир')
+        PlantationFruitArea.objects.create(plantation=plantation, fruit=other_fruit, planted_year=2020, area=4)
+
+        data = self.client.get('/api/statistics/?group_by=fruit').data
+        groups = {group['fruit_name']: group for group in data['groups']}
+        self.assertEqual(groups['Олма']['plantation_count'], 2)
+        self.assertEqual(groups['Олма']['total_area'], 20)
+        self.assertEqual(groups['Олма']['fruit_area'], 6)
+        self.assertEqual(groups['Нок']['fruit_area'], 4)
+
+        data = self.client.get(f'/api/statistics/?group_by=district,is_fertile&district={self.district.id}').data
+        self.assertEqual(data['groups'][0]['plantation_count'], 3)
+
+    def test_unknown_group(self):
+        self.assertEqual(self.client.get('/api/statistics/?group_by=plantation_type').status_code, 400)
+
+    def test_invalid_filter(self):
+        self.create_plantations(1)
+        for query in ('district=abc', 'district=abc&group_by=region', 'district=abc&group_by=fruit'):
+            response = self.client.get(f'/api/statistics/?{query}')
+            self.assertEqual(response.status_code, 400, query)
+            self.assertIn('district', response.json(), query)
+
+
+class DistrictSummaryTests(PlantationTestMixin, TestCase):
+    def assertSummaryMatchesPlantations(self):
+        expected = {row['district_id']: row for row in compute_statistics(Plantation.objects.all(), ['district'])}
+        for summary in DistrictSummary.objects.all():
+            row = expected.get(summary.district_id, dict.fromkeys(DistrictSummary.METRICS, 0))
+            for metric in DistrictSummary.METRICS:
+                self.assertAlmostEqual(getattr(summary, metric), row[metric], msg=metric)
+
+    def test_summary_follows_writes(self):
+        plantation, other = self.create_plantations(2)
+        other_district = District.objects.create(region=self.region, name='Бўка')
+
+        plantation.is_checked = True
+        plantation.save(update_fields=['is_checked'])
+        other.district = other_district
+        other.total_area = 30
+        other.save()
+        PlantationFruitArea.objects.filter(plantation=plantation).first().delete()
+        self.assertSummaryMatchesPlantations()
+
+        other.delete()
+        self.assertEqual(DistrictSummary.objects.get(district=other_district).plantation_count, 0)
+        self.assertSummaryMatchesPlantations()
+
+        data = self.client.get('/api/statistics/?group_by=region').data
+        self.assertEqual(data['groups'][0]['plantation_count'], 1)
+        self.assertEqual(data['groups'][0]['fruit_area'], 1)
+
+    def test_reconcile_command_fixes_drift(self):
+        self.create_plantations(2)
+        DistrictSummary.objects.update(total_area=0, plantation_count=7)
+        call_command('reconcile_district_summaries', stdout=StringIO())
+        self.assertSummaryMatchesPlantations()
+        self.assertEqual(self.client.get('/api/statistics/').data['total_area'], 20)
+
+
+class CatalogTests(PlantationTestMixin, TestCase):
+    def test_catalog_tree_etag_and_invalidation(self):
+        Rootstock.objects.create(fruit=self.fruit, name='М9')
+        with self.captureOnCommitCallbacks(execute=True):
+            Region.objects.create(name='Самарқанд')
+
+        response = self.client.get('/api/catalog/')
+        catalog = json.loads(response.content)
+        region = next(region for region in catalog['regions'] if region['id'] == self.region.id)
+        self.assertEqual(region['districts'], [{'id': self.district.id, 'name': 'Чирчиқ'}])
+        self.assertEqual(catalog['fruits'][0]['varieties'][0]['name'], 'Семеренко')
+        self.assertEqual(catalog['fruits'][0]['rootstocks'][0]['name'], 'М9')
+
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            cached = self.client.get('/api/catalog/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.content, b'')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            District.objects.create(region=self.region, name='Бўка')
+        response = self.client.get('/api/catalog/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_version_is_shared_and_not_reused_after_eviction(self):
+        # Версия в общем кэше, иначе её изменение видит только записавший воркер
+        self.assertNotIn('locmem', settings.CACHES['default']['BACKEND'])
+        self.client.get('/api/catalog/')
+        Region.objects.bulk_create([Region(name='Навоий')])
+        cache.delete(CATALOG_VERSION_KEY)
+        catalog = json.loads(self.client.get('/api/catalog/').content)
+        self.assertIn('Навоий', [region['name'] for region in catalog['regions']])
+
+
+class LastLoginBufferTests(TestCase):
+    def test_one_write_per_window(self):
+        user = CustomUser.objects.create_user(username='agronom', password='secret', phone_number='1')
+        client = APIClient()
+        client.force_login(user)
+        cache.clear()
+        last_login_buffer.flush()
+
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(3):
+                client.get('/api/regions/')
+        self.assertFalse([query for query in queries if query['sql'].startswith('UPDATE')])
+        self.assertEqual(last_login_buffer.flush(), 1)
+        self.assertIsNotNone(CustomUser.objects.get(pk=user.pk).last_login)
+
+        client.get('/api/regions/')
+        self.assertEqual(last_login_buffer.flush(), 0)
+
+
+class LastLoginTimerTests(TransactionTestCase):
+    def test_pending_timestamps_written_without_another_login(self):
+        user = CustomUser.objects.create_user(username='agronom', password='secret', phone_number='1')
+        cache.clear()
+        with mock.patch('api.middleware.LAST_LOGIN_FLUSH_INTERVAL', 0.05):
+            last_login_buffer.touch(user.pk, timezone.now())
+            timer = last_login_buffer.timer
+        # Других запросов нет - отметку записывает таймер
+        timer.join(5)
+        self.assertEqual(last_login_buffer.pending, {})
+        self.assertIsNotNone(CustomUser.objects.get(pk=user.pk).last_login)
+
+
+class ClaimsAuthenticationTests(PlantationTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        user_cache.clear()
+        self.user = CustomUser.objects.create_user(
+            username='agronom', password='secret', phone_number='1', district=self.district,
+        )
+        self.access = self.client.post(
+            '/api/login/', {'username': 'agronom', 'password': 'secret'}, format='json',
+        ).data['access']
+
+    def test_claims_user_without_user_queries(self):
+        plantation, = self.create_plantations(1)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+        self.client.get('/api/plantations/')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(f'/api/plantations/{plantation.id}/', {'is_checked': True}, format='json')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse([query for query in queries if 'api_customuser' in query['sql']])
+
+    def test_deactivation_and_privilege_changes_apply_to_issued_tokens(self):
+        plantation, = self.create_plantations(1)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+        url = f'/api/plantations/{plantation.id}/'
+        self.assertEqual(self.client.patch(url, {'is_checked': True}, format='json').status_code, 403)
+
+        # Токен выпущен до повышения прав: claims устарели, но права берутся у пользователя
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_superuser = True
+            self.user.save()
+        self.assertEqual(self.client.patch(url, {'is_checked': True}, format='json').status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_superuser = False
+            self.user.save()
+        self.assertEqual(self.client.patch(url, {'is_checked': False}, format='json').status_code, 403)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(self.client.get('/api/plantations/').status_code, 401)
+
+    def test_user_info_served_from_cache(self):
+        data = self.client.post('/api/user_info/', {'access_token': self.access}, format='json').data
+        self.assertEqual(data['username'], 'agronom')
+        with self.assertNumQueries(0):
+            self.client.post('/api/user_info/', {'access_token': self.access}, format='json')
+
+        self.user.first_name = 'Ali'
+        self.user.save()
+        data = self.client.post('/api/user_info/', {'access_token': self.access}, format='json').data
+        self.assertEqual(data['first_name'], 'Ali')
+
+
+class BulkImportTests(PlantationTestMixin, TestCase):
+    def import_row(self, **kwargs):
+        row = {
+            'district': self.district.id, 'farmer': self.farmer.id, 'total_area': 10, 'irrigation_area': 1,
+            'land_type': 'адир',
+            'coordinates': [{'latitude': 41.0, 'longitude': 69.0}, {'latitude': 41.0, 'longitude': 69.01},
+                            {'latitude': 41.01, 'longitude': 69.01}],
+            'fruit_areas': [{'fruit': self.fruit.id, 'variety': self.variety.id, 'planted_year': 2020, 'area': 2}],
+            'investment': {'invest_type': 'махаллий', 'investment_amount': 100},
+        }
+        row.update(kwargs)
+        return row
+
+    def test_ndjson_import_with_row_errors(self):
+        lines = [
+            json.dumps(self.import_row()),
+            '{broken',
+            json.dumps(self.import_row(district=999)),
+            json.dumps(self.import_row(total_area=1)),
+            json.dumps(self.import_row()),
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/api/plantations/bulk/?chunk_size=1', '\n'.join(lines), content_type='application/x-ndjson',
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 3, 4])
+        self.assertIn('district', response.data['errors'][1]['errors'])
+
+        plantation = Plantation.objects.first()
+        self.assertEqual(plantation.fruit_area_total, 2)
+        self.assertEqual(plantation.used_area, 3)
+        self.assertIsNotNone(plantation.min_latitude)
+        self.assertEqual(plantation.investment.investment_amount, 100)
+        summary = DistrictSummary.objects.get(district=self.district)
+        self.assertEqual((summary.plantation_count, summary.total_area, summary.fruit_area), (2, 20, 4))
+
+    @override_settings(IMAGE_VARIANTS_ASYNC=False)
+    def test_image_paths_must_exist_in_storage(self):
+        lines = [
+            json.dumps(self.import_row(images=['plantation_images/test.png'])),
+            json.dumps(self.import_row(images=['plantation_images/missing.png'])),
+            json.dumps(self.import_row(images=['../../etc/passwd'])),
+            json.dumps(self.import_row(images=['/etc/passwd'])),
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/plantations/bulk/', '\n'.join(lines), content_type='application/x-ndjson')
+        self.assertEqual((response.data['created'], response.data['failed']), (1, 3))
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 3, 4])
+        for error in response.data['errors']:
+            self.assertIn('images', error['errors'])
+        self.assertEqual(list(PlantationImage.objects.values_list('image', flat=True)), ['plantation_images/test.png'])
+
+    def test_csv_import(self):
+        row = self.import_row()
+        body = StringIO()
+        writer = csv.DictWriter(body, fieldnames=list(row))
+        writer.writeheader()
+        writer.writerow({key: json.dumps(value) if isinstance(value, (list, dict)) else value for key, value in row.items()})
+        response = self.client.post('/api/plantations/bulk/', body.getvalue(), content_type='text/csv')
+        self.assertEqual(response.data, {'created': 1, 'failed': 0, 'errors': []})
+        self.assertEqual(PlantationCoordinates.objects.count(), 3)
+
+    def test_unsupported_content_type(self):
+        response = self.client.post('/api/plantations/bulk/', {}, format='json')
+        self.assertEqual(response.status_code, 415)
+
+
+@override_settings(IMAGE_VARIANTS_ASYNC=False)
+class ImageVariantsTests(PlantationTestMixin, TestCase):
+    def upload(self, size=(2000, 1500)):
+        buffer = BytesIO()
+        PilImage.new('RGB', size, 'green').save(buffer, 'PNG')
+        return SimpleUploadedFile('photo.png', buffer.getvalue(), content_type='image/png')
+
+    def test_variants_built_on_create_and_serialized(self):
+        plantation = Plantation.objects.create(district=self.district, total_area=5, land_type='адир')
+        with self.captureOnCommitCallbacks(execute=True):
+            image = PlantationImage.objects.create(plantation=plantation, image=self.upload())
+        image.refresh_from_db()
+        self.assertEqual(set(image.variants), {'thumb', 'medium', 'webp'})
+        with default_storage.open(image.variants['thumb']) as file:
+            self.assertEqual(max(PilImage.open(file).size), 320)
+
+        data = self.client.get(f'/api/plantations/{plantation.id}/').data
+        self.assertTrue(data['images'][0]['variants']['webp'].endswith('.webp'))
+
+    def test_backfill_command(self):
+        plantation = Plantation.objects.create(district=self.district, total_area=5, land_type='адир')
+        image = PlantationImage.objects.create(plantation=plantation, image=self.upload((100, 80)))
+        self.assertEqual(image.variants, {})
+        call_command('build_image_variants', workers=1, stdout=StringIO())
+        image.refresh_from_db()
+        self.assertEqual(set(image.variants), {'thumb', 'medium', 'webp'})
+
+
+    def test_identical_uploads_share_one_file(self):
+        plantation = Plantation.objects.create(district=self.district, total_area=5, land_type='адир')
+        with self.captureOnCommitCallbacks(execute=True):
+            first = PlantationImage.objects.create(plantation=plantation, image=self.upload((64, 64)))
+            second = PlantationImage.objects.create(plantation=plantation, image=self.upload((64, 64)))
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(first.image.name, r'^plantation_images/[0-9a-f]{2}/[0-9a-f]{64}\.png$')
+
+        second.refresh_from_db()
+        first.delete()
+        second.delete()
+        # Файлы без ссылок удаляет только sweep_media_blobs
+        self.assertTrue(default_storage.exists(second.image.name))
+        call_command('sweep_media_blobs', min_age=0, stdout=StringIO())
+        self.assertFalse(default_storage.exists(second.image.name))
+        self.assertFalse(default_storage.exists(second.variants['thumb']))
+
+    def test_sweep_removes_unreferenced_files(self):
+        plantation = Plantation.objects.create(district=self.district, total_area=5, land_type='адир')
+        image = PlantationImage.objects.create(plantation=plantation, image=self.upload((64, 64)))
+        orphan = default_storage.save('plantation_images/orphan.png', ContentFile(b'x'))
+        call_command('sweep_media_blobs', min_age=0, stdout=StringIO())
+        self.assertFalse(default_storage.exists(orphan))
+        self.assertTrue(default_storage.exists(image.image.name))
+
+    def test_sweep_spares_reused_file_before_its_row_is_saved(self):
+        name = image_storage.save('plantation_images/photo.png', self.upload((64, 64)))
+        os.utime(image_storage.path(name), (0, 0))
+        # Та же загрузка ещё раз: запись в БД ещё не сохранена, но файл уже снова нужен
+        self.assertEqual(image_storage.save('plantation_images/photo.png', self.upload((64, 64))), name)
+        call_command('sweep_media_blobs', min_age=60, stdout=StringIO())
+        self.assertTrue(image_storage.exists(name))
+
+
+class MediaServingTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(self.settings(MEDIA_ROOT=media_root))
+        self.name = image_storage.save('plantation_images/photo.bin', ContentFile(bytes(range(256)) * 4))
+        self.url = f'/storage/{self.name}'
+
+    def test_etag_range_and_cache_headers(self):
+        response = self.client.get(self.url)
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(256)) * 4)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        partial = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(partial.status_code, 206)
+        self.assertEqual(partial['Content-Range'], 'bytes 10-19/1024')
+        self.assertEqual(b''.join(partial.streaming_content), bytes(range(10, 20)))
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=2000-').status_code, 416)
+        self.assertEqual(self.client.get('/storage/../core/settings.py').status_code, 404)
+
+    def test_offload_to_front_server(self):
+        with self.settings(MEDIA_SENDFILE='x-accel'):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-storage/{self.name}')
+        self.assertEqual(response.content, b'')
+
+
+class ExportTests(PlantationTestMixin, TestCase):
+    def export(self, query):
+        response = self.client.get(f'/api/plantations/export/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def test_csv_and_ndjson_follow_filters(self):
+        self.create_plantations(2)
+        other_district = District.objects.create(region=self.region, name='Бўка')
+        Plantation.objects.create(district=other_district, total_area=5, land_type='адир')
+
+        rows = list(csv.DictReader(StringIO(self.export('format=csv').decode('utf-8-sig'))))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(json.loads(rows[0]['fruit_areas'])[0]['variety'], 'Семеренко')
+
+        lines = self.export(f'format=ndjson&district_id={self.district.id}').decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        row = json.loads(lines[0])
+        self.assertEqual((row['farmer'], row['fruit_area_total'], len(row['subsidies'])), ('Боғбон', 3, 1))
+
+    def test_xlsx_is_a_valid_workbook(self):
+        self.create_plantations(2)
+        with zipfile.ZipFile(BytesIO(self.export('format=xlsx'))) as archive:
+            self.assertIsNone(archive.testzip())
+            sheet = archive.read('xl/worksheets/sheet1.xml').decode()
+        self.assertEqual(sheet.count('<row>'), 3)
+        self.assertIn('Чирчиқ', sheet)
+
+    def test_unknown_format(self):
+        self.assertEqual(self.client.get('/api/plantations/export/?format=pdf').status_code, 404)
+
+    def test_invalid_filters_rejected_before_streaming(self):
+        self.create_plantations(1)
+        for query in ('district_id=abc', 'min_area=x', 'fruit_id=x'):
+            response = self.client.get(f'/api/plantations/export/?format=csv&{query}')
+            self.assertEqual(response.status_code, 400, query)
+            self.assertFalse(response.streaming, query)
+        # Ошибка запроса возникает до ответа, а не посреди потока
+        with self.assertRaises(OperationalError):
+            iter_export_rows(Plantation.objects.extra(where=['no_such_column = 1']))
+
+
+@skipUnless(pyarrow, 'pyarrow is not installed')
+class SnapshotTests(PlantationTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.enterContext(mock.patch('api.views.SNAPSHOT_ROOT', self.directory))
+
+    def test_parquet_snapshot_in_row_groups(self):
+        self.create_plantations(3)
+        call_command('export_snapshot', output=self.directory, batch_size=2, stdout=StringIO())
+
+        plantations = pyarrow.parquet.ParquetFile(f'{self.directory}/plantations.parquet')
+        self.assertEqual(plantations.metadata.num_rows, 3)
+        self.assertEqual(plantations.metadata.num_row_groups, 2)
+        self.assertEqual(plantations.schema_arrow.names, SNAPSHOT_TABLES['plantations'][1])
+        fruit_areas = pyarrow.parquet.read_table(f'{self.directory}/fruit_areas.parquet').to_pydict()
+        self.assertEqual(sum(fruit_areas['area']), 9)
+
+        listing = self.client.get('/api/snapshots/').json()
+        self.assertEqual(len(listing), len(SNAPSHOT_TABLES))
+        # Читатели Parquet начинают с футера: последние 8 байт - длина метаданных и магия PAR1
+        tail = self.client.get('/api/snapshots/plantations.parquet', HTTP_RANGE='bytes=-4')
+        self.assertEqual(tail.status_code, 206)
+        self.assertEqual(b''.join(tail.streaming_content), b'PAR1')
+
+    def test_rebuild_in_another_format_replaces_files(self):
+        self.create_plantations(1)
+        call_command('export_snapshot', output=self.directory, stdout=StringIO())
+        call_command('export_snapshot', output=self.directory, format='arrow', stdout=StringIO())
+        names = [snapshot['name'] for snapshot in self.client.get('/api/snapshots/').json()]
+        self.assertEqual(sorted(names), sorted(f'{name}.arrow' for name in SNAPSHOT_TABLES))
+
+    def test_rebuild_requires_superuser(self):
+        self.assertEqual(self.client.post('/api/snapshots/').status_code, 403)
+
+
+class KeysetPaginationTests(PlantationTestMixin, TestCase):
+    def test_cursor_walks_all_pages_without_count(self):
+        plantations = self.create_plantations(5)
+        seen, url = [], '/api/plantations/full/?cursor=&page_size=2'
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                page = self.client.get(url).json()
+            self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+            self.assertIsNone(page['count'])
+            seen += [plantation['id'] for plantation in page['results']]
+            url = page['next']
+        self.assertEqual(seen, sorted(plantation.id for plantation in plantations))
+
+    def test_cursor_follows_id_ordering_or_is_rejected(self):
+        plantations = self.create_plantations(3)
+        page = self.client.get('/api/plantations/full/?cursor=&page_size=2&ordering=-id').json()
+        self.assertEqual([row['id'] for row in page['results']], [plantations[2].id, plantations[1].id])
+        page = self.client.get(page['next']).json()
+        self.assertEqual(([row['id'] for row in page['results']], page['next']), ([plantations[0].id], None))
+
+        for url in ('/api/plantations/full/?cursor=&ordering=-total_area', '/api/plantations/area-mismatch/?cursor='):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 400, url)
+            self.assertIn('cursor', response.json(), url)
+
+    def test_malformed_cursor_is_a_bad_request(self):
+        self.create_plantations(1)
+        response = self.client.get('/api/plantations/full/?cursor=abc')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'cursor': 'Invalid cursor.'})
+
+    def test_uncounted_pages_and_opt_in_crud_lists(self):
+        self.create_plantations(3)
+        page = self.client.get('/api/plantations/map/?count=false&page_size=2&page=2').json()
+        self.assertEqual((page['count'], len(page['results']), page['next']), (None, 1, None))
+        self.assertIsNotNone(page['previous'])
+
+        self.assertEqual(len(self.client.get('/api/subsidies/').json()), 3)
+        page = self.client.get('/api/subsidies/?cursor=&page_size=2').json()
+        self.assertEqual(len(page['results']), 2)
+        self.assertEqual(len(self.client.get(page['next']).json()['results']), 1)
+
+
+class ProjectionTests(PlantationTestMixin, TestCase):
+    def render_both(self, serializer_class, projection_class, query='', **context):
+        request = Request(APIRequestFactory().get(f'/api/plantations/?{query}'))
+        context['request'] = request
+        queryset = Plantation.objects.order_by('id')
+        if serializer_class is MapPlantationSerializer:
+            instances = serializer_class.setup_eager_loading(queryset, context.get('boundary_level'))
+        else:
+            instances = queryset.prefetch_related('fruit_areas', 'images', 'coordinates', 'subsidies')
+        serializer = serializer_class(instances, many=True, context=context)
+        projection = projection_class(context)
+        renderer = JSONRenderer()
+        return renderer.render(serializer.data), renderer.render(projection.render(projection.values(queryset)))
+
+    def test_projections_match_serializers_byte_for_byte(self):
+        self.create_plantations(2)
+        # Без фермера, дочерних объектов и с prev_data
+        Plantation.objects.create(
+            district=self.district, total_area=5.5, land_type='адир', fertility_score=0.25, prev_data={'total_area': 4},
+        )
+        cases = [
+            (PlantationListSerializer, PlantationListProjection, '', {}),
+            (MapPlantationSerializer, MapPlantationProjection, '', {}),
+            (MapPlantationSerializer, MapPlantationProjection, '', {'boundary_level': 1}),
+            (PlantationDetailSerializer, PlantationDetailProjection, '', {}),
+            (PlantationDetailSerializer, PlantationDetailProjection, 'fields=id,farmer,fruit_areas', {}),
+            (PlantationDetailSerializer, PlantationDetailProjection, 'expand=images,investment', {}),
+        ]
+        for serializer_class, projection_class, query, context in cases:
+            with self.subTest(serializer=serializer_class.__name__, query=query, **context):
+                serialized, projected = self.render_both(serializer_class, projection_class, query, **context)
+                self.assertEqual(projected, serialized)
+
+    def test_full_list_uses_projection(self):
+        self.create_plantations(1)
+        results = self.client.get('/api/plantations/full/').json()['results']
+        self.assertEqual(results[0]['fruit_areas'][1], {
+            'id': results[0]['fruit_areas'][1]['id'], 'fruit': self.fruit.id, 'fruit_name': self.fruit.name,
+            'variety': None, 'rootstock': None, 'planted_year': 2021, 'area': 1.0,
+        })
+
+
+class CompressionTests(PlantationTestMixin, TestCase):
+    def test_fast_renderer_matches_stdlib_renderer(self):
+        data = {
+            'name': 'Боғбон\u2028', 'area': 1.5, 'amount': Decimal('2.50'), 'ids': (1, 2), 'none': None,
+            'updated_at': datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=dt_timezone.utc), 3: True,
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_gzip_for_lists_and_streams(self):
+        self.create_plantations(3)
+        plain = self.client.get('/api/plantations/full/')
+        compressed = self.client.get('/api/plantations/full/', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', compressed['Vary'])
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+
+        export = self.client.get('/api/plantations/export/?format=ndjson', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(export['Content-Encoding'], 'gzip')
+        self.assertEqual(len(gzip.decompress(b''.join(export.streaming_content)).splitlines()), 3)
+
+        small = self.client.get('/api/regions/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(small.has_header('Content-Encoding'))
+
+    @skipUnless(brotli, 'brotli is not installed')
+    def test_brotli_preferred_and_catalog_revalidates(self):
+        self.create_plantations(1)
+        # Каталог больше COMPRESSION_MIN_SIZE; create, а не bulk_create - сигналы сбрасывают каталог
+        with self.captureOnCommitCallbacks(execute=True):
+            for number in range(50):
+                Region.objects.create(name=f'Вилоят {number}')
+        response = self.client.get('/api/catalog/', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(json.loads(brotli.decompress(response.content))['regions'][0]['name'], self.region.name)
+        self.assertTrue(response['ETag'].startswith('W/'))
+        revalidated = self.client.get('/api/catalog/', HTTP_ACCEPT_ENCODING='br', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+
+
+class ResponseCacheTests(PlantationTestMixin, TestCase):
+    def get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(queries.captured_queries)
+
+    def test_hits_until_district_changes(self):
+        plantation = self.create_plantations(1)[0]
+        other_district = District.objects.create(region=self.region, name='Бўка')
+        with self.captureOnCommitCallbacks(execute=True):
+            other = Plantation.objects.create(district=other_district, total_area=5, land_type='адир')
+        own_url = f'/api/plantations/full/?district_id={self.district.id}'
+        other_url = f'/api/plantations/full/?district_id={other_district.id}'
+
+        first, _ = self.get(own_url)
+        self.get(other_url)
+        self.get('/api/plantations/full/')
+        cached, queries = self.get(own_url)
+        self.assertEqual((cached, queries), (first, 0))
+        self.assertEqual(self.get(f'{own_url}&page=1')[1] > 0, True)
+
+        # Изменение в другом районе не трогает кэш своего района, но сбрасывает общий список
+        with self.captureOnCommitCallbacks(execute=True):
+            Subsidy.objects.create(plantation=other, year=2024, contract_number='B-2', direction='Боғ', amount=5, efficiency=False)
+        self.assertEqual(self.get(own_url)[1], 0)
+        self.assertGreater(self.get(other_url)[1], 0)
+        self.assertGreater(self.get('/api/plantations/full/')[1], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            plantation.fruit_areas.first().delete()
+        refreshed, queries = self.get(own_url)
+        self.assertGreater(queries, 0)
+        self.assertEqual(len(refreshed['results'][0]['fruit_areas']), 1)
+
+        stats = self.client.get('/api/cache/stats/').json()
+        self.assertEqual((stats['hits'], stats['backend']), (2, 'FileBasedCache'))
+
+    def test_file_backend(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        backend = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory}
+        with self.settings(CACHES={'default': backend}):
+            self.create_plantations(1)
+            first, _ = self.get('/api/plantations/map/')
+            self.assertEqual(self.get('/api/plantations/map/'), (first, 0))
+            self.assertEqual(cache_stats()['backend'], 'FileBasedCache')
+
+    def test_per_process_backend_is_flagged(self):
+        self.assertEqual(check_shared_cache(None), [])
+        backend = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+        with self.settings(CACHES={'default': backend}):
+            self.assertEqual([warning.id for warning in check_shared_cache(None)], ['api.W001'])
+
+
+class SearchTests(PlantationTestMixin, TestCase):
+    def results(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [(result['type'], result['id']) for result in response.json()['results']]
+
+    def test_prefix_search_ranks_and_follows_changes(self):
+        plantation = self.create_plantations(1)[0]
+        other = Farmer.objects.create(
+            name='Олтин водий', founder_name='Боғбонов', director_name='Карим', phone_number='998901111111',
+            address='Самарқанд', inn='987654321', established_year=2015,
+        )
+
+        # Совпадение в названии выше совпадения в имени учредителя
+        self.assertEqual(
+            self.results('/api/search/?q=боғб&type=farmer'), [('farmer', self.farmer.id), ('farmer', other.id)],
+        )
+        self.assertEqual(self.results('/api/search/?q=9876'), [('farmer', other.id)])
+        self.assertEqual(self.results('/api/search/?q=чирчиқ тош&type=plantation'), [('plantation', plantation.id)])
+
+        self.farmer.name = 'Янги боғ'
+        self.farmer.save()
+        self.assertCountEqual(self.results('/api/search/?q=янги'), [('farmer', self.farmer.id), ('plantation', plantation.id)])
+
+        other.delete()
+        plantation.delete()
+        self.assertEqual(self.results('/api/search/?q=9876'), [])
+        self.assertEqual(self.results('/api/search/?q=чирчиқ&type=plantation'), [])
+        self.assertEqual(self.client.get('/api/search/?q=x&type=region').status_code, 400)
+
+    def test_plantation_filters_use_farmer(self):
+        plantation = self.create_plantations(1)[0]
+        Plantation.objects.create(district=self.district, total_area=5, land_type='адир')
+        for query in ('q=боғбон', 'name=Боғб', 'inn=123456789', f'fruit_id={self.fruit.id}&name=Боғ'):
+            for url in ('/api/plantations/', '/api/plantations/full/', '/api/plantations/map/'):
+                if 'fruit_id' in query and url.endswith('map/'):
+                    continue
+                response = self.client.get(f'{url}?{query}')
+                self.assertEqual(response.status_code, 200, (url, query))
+                rows = response.json()
+                rows = rows['results'] if isinstance(rows, dict) else rows
+                self.assertEqual([row['id'] for row in rows], [plantation.id], (url, query))
+
+    def test_cyrillic_and_latin_spellings_match(self):
+        plantation = self.create_plantations(1)[0]
+        for query in ("Bog'bon", 'богбон', 'bogbon chirchiq', 'ЧИРЧИҚ'):
+            self.assertEqual(
+                self.results(f'/api/search/?q={query}&type=plantation'), [('plantation', plantation.id)], query,
+            )
+        # В ответе исходные названия, а не нормализованный текст индекса
+        result = self.client.get('/api/search/?q=bogbon&type=farmer').json()['results'][0]
+        self.assertEqual((result['name'], result['inn']), ('Боғбон', '123456789'))
+        rows = self.client.get('/api/plantations/?q=bogʻbon').json()
+        self.assertEqual([row['id'] for row in rows], [plantation.id])
+
+    def test_parameters_without_model_fields_are_ignored(self):
+        # У Plantation нет полей plantation_type и status - раньше такие фильтры падали с FieldError
+        self.create_plantations(2)
+        for url in ('/api/plantations/', '/api/plantations/full/', '/api/plantations/map/',
+                    '/api/plantations/export/?format=csv&'):
+            separator = '' if url.endswith('&') else '?'
+            response = self.client.get(f'{url}{separator}plantation_type=1&status=active')
+            self.assertEqual(response.status_code, 200, url)
+            if response.streaming:
+                self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 3)
+            else:
+                rows = response.json()
+                self.assertEqual(len(rows['results'] if isinstance(rows, dict) else rows), 2, url)
+
+    def test_bulk_import_and_rebuild(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Plantation.objects.bulk_create([Plantation(district=self.district, total_area=1, land_type='адир')])
+        self.assertEqual(search('чирчиқ', 'plantation'), [])
+        rebuild_search_index()
+        self.assertEqual(len(search('чирчиқ', 'plantation')), 1)
+
+
+class FarmerAutocompleteTests(PlantationTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        farmer_autocomplete.clear()
+
+    def names(self, query):
+        response = self.client.get('/api/farmers/autocomplete/', {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [result['name'] for result in response.json()['results']]
+
+    def create_farmer(self, name, inn):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Farmer.objects.create(
+                name=name, founder_name='Али', director_name='Вали', phone_number='998900000000',
+                address='Қўқон', inn=inn, established_year=2012,
+            )
+
+    def test_transliterated_prefixes(self):
+        self.create_farmer('Олтин водий', '301234567')
+        self.create_farmer("Bog'dorchi", '302000000')
+        self.assertEqual(self.names('bog'), ['Боғбон', "Bog'dorchi"])
+        self.assertEqual(self.names('БОҒД'), ["Bog'dorchi"])
+        self.assertEqual(self.names('vodiy'), ['Олтин водий'])
+        self.assertEqual(self.names('Oltin vo'), ['Олтин водий'])
+        self.assertEqual(self.names('3012'), ['Олтин водий'])
+        self.assertEqual(self.names(''), [])
+
+    def test_updates_in_place_and_rebuilds_after_foreign_change(self):
+        self.assertEqual(self.names('bog'), ['Боғбон'])
+        farmer = self.create_farmer('Бўстон', '303000000')
+        self.farmer.name = 'Янги боғ'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.farmer.save()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.names('bos'), ['Бўстон'])
+            self.assertEqual(self.names('yangi'), ['Янги боғ'])
+        # Индекс обновлён на месте, без перестроения
+        self.assertFalse([query for query in queries.captured_queries if 'api_farmer' in query['sql']])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            farmer.delete()
+        self.assertEqual(self.names('bos'), [])
+
+        # Изменение из другого процесса: версия в кэше ушла вперёд, само изменение лежит под ней
+        Farmer.objects.filter(pk=self.farmer.pk).update(name='Бобур')
+        version = cache.incr(AUTOCOMPLETE_VERSION_KEY)
+        cache.set(change_key(version), (self.farmer.pk, ('Бобур', '123456789')))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.names('bob'), ['Бобур'])
+        self.assertFalse([query for query in queries.captured_queries if 'api_farmer' in query['sql']])
+
+        # Изменения нет в кэше: индекс перестраивается
+        Farmer.objects.filter(pk=self.farmer.pk).update(name='Олма')
+        cache.incr(AUTOCOMPLETE_VERSION_KEY)
+        self.assertEqual(self.names('olma'), ['Олма'])
+
+    def test_many_foreign_changes_applied_in_one_batch(self):
+        farmers = Farmer.objects.bulk_create([
+            Farmer(name=f'Фермер {i}', founder_name='Али', director_name='Вали', phone_number='998900000000',
+                   address='Қўқон', inn=str(310000000 + i), established_year=2012)
+            for i in range(AUTOCOMPLETE_BATCH_CHANGES)
+        ])
+        self.assertEqual(len(self.names('fermer')), 10)
+        # Другой процесс переименовал всех новых фермеров и удалил исходного
+        changes = [(farmer.pk, (f'Бобур {farmer.inn}', farmer.inn)) for farmer in farmers] + [(self.farmer.pk, None)]
+        for farmer_id, farmer in changes:
+            cache.set(change_key(cache.incr(AUTOCOMPLETE_VERSION_KEY)), (farmer_id, farmer))
+        self.assertEqual(self.names('fermer'), [])
+        self.assertEqual(self.names('bog'), [])
+        self.assertEqual(self.names('bobur 310000001'), ['Бобур 310000001'])
+
+        expected = FarmerAutocomplete()
+        for farmer_id, farmer in changes[:-1]:
+            Farmer.objects.filter(pk=farmer_id).update(name=farmer[0])
+        Farmer.objects.filter(pk=self.farmer.pk).delete()
+        expected.build()
+        self.assertEqual(farmer_autocomplete.entries, expected.entries)
+
+    def test_stale_index_answers_while_another_thread_rebuilds(self):
+        self.assertEqual(self.names('bog'), ['Боғбон'])
+        Farmer.objects.filter(pk=self.farmer.pk).update(name='Олма')
+        cache.incr(AUTOCOMPLETE_VERSION_KEY)
+        with farmer_autocomplete.build_lock:
+            self.assertEqual(self.names('bog'), ['Боғбон'])
+        self.assertEqual(self.names('olma'), ['Олма'])
@@ -0,0 +1,119 @@
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .geo import (
+    boundary_level, clip_ring, filter_by_bbox, iter_plantation_rings, ring_to_geojson, simplify_ring, tile_bounds, tile_position,
+)
+from .plantation_models import Plantation
+
+# До этого зума включительно тайл отдаёт кластеры, глубже - полигоны
+CLUSTER_MAX_ZOOM = getattr(settings, 'MAP_TILE_CLUSTER_MAX_ZOOM', 11)
+# Кластеры считаются по сетке CLUSTER_GRID x CLUSTER_GRID ячеек на тайл
+CLUSTER_GRID = getattr(settings, 'MAP_TILE_CLUSTER_GRID', 8)
+TILE_SIZE = 256
+TILE_CACHE_TIMEOUT = getattr(settings, 'MAP_TILE_CACHE_TIMEOUT', 60 * 60 * 24)
+TILE_VERSION_KEY = 'plantation-map-tiles:version'
+
+
+def tiles_version():
+    # Версия в общем кэше (settings.CACHES) и уникальна: после вытеснения ключа старые тайлы не оживут
+    return cache.get_or_set(TILE_VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def invalidate_tiles():
+    """
+    Bumps the tile version in the shared cache: cached tiles become unreachable in every worker and expire by timeout.
+    """
+    try:
+        cache.incr(TILE_VERSION_KEY)
+    except ValueError:
+        cache.set(TILE_VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def get_tile(z, x, y):
+    """
+    Cached tile (z, x, y) as a GeoJSON FeatureCollection dict.
+    """
+    key = f'plantation-map-tiles:{tiles_version()}:{z}:{x}:{y}'
+    tile = cache.get(key)
+    if tile is None:
+        tile = build_tile(z, x, y)
+        cache.set(key, tile, timeout=TILE_CACHE_TIMEOUT)
+    return tile
+
+
+def build_tile(z, x, y):
+    if z <= CLUSTER_MAX_ZOOM:
+        features = build_clusters(z, x, y)
+    else:
+        features = build_polygons(z, x, y)
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def build_clusters(z, x, y):
+    """
+    Groups plantations of the tile by grid cell: count, summed total_area and mean centroid.
+    """
+    south, west, north, east = tile_bounds(z, x, y)
+    # Сохранённые центроиды: кандидаты из пространственного индекса, без чтения координат
+    centroids = (
+        filter_by_bbox(Plantation.objects.all(), south, west, north, east)
+        .filter(
+            centroid_latitude__gte=south, centroid_latitude__lt=north,
+            centroid_longitude__gte=west, centroid_longitude__lt=east,
+        )
+        .values_list('centroid_latitude', 'centroid_longitude', 'total_area')
+    )
+
+    cells = defaultdict(lambda: [0, 0.0, 0.0, 0.0])
+    for latitude, longitude, total_area in centroids:
+        column, row = tile_position(z, x, y, latitude, longitude)
+        cell = cells[(_grid_index(column), _grid_index(row))]
+        cell[0] += 1
+        cell[1] += total_area or 0
+        cell[2] += latitude
+        cell[3] += longitude
+
+    return [
+        {
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [longitude_sum / count, latitude_sum / count]},
+            'properties': {'cluster': True, 'count': count, 'total_area': total_area},
+        }
+        for count, total_area, latitude_sum, longitude_sum in cells.values()
+    ]
+
+
+def _grid_index(position):
+    return max(0, min(int(position * CLUSTER_GRID), CLUSTER_GRID - 1))
+
+
+def build_polygons(z, x, y):
+    """
+    Plantation polygons intersecting the tile, clipped to it and simplified to one pixel.
+    """
+    south, west, north, east = bounds = tile_bounds(z, x, y)
+    queryset = filter_by_bbox(Plantation.objects.all(), south, west, north, east)
+    tolerance = (east - west) / TILE_SIZE
+    # Берём заранее упрощённый контур подходящего уровня, исходные координаты - только на самых крупных зумах
+    level = boundary_level(tolerance)
+
+    features = []
+    rings = iter_plantation_rings(queryset, fields=('farmer__name', 'is_fertile', 'total_area'), level=level)
+    for (plantation_id, name, is_fertile, total_area), ring in rings:
+        ring = clip_ring(ring, bounds)
+        if level is None:
+            ring = simplify_ring(ring, tolerance)
+        geometry = ring_to_geojson(ring)
+        if geometry is None:
+            continue
+        features.append({
+            'type': 'Feature',
+            'id': plantation_id,
+            'geometry': geometry,
+            'properties': {'name': name, 'is_fertile': is_fertile, 'total_area': total_area},
+        })
+    return features
@@ -16,16 +16,36 @@ from rest_framework.views import APIView
 from rest_framework_simplejwt.views import TokenRefreshView
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.exceptions import AuthenticationFailed
-from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework import status
-from django.db.models import Q,Sum
-
+from rest_framework import exceptions
+from django.db.models import F, Q, Sum
+from django.db.models.functions import Abs
+from django.http import StreamingHttpResponse
+from django.utils.http import parse_etags
+from django.views.decorators.http import require_safe
+from rest_framework.settings import api_settings
+
+from .authentication import ClaimsJWTAuthentication
+from .pagination import KeysetPagination
+from .response_cache import CachedListMixin, cache_stats
+from .projections import MapPlantationProjection, PlantationDetailProjection, PlantationListProjection
 from .permissions import IsDistrictOwner, IsDistrictOwnerForCoordinates
-from .filters import PlantationFilter, StatisticsFilter
+from .filters import DistrictSummaryFilter, PlantationFilter, StatisticsFilter
 from .models import *
 from .plantation_models import *
 from .serializers import *
 from .plantations import *
+from .geo import boundary_level, filter_by_bbox, plantations_at, stream_geojson, stream_polylines, zoom_tolerance
+from .renderers import CSVRenderer, GeoJSONRenderer, NDJSONRenderer, PolylineRenderer, XLSXRenderer
+from .export import EXPORT_FORMATS, iter_export_rows
+from .tiles import get_tile
+from .catalog import get_catalog
+from .media import serve_file
+from .snapshots import SNAPSHOT_BATCH_SIZE, SNAPSHOT_FORMATS, SNAPSHOT_ROOT, SnapshotUnavailable, list_snapshots, write_snapshot
+from .bulk_import import IMPORT_CHUNK_SIZE, MAX_IMPORT_CHUNK_SIZE, import_plantations, iter_csv, iter_ndjson
+from .autocomplete import AUTOCOMPLETE_LIMIT, MAX_AUTOCOMPLETE_LIMIT, farmer_autocomplete
+from .search import MAX_SEARCH_LIMIT, SEARCH_KINDS, SEARCH_LIMIT, filter_by_search, search
+from .statistics import SUMMARY_GROUPS, InvalidGroup, compute_statistics, parse_group_by, summary_statistics
 
 
 
@@ -38,10 +58,9 @@ class UserInfoAPIView(APIView):
             raise AuthenticationFailed("Access token is missing in the request body")
 
         try:
-            jwt_authentication = JWTAuthentication()
-            request.META['HTTP_AUTHORIZATION'] = f'Bearer {token}'
-            user, _ = jwt_authentication.authenticate(request)
-            user_data = UserInfoSerializer(user).data
+            authentication = ClaimsJWTAuthentication()
+            user = authentication.get_user(authentication.get_validated_token(token))
+            user_data = UserInfoSerializer(user.full_user).data
             return Response(user_data)
 
         except AuthenticationFailed:
@@ -132,6 +151,25 @@ def get_regions(request):
         serializer = RegionSerializer(regions, many=True)
         return Response(serializer.data)
 
+class CatalogAPIView(APIView):
+    """
+    Все справочники одним ответом: регионы -> районы, фрукты -> сорта и подвои.
+    Ответ собирается один раз на версию каталога; If-None-Match с текущим ETag даёт 304 без тела.
+    """
+    def get(self, request, *args, **kwargs):
+        body, etag = get_catalog()
+        # Слабое сравнение: CompressionMiddleware отдаёт ETag сжатого ответа как W/"..."
+        if_none_match = [tag.removeprefix('W/') for tag in parse_etags(request.headers.get('If-None-Match', ''))]
+        if etag in if_none_match or '*' in if_none_match:
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+        # Клиент хранит ответ, но перепроверяет его при каждом запросе
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+
 @api_view(['GET'])
 def get_fruits(request):
     if request.method == 'GET':
@@ -188,24 +226,33 @@ class UserDetailAPIView(generics.RetrieveAPIView):
 
 
 class StatisticsAPIView(generics.GenericAPIView):
+    """
+    Итоги по плантациям одним запросом. ?group_by=region,district,land_type,is_fertile,fruit,planted_year
+    группирует результат, ?region= и ?district= фильтруют (StatisticsFilter).
+    Итоги без группировки или по region/district берутся из DistrictSummary, без обхода плантаций.
+    """
+    queryset = Plantation.objects.all()
     serializer_class = StatisticsSerializer
-    def get(self, request, *args, **kwargs):
-        plantations = Plantation.objects.all()
-        total_issiqxonas = plantations.filter(plantation_type=2).aggregate(total_area=Sum('total_area'))['total_area'] or 0
-        total_uzumzors = plantations.filter(plantation_type=1).aggregate(total_area=Sum('total_area'))['total_area'] or 0
-        total_bogs = plantations.filter(plantation_type=3).aggregate(total_area=Sum('total_area'))['total_area'] or 0
-        total_area = plantations.aggregate(total_area=Sum('total_area'))['total_area'] or 0
-        total_fruit_areas = PlantationFruitArea.objects.aggregate(total_area=Sum('area'))['total_area'] or 0
-
+    filter_backends = (DjangoFilterBackend,)
+    filterset_class = StatisticsFilter
 
-        stats = {
-            'total_issiqxonas': total_issiqxonas,
-            'total_uzumzors': total_uzumzors,
-            'total_bogs': total_bogs,
-            'total_area': total_area,
-            'total_fruit_areas': total_fruit_areas,
-        }
-        return Response(stats)
+    def get(self, request, *args, **kwargs):
+        try:
+            groups = parse_group_by(request.query_params.get('group_by'))
+        except InvalidGroup as error:
+            raise exceptions.ValidationError({'group_by': str(error)})
+
+        if SUMMARY_GROUPS.issuperset(groups):
+            summaries = DistrictSummaryFilter(request.query_params, queryset=DistrictSummary.objects.all(), request=request)
+            # Как DjangoFilterBackend: неверный ?district= - 400, а не итоги по всей стране
+            if not summaries.is_valid():
+                raise exceptions.ValidationError(summaries.errors)
+            rows = summary_statistics(summaries.qs, groups)
+        else:
+            rows = compute_statistics(self.filter_queryset(self.get_queryset()), groups)
+        if not groups:
+            return Response(rows[0])
+        return Response({'group_by': groups, 'groups': rows})
 
 
 
@@ -223,12 +270,28 @@ class PlantationCoordinatesListCreateAPIView(generics.ListCreateAPIView):
 
 
 
-class PlantationPagination(PageNumberPagination):
+class ProjectionListMixin:
+    """
+    GET-список строится projection_class из values(), без экземпляров моделей и полей сериализатора;
+    вывод тот же, что у serializer_class.
+    """
+    projection_class = None
+
+    def list(self, request, *args, **kwargs):
+        projection = self.projection_class(self.get_serializer_context())
+        rows = projection.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(projection.render(page))
+        return Response(projection.render(rows))
+
+
+class PlantationPagination(KeysetPagination):
     page_size = 10  # количество объектов на страницу
     page_size_query_param = 'page_size'
     max_page_size = 100
 
-class MapPlantationPagination(PageNumberPagination):
+class MapPlantationPagination(KeysetPagination):
     page_size = 100 
     page_size_query_param = 'page_size'
     max_page_size = 1000
@@ -237,9 +300,10 @@ class MapPlantationPagination(PageNumberPagination):
 
 
 
-class PlantationListAPIView(generics.ListAPIView):
+class PlantationListAPIView(CachedListMixin, ProjectionListMixin, generics.ListAPIView):
     queryset = Plantation.objects.all()
     serializer_class = PlantationListSerializer
+    projection_class = PlantationListProjection
     filter_backends = (DjangoFilterBackend, filters.OrderingFilter)
     filterset_class = PlantationFilter 
 
@@ -248,54 +312,164 @@ class PlantationListAPIView(generics.ListAPIView):
         return queryset
 
 
-class MapPlantationListAPIView(generics.ListAPIView):
+class MapPlantationListAPIView(CachedListMixin, generics.ListAPIView):
     serializer_class = MapPlantationSerializer
     pagination_class = MapPlantationPagination
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, GeoJSONRenderer, PolylineRenderer]
+
+    # ?format=geojson и ?format=polyline отдают все плантации одним потоком без пагинации
+    streaming_formats = {
+        'geojson': (stream_geojson, 'application/geo+json'),
+        'polyline': (stream_polylines, 'application/json'),
+    }
+
+    def get_boundary_level(self):
+        """
+        ?tolerance= (градусы) или ?zoom= выбирают уровень упрощённого контура, без них - исходные координаты.
+        """
+        params = self.request.query_params
+        try:
+            if params.get('tolerance'):
+                return boundary_level(float(params['tolerance']))
+            if params.get('zoom'):
+                return boundary_level(zoom_tolerance(int(params['zoom'])))
+        except ValueError:
+            raise exceptions.ValidationError({"detail": "zoom must be an integer and tolerance a number."})
+        return None
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        level = self.get_boundary_level()
+        if level is not None:
+            context['boundary_level'] = level
+        return context
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        level = self.get_boundary_level()
+
+        streaming_format = self.streaming_formats.get(request.accepted_renderer.format)
+        if streaming_format is not None:
+            stream, content_type = streaming_format
+            markers = request.query_params.get('markers', '').lower() in ('1', 'true')
+            return StreamingHttpResponse(stream(queryset, level=level, markers=markers), content_type=content_type)
+
+        projection = MapPlantationProjection(self.get_serializer_context())
+        rows = projection.values(queryset)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(projection.render(page))
+        return Response(projection.render(rows))
 
     def get_queryset(self):
         queryset = Plantation.objects.all()
-        status = self.request.query_params.get('status', None)
         region_name = self.request.query_params.get('region', None)
         district_id = self.request.query_params.get('district_id', None)
         name = self.request.query_params.get('name', None)
         inn = self.request.query_params.get('inn', None)
-        plantation_type = self.request.query_params.get('plantation_type', None)
+        search_query = self.request.query_params.get('q', None)
+        bbox = self.request.query_params.get('bbox', None)
 
         #filters   
-        if status:
-            queryset = queryset.filter(status=status)
         if region_name:
             queryset = queryset.filter(district__region__name__icontains=region_name)
         if district_id:
             queryset = queryset.filter(district__id=district_id)
-        if plantation_type:
-            queryset = queryset.filter(plantation_type=plantation_type)
+        if bbox:
+            queryset = filter_by_bbox(queryset, *parse_bbox(bbox))
 
         #search           
+        if search_query:
+            queryset = filter_by_search(queryset, search_query)
         if name:
-            queryset = queryset.filter(name__icontains=name)
+            queryset = queryset.filter(farmer__name__icontains=name)
         if inn:
-            queryset = queryset.filter(inn=inn)
+            queryset = queryset.filter(farmer__inn=inn)
 
         return queryset
 
 
 
 
-class PlantationFullListAPIView(generics.ListAPIView):
+def parse_bbox(value):
+    """
+    bbox=west,south,east,north -> (south, west, north, east)
+    """
+    try:
+        west, south, east, north = (float(part) for part in value.split(','))
+    except ValueError:
+        raise exceptions.ValidationError({"bbox": "Expected bbox=west,south,east,north."})
+    return south, west, north, east
+
+
+class PlantationAtPointAPIView(APIView):
+    """
+    Плантации, в контур которых попадает точка ?lat=&lng=.
+    """
+
+    def get(self, request, *args, **kwargs):
+        try:
+            latitude = float(request.query_params['lat'])
+            longitude = float(request.query_params['lng'])
+        except (KeyError, ValueError):
+            raise exceptions.ValidationError({"detail": "lat and lng query parameters are required."})
+
+        plantation_ids = plantations_at(Plantation.objects.all(), latitude, longitude)
+        queryset = MapPlantationSerializer.setup_eager_loading(Plantation.objects.filter(id__in=plantation_ids))
+        return Response(MapPlantationSerializer(queryset, many=True, context={'request': request}).data)
+
+
+class PlantationAreaMismatchAPIView(generics.ListAPIView):
+    """
+    Плантации, у которых площадь по контуру отличается от total_area больше чем на ?tolerance= (доля, по умолчанию 0.1).
+    """
+    serializer_class = PlantationAreaMismatchSerializer
+    pagination_class = PlantationPagination
+
+    def get_queryset(self):
+        try:
+            tolerance = float(self.request.query_params.get('tolerance', 0.1))
+        except ValueError:
+            raise exceptions.ValidationError({"tolerance": "Expected a number."})
+
+        return (
+            Plantation.objects.select_related('district', 'farmer')
+            .filter(drawn_area__isnull=False)
+            .annotate(area_difference=Abs(F('drawn_area') - F('total_area')))
+            .filter(area_difference__gt=F('total_area') * tolerance)
+            .order_by('-area_difference', 'id')
+        )
+
+
+class MapTileAPIView(APIView):
+    """
+    Тайл карты z/x/y: на мелком зуме кластеры, на крупном - обрезанные и упрощённые полигоны.
+    """
+
+    def get(self, request, z, x, y, *args, **kwargs):
+        if z > 22 or x >= 2 ** z or y >= 2 ** z:
+            return Response({"detail": "Tile out of range."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(get_tile(z, x, y))
+
+
+
+
+class PlantationFullListAPIView(CachedListMixin, ProjectionListMixin, generics.ListAPIView):
     serializer_class = PlantationDetailSerializer
+    projection_class = PlantationDetailProjection
     pagination_class = PlantationPagination
     filter_backends = (filters.OrderingFilter,)
+    ordering = ('id',)
 
     def get_queryset(self):
         queryset = Plantation.objects.all()
 
         # Получаем параметры фильтрации из запроса
+        search_query = self.request.query_params.get('q', None)
         name = self.request.query_params.get('name', None)
         inn = self.request.query_params.get('inn', None)
         region_name = self.request.query_params.get('region_name', None)
         district_id = self.request.query_params.get('district_id', None)
-        plantation_type = self.request.query_params.get('plantation_type', None)
         fruit_id = self.request.query_params.get('fruit_id', None)
         fruit_name = self.request.query_params.get('fruit_name', None)
         min_area = self.request.query_params.get('min_area', None)
@@ -303,13 +477,17 @@ class PlantationFullListAPIView(generics.ListAPIView):
         is_deleting = self.request.query_params.get('is_deleting', None)
         is_checked = self.request.query_params.get('is_checked', None)
 
-        # Фильтруем по имени
+        # Полнотекстовый поиск (фермер, район, регион)
+        if search_query:
+            queryset = filter_by_search(queryset, search_query)
+
+        # Фильтруем по имени фермера
         if name:
-            queryset = queryset.filter(name__icontains=name)
+            queryset = queryset.filter(farmer__name__icontains=name)
 
-        # Фильтруем по INN
+        # Фильтруем по INN фермера
         if inn:
-            queryset = queryset.filter(inn=inn)
+            queryset = queryset.filter(farmer__inn=inn)
 
         # Фильтруем по имени региона
         if region_name:
@@ -319,25 +497,21 @@ class PlantationFullListAPIView(generics.ListAPIView):
         if district_id:
             queryset = queryset.filter(district__id=district_id)
 
-        # Фильтруем по типу плантации
-        if plantation_type:
-            queryset = queryset.filter(plantation_type=plantation_type)
-
         # Фильтруем по фруктам
         if fruit_id:
-            queryset = queryset.filter(fruit_area__fruit__id=fruit_id)
+            queryset = queryset.filter(fruit_areas__fruit__id=fruit_id)
 
         # Фильтруем по названию фрукта
         if fruit_name:
-            queryset = queryset.filter(fruit_area__fruit__name__icontains=fruit_name)
+            queryset = queryset.filter(fruit_areas__fruit__name__icontains=fruit_name)
 
         # Фильтруем по минимальной площади
         if min_area:
-            queryset = queryset.filter(fruit_area__area__gte=min_area)
+            queryset = queryset.filter(fruit_areas__area__gte=min_area)
 
         # Фильтруем по максимальной площади
         if max_area:
-            queryset = queryset.filter(fruit_area__area__lte=max_area)
+            queryset = queryset.filter(fruit_areas__area__lte=max_area)
 
         # Фильтруем по is_deleting
         if is_deleting:
@@ -347,6 +521,10 @@ class PlantationFullListAPIView(generics.ListAPIView):
         if is_checked:
             queryset = queryset.filter(is_checked=is_checked.lower() == 'true')
 
+        # У плантации несколько фруктовых площадей - без distinct она повторится
+        if fruit_id or fruit_name or min_area or max_area:
+            queryset = queryset.distinct()
+
         return queryset
 
     def perform_create(self, serializer):
@@ -370,6 +548,11 @@ class PlantationRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIVi
     queryset = Plantation.objects.all()
     serializer_class = PlantationDetailSerializer
 
+    def get_queryset(self):
+        return PlantationDetailSerializer.setup_eager_loading(
+            super().get_queryset(), PlantationDetailSerializer.selected_fields(self.request),
+        )
+
     def update(self, request, *args, **kwargs):
         plantation = self.get_object()
         data = request.data
@@ -394,6 +577,10 @@ class PlantationRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIVi
         serializer.is_valid(raise_exception=True)
         self.perform_update(serializer)
 
+        # Сбрасываем prefetch-кэш, чтобы ответ отражал сохранённые данные
+        if getattr(plantation, '_prefetched_objects_cache', None):
+            plantation._prefetched_objects_cache = {}
+
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     def perform_update(self, serializer):
@@ -455,3 +642,128 @@ class PlantationCreateAPIView(APIView):
             return Response(PlantationDetailSerializer(plantation).data, status=status.HTTP_201_CREATED)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class PlantationBulkImportAPIView(APIView):
+    """
+    Массовый импорт плантаций: тело запроса - NDJSON (application/x-ndjson) или CSV (text/csv),
+    одна плантация на строку/запись с вложенными объектами. Строки проверяются по мере чтения,
+    корректные записываются пачками по ?chunk_size= в отдельных транзакциях.
+    Ответ - число созданных плантаций и ошибки по номерам строк.
+    """
+    readers = {
+        'application/x-ndjson': iter_ndjson,
+        'application/ndjson': iter_ndjson,
+        'text/csv': iter_csv,
+    }
+
+    def post(self, request, *args, **kwargs):
+        content_type = request.content_type.split(';')[0].strip()
+        reader = self.readers.get(content_type)
+        if reader is None:
+            raise exceptions.UnsupportedMediaType(content_type)
+
+        try:
+            chunk_size = int(request.query_params.get('chunk_size', IMPORT_CHUNK_SIZE))
+        except ValueError:
+            raise exceptions.ValidationError({'chunk_size': 'Must be an integer.'})
+        if not 1 <= chunk_size <= MAX_IMPORT_CHUNK_SIZE:
+            raise exceptions.ValidationError({'chunk_size': f'Must be between 1 and {MAX_IMPORT_CHUNK_SIZE}.'})
+
+        # Тело читается построчно, без загрузки целиком в request.data
+        report = import_plantations(reader(request.stream or ()), chunk_size)
+        response_status = status.HTTP_201_CREATED if report['created'] else status.HTTP_400_BAD_REQUEST
+        return Response(report, status=response_status)
+
+
+class PlantationExportAPIView(generics.GenericAPIView):
+    """
+    Выгрузка всех плантаций (фермер, район, фруктовые площади, субсидии) потоком:
+    ?format=csv|ndjson|xlsx, фильтры те же, что у списка плантаций (PlantationFilter).
+    Неверные фильтры дают 400, первая порция строк читается до ответа - поток не обрывается на ошибке запроса.
+    """
+    queryset = Plantation.objects.all()
+    filter_backends = (DjangoFilterBackend,)
+    filterset_class = PlantationFilter
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, CSVRenderer, NDJSONRenderer, XLSXRenderer]
+
+    def get(self, request, *args, **kwargs):
+        export_format = request.query_params.get('format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            raise exceptions.ValidationError({'format': f"Allowed: {', '.join(EXPORT_FORMATS)}."})
+        stream, content_type, extension = EXPORT_FORMATS[export_format]
+
+        rows = iter_export_rows(self.filter_queryset(self.get_queryset()))
+        response = StreamingHttpResponse(stream(rows), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="plantations.{extension}"'
+        return response
+
+
+class SearchAPIView(APIView):
+    """
+    Поиск фермеров и плантаций: ?q= (последнее слово ищется по началу), ?type=farmer|plantation, ?limit=.
+    Сначала совпадения в названии и ИНН, затем в именах учредителя и директора, затем в адресе, районе и регионе.
+    """
+    def get(self, request, *args, **kwargs):
+        query = request.query_params.get('q', '')
+        kind = request.query_params.get('type') or None
+        if kind is not None and kind not in SEARCH_KINDS:
+            raise exceptions.ValidationError({"type": f"Allowed: {', '.join(SEARCH_KINDS)}."})
+        try:
+            limit = min(int(request.query_params.get('limit', SEARCH_LIMIT)), MAX_SEARCH_LIMIT)
+        except ValueError:
+            raise exceptions.ValidationError({"limit": "Expected an integer."})
+        if limit < 1:
+            raise exceptions.ValidationError({"limit": "Expected a positive integer."})
+        return Response({'results': search(query, kind, limit)})
+
+
+class FarmerAutocompleteAPIView(APIView):
+    """
+    Подсказки для выбора фермера: ?q= - начало названия (любого его слова) или ИНН, кириллицей или латиницей; ?limit=.
+    """
+    def get(self, request, *args, **kwargs):
+        try:
+            limit = min(int(request.query_params.get('limit', AUTOCOMPLETE_LIMIT)), MAX_AUTOCOMPLETE_LIMIT)
+        except ValueError:
+            raise exceptions.ValidationError({"limit": "Expected an integer."})
+        if limit < 1:
+            raise exceptions.ValidationError({"limit": "Expected a positive integer."})
+        return Response({'results': farmer_autocomplete.search(request.query_params.get('q', ''), limit)})
+
+
+class ResponseCacheStatsAPIView(APIView):
+    """
+    Попадания и промахи кэша ответов списков плантаций, общие для всех воркеров (settings.RESPONSE_CACHE_ALIAS).
+    """
+    def get(self, request, *args, **kwargs):
+        return Response(cache_stats())
+
+
+class SnapshotListAPIView(APIView):
+    """
+    Колоночные снимки для аналитики (Parquet/Arrow): GET - список готовых файлов,
+    POST - пересобрать снимок (?format=parquet|arrow), только для суперпользователя.
+    """
+    def get(self, request, *args, **kwargs):
+        return Response(list_snapshots(SNAPSHOT_ROOT))
+
+    def post(self, request, *args, **kwargs):
+        if not request.user.is_superuser:
+            raise exceptions.PermissionDenied("Только администратор может пересобрать снимок")
+        snapshot_format = request.query_params.get('format', 'parquet')
+        if snapshot_format not in SNAPSHOT_FORMATS:
+            raise exceptions.ValidationError({'format': f"Allowed: {', '.join(SNAPSHOT_FORMATS)}."})
+        try:
+            manifest = write_snapshot(SNAPSHOT_ROOT, snapshot_format, SNAPSHOT_BATCH_SIZE)
+        except SnapshotUnavailable as error:
+            return Response({'detail': str(error)}, status=status.HTTP_501_NOT_IMPLEMENTED)
+        return Response(manifest, status=status.HTTP_201_CREATED)
+
+
+@require_safe
+def snapshot_file(request, name):
+    """
+    Файл снимка с поддержкой Range: читатели Parquet запрашивают футер и нужные группы строк.
+    """
+    return serve_file(request, SNAPSHOT_ROOT, name)
@@ -0,0 +1,72 @@
+import pytest
+
+from api.models import District, Region
+from api.plantation_models import (
+    Farmer, Fruits, FruitVariety, Plantation, PlantationCoordinates, PlantationFruitArea, Subsidy,
+)
+
+# Наибольшее число плантаций в бенчмарках; меньшие размеры берутся срезом
+BENCHMARK_ROWS = 10000
+# Размер набора для агрегатов и глубоких страниц (large_dataset)
+LARGE_ROWS = 100000
+
+
+def seed_plantations(count):
+    """Плантации с координатами, насаждением и субсидией — bulk_create в обход сигналов."""
+    districts = list(District.objects.order_by('id'))
+    farmers = list(Farmer.objects.order_by('id'))
+    fruit = Fruits.objects.get()
+    variety = FruitVariety.objects.get()
+    offset = Plantation.objects.count()
+    plantations = Plantation.objects.bulk_create([
+        Plantation(district=districts[i % len(districts)], farmer=farmers[i % len(farmers)], total_area=10,
+                   irrigation_area=1, land_type='адир', is_fertile=i % 3 > 0, fruit_area_total=3, used_area=4)
+        for i in range(offset, offset + count)
+    ], batch_size=2000)
+    PlantationCoordinates.objects.bulk_create([
+        PlantationCoordinates(plantation=plantation, latitude=41 + lat, longitude=69 + lng)
+        for plantation in plantations
+        for lat, lng in ((0, 0), (0, 0.01), (0.01, 0.01), (0.01, 0))
+    ], batch_size=5000)
+    PlantationFruitArea.objects.bulk_create([
+        PlantationFruitArea(plantation=plantation, fruit=fruit, variety=variety, planted_year=2015 + i % 5, area=3)
+        for i, plantation in enumerate(plantations, offset)
+    ], batch_size=5000)
+    Subsidy.objects.bulk_create([
+        Subsidy(plantation=plantation, year=2020, contract_number='A-1', direction='Томчилатиб', amount=1000,
+                efficiency=True)
+        for plantation in plantations
+    ], batch_size=5000)
+    return plantations
+
+
+@pytest.fixture(scope='session')
+def django_db_setup(django_db_setup, django_db_blocker):
+    with django_db_blocker.unblock():
+        region = Region.objects.create(name='Тошкент вилояти')
+        for i in range(20):
+            District.objects.create(region=region, name=f'Туман {i}')
+        Farmer.objects.bulk_create([
+            Farmer(name=f'Фермер {i}', founder_name='Али', director_name='Вали', phone_number='998901234567',
+                   address='Чирчиқ', inn=str(100000000 + i), established_year=2010)
+            for i in range(1000)
+        ])
+        fruit = Fruits.objects.create(name='Олма')
+        FruitVariety.objects.create(fruit=fruit, name='Семеренко')
+        seed_plantations(BENCHMARK_ROWS)
+
+
+@pytest.fixture(scope='module')
+def large_dataset(django_db_setup, django_db_blocker):
+    """Добивает базу до LARGE_ROWS плантаций на время модуля; остальные модули видят BENCHMARK_ROWS."""
+    with django_db_blocker.unblock():
+        last_id = Plantation.objects.order_by('-id').values_list('id', flat=True)[0]
+        seed_plantations(LARGE_ROWS - Plantation.objects.count())
+    yield LARGE_ROWS
+    with django_db_blocker.unblock():
+        # _raw_delete: каскад через Collector на 90k строк дольше самого бенчмарка
+        for model in (PlantationCoordinates, PlantationFruitArea, Subsidy):
+            queryset = model.objects.filter(plantation_id__gt=last_id)
+            queryset._raw_delete(queryset.db)
+        queryset = Plantation.objects.filter(id__gt=last_id)
+        queryset._raw_delete(queryset.db)
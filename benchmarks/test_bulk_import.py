@@ -0,0 +1,68 @@
+"""
+Массовый импорт: NDJSON на 10k строк в /api/plantations/bulk/ против тех же строк по одной
+через /api/plantations/create/ (500 запросов; число строк замера в extra_info):
+
+    pip install -r requirements-dev.txt
+    pytest benchmarks/test_bulk_import.py --benchmark-columns=mean,min,rounds
+"""
+import json
+
+import pytest
+from django.test import Client
+
+from api.bulk_import import IMPORT_CHUNK_SIZE, MAX_IMPORT_CHUNK_SIZE
+from api.models import District
+from api.plantation_models import Farmer, FruitVariety
+
+IMPORT_ROWS = 10000
+PER_ROW_REQUESTS = 500
+
+pytestmark = pytest.mark.django_db
+
+
+def import_rows(count):
+    districts = list(District.objects.values_list('id', flat=True))
+    farmers = list(Farmer.objects.values_list('id', flat=True))
+    fruit, variety = FruitVariety.objects.values_list('fruit_id', 'id').get()
+    return [
+        {
+            'district': districts[i % len(districts)], 'farmer': farmers[i % len(farmers)], 'total_area': 10,
+            'irrigation_area': 1, 'land_type': 'адир',
+            'coordinates': [{'latitude': 40 + i % 100 / 100 + lat, 'longitude': 68 + i // 100 / 100 + lng}
+                            for lat, lng in ((0, 0), (0, 0.01), (0.01, 0.01), (0.01, 0))],
+            'fruit_areas': [{'fruit': fruit, 'variety': variety, 'planted_year': 2020, 'area': 2}],
+            'investment': {'invest_type': 'махаллий', 'investment_amount': 100},
+            'reservoir': {'reservoir_type': 'beton', 'reservoir_volume': 20},
+            'trellis': {'trellis_installed_area': 1, 'trellis_type': 'temir', 'trellis_count': 5},
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.mark.parametrize('chunk_size', [IMPORT_CHUNK_SIZE, MAX_IMPORT_CHUNK_SIZE])
+def test_bulk_ndjson(benchmark, chunk_size):
+    body = '\n'.join(json.dumps(row) for row in import_rows(IMPORT_ROWS))
+    client = Client()
+
+    def post():
+        response = client.post(f'/api/plantations/bulk/?chunk_size={chunk_size}', body,
+                               content_type='application/x-ndjson')
+        assert response.status_code == 201
+        return response.json()
+
+    report = benchmark.pedantic(post, rounds=3, warmup_rounds=1)
+    assert (report['created'], report['failed']) == (IMPORT_ROWS, 0)
+    benchmark.extra_info['rows'] = IMPORT_ROWS
+
+
+def test_per_row_create(benchmark):
+    rows = [dict(row, images=[]) for row in import_rows(PER_ROW_REQUESTS)]
+    client = Client()
+
+    def post():
+        for row in rows:
+            response = client.post('/api/plantations/create/', row, content_type='application/json')
+            assert response.status_code == 201, response.content[:300]
+
+    benchmark.pedantic(post, rounds=3, warmup_rounds=1)
+    benchmark.extra_info['rows'] = PER_ROW_REQUESTS
@@ -0,0 +1,59 @@
+"""
+last_login: save(update_fields=['last_login']) на каждый запрос против LastLoginBuffer
+(api.middleware.UpdateLastLoginMiddleware), 200 запросов одного пользователя за замер:
+
+    pip install -r requirements-dev.txt
+    pytest benchmarks/test_last_login.py --benchmark-columns=mean,min,rounds
+
+Запросы выполняются в транзакции теста, так что коммит каждой записи сюда не входит:
+на рабочей базе разница больше.
+"""
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client
+from django.utils import timezone
+
+from api.middleware import last_login_buffer
+
+REQUESTS = 200
+MIDDLEWARE = {
+    'per-request-save': 'benchmarks.test_last_login.PerRequestLastLoginMiddleware',
+    'buffer': 'api.middleware.UpdateLastLoginMiddleware',
+}
+
+pytestmark = pytest.mark.django_db
+
+
+class PerRequestLastLoginMiddleware:
+    # Прежняя реализация: UPDATE на каждый аутентифицированный запрос
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.user.is_authenticated:
+            request.user.last_login = timezone.now()
+            request.user.save(update_fields=['last_login'])
+        return self.get_response(request)
+
+
+@pytest.mark.parametrize('middleware', list(MIDDLEWARE))
+def test_authenticated_requests(benchmark, settings, middleware):
+    settings.MIDDLEWARE = [
+        MIDDLEWARE[middleware] if path == 'api.middleware.UpdateLastLoginMiddleware' else path
+        for path in settings.MIDDLEWARE
+    ]
+    user = get_user_model().objects.create(username='benchmark', phone_number='998901234567')
+    client = Client()
+    client.force_login(user)
+
+    def get():
+        for _ in range(REQUESTS):
+            assert client.get('/api/regions/').status_code == 200
+
+    # Окно LAST_LOGIN_WINDOW начинается заново в каждом замере: буфер записывает первую отметку
+    benchmark.pedantic(get, setup=cache.clear, rounds=3, warmup_rounds=1)
+    last_login_buffer.flush()
+    user.refresh_from_db()
+    assert user.last_login is not None
+    benchmark.extra_info['requests'] = REQUESTS
@@ -0,0 +1,62 @@
+"""
+Отдача медиафайла 5 МБ: django.views.static.serve против api.media.serve_media
+(целиком, ревалидация 304, диапазон 64 КБ, X-Accel-Redirect):
+
+    pip install -r requirements-dev.txt
+    pytest benchmarks/test_media.py --benchmark-columns=mean,min,rounds
+"""
+import os
+
+import pytest
+from django.test import RequestFactory
+from django.views.static import serve
+
+from api.media import serve_media
+
+NAME = 'plantation_images/ab/' + 'ab' * 32 + '.jpg'
+FILE_SIZE = 5 * 1024 * 1024
+
+# Случай -> (представление, настройки, ожидаемый статус, размер тела)
+CASES = {
+    'static-serve-full': ('static', {}, 200, FILE_SIZE),
+    'serve-media-full': ('media', {}, 200, FILE_SIZE),
+    'serve-media-304': ('media', {}, 304, 0),
+    'serve-media-range': ('media', {}, 206, 65536),
+    'serve-media-x-accel': ('media', {'MEDIA_SENDFILE': 'x-accel'}, 200, 0),
+}
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    os.makedirs(tmp_path / os.path.dirname(NAME))
+    (tmp_path / NAME).write_bytes(os.urandom(FILE_SIZE))
+    settings.MEDIA_ROOT = str(tmp_path)
+    return str(tmp_path)
+
+
+@pytest.mark.parametrize('case', list(CASES))
+def test_serve(benchmark, settings, media_root, case):
+    view, overrides, expected_status, expected_size = CASES[case]
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    factory = RequestFactory()
+    headers = {}
+    if case == 'serve-media-304':
+        headers['HTTP_IF_NONE_MATCH'] = serve_media(factory.get('/'), NAME)['ETag']
+    elif case == 'serve-media-range':
+        headers['HTTP_RANGE'] = 'bytes=0-65535'
+
+    def get():
+        if view == 'static':
+            response = serve(factory.get('/'), NAME, document_root=media_root)
+        else:
+            response = serve_media(factory.get('/storage/' + NAME, **headers), NAME)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        response.close()
+        return response, body
+
+    response, body = benchmark(get)
+    assert (response.status_code, len(body)) == (expected_status, expected_size)
+    benchmark.extra_info['bytes'] = len(body)
@@ -0,0 +1,47 @@
+"""
+Страницы /api/plantations/full/ на 100k плантаций: ?page= (с COUNT и без) против ?cursor=,
+в начале и в конце списка:
+
+    pip install -r requirements-dev.txt
+    pytest benchmarks/test_pagination.py --benchmark-group-by=param:position
+"""
+import pytest
+from django.core.cache import cache
+from django.test import Client
+
+from api.plantation_models import Plantation
+
+PAGE_SIZE = 100
+# Номер страницы; курсор для неё — id последней строки предыдущей страницы
+POSITIONS = {'shallow': 2, 'deep': 990}
+
+pytestmark = pytest.mark.django_db
+
+
+def page_url(mode, page):
+    url = f'/api/plantations/full/?page_size={PAGE_SIZE}'
+    if mode == 'cursor':
+        cursor = Plantation.objects.order_by('id').values_list('id', flat=True)[(page - 1) * PAGE_SIZE - 1]
+        return f'{url}&cursor={cursor}'
+    if mode == 'page-uncounted':
+        return f'{url}&page={page}&count=false'
+    return f'{url}&page={page}'
+
+
+@pytest.mark.parametrize('mode', ['page', 'page-uncounted', 'cursor'])
+@pytest.mark.parametrize('position', list(POSITIONS))
+def test_page(benchmark, large_dataset, position, mode):
+    page = POSITIONS[position]
+    url = page_url(mode, page)
+    first_id = Plantation.objects.order_by('id').values_list('id', flat=True)[(page - 1) * PAGE_SIZE]
+    client = Client()
+
+    def get():
+        response = client.get(url)
+        assert response.status_code == 200
+        return response.json()
+
+    # Кэш ответов очищается перед каждым замером: считается запрос к базе, а не попадание в кэш
+    data = benchmark.pedantic(get, setup=cache.clear, rounds=3, warmup_rounds=1)
+    assert data['results'][0]['id'] == first_id
+    assert len(data['results']) == PAGE_SIZE
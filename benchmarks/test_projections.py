@@ -0,0 +1,47 @@
+"""
+Сериализаторы DRF против проекций (api.projections) на 1k и 10k плантаций:
+
+    pip install -r requirements-dev.txt
+    pytest benchmarks/test_projections.py --benchmark-group-by=param:endpoint,param:rows
+"""
+import pytest
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.plantation_models import Plantation
+from api.plantations import MapPlantationSerializer, PlantationDetailSerializer, PlantationListSerializer
+from api.projections import MapPlantationProjection, PlantationDetailProjection, PlantationListProjection
+
+ENDPOINTS = {
+    # Загрузка та же, что у представлений до проекций
+    'list': (PlantationListSerializer, PlantationListProjection,
+             lambda queryset: queryset.select_related('district__region')),
+    'map': (MapPlantationSerializer, MapPlantationProjection,
+            lambda queryset: MapPlantationSerializer.setup_eager_loading(queryset)),
+    'full': (PlantationDetailSerializer, PlantationDetailProjection,
+             lambda queryset: PlantationDetailSerializer.setup_eager_loading(queryset)),
+}
+
+pytestmark = pytest.mark.django_db
+
+
+def render(path, endpoint, rows):
+    serializer_class, projection_class, eager_loading = ENDPOINTS[endpoint]
+    context = {'request': Request(APIRequestFactory().get('/api/plantations/'))}
+    queryset = Plantation.objects.order_by('id')
+    if path == 'serializer':
+        data = serializer_class(eager_loading(queryset)[:rows], many=True, context=context).data
+    else:
+        projection = projection_class(context)
+        data = projection.render(projection.values(queryset)[:rows])
+    return JSONRenderer().render(data)
+
+
+@pytest.mark.parametrize('rows', [1000, 10000])
+@pytest.mark.parametrize('endpoint', list(ENDPOINTS))
+@pytest.mark.parametrize('path', ['serializer', 'projection'])
+def test_render(benchmark, path, endpoint, rows):
+    # Замеряется запрос и сборка ответа; рендерер один и тот же
+    body = benchmark.pedantic(render, args=(path, endpoint, rows), rounds=3, warmup_rounds=1)
+    assert body == render('serializer' if path == 'projection' else 'projection', endpoint, rows)
@@ -0,0 +1,61 @@
+"""
+Время рендеринга (stdlib JSONRenderer против FastJSONRenderer) и размер ответа по сети
+(без сжатия, gzip, brotli) для самых тяжёлых списков:
+
+    pip install -r requirements-dev.txt
+    pytest benchmarks/test_renderers.py --benchmark-columns=mean,min,rounds
+
+Размер ответа записывается в extra_info (--benchmark-json=result.json).
+"""
+import pytest
+from django.core.cache import cache
+from django.test import Client
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.plantation_models import Plantation
+from api.projections import MapPlantationProjection, PlantationDetailProjection
+from api.renderers import FastJSONRenderer
+
+PAYLOADS = {
+    'full-1000': (PlantationDetailProjection, 1000),
+    'map-10000': (MapPlantationProjection, 10000),
+}
+URLS = {
+    'full': '/api/plantations/full/?page_size=100&count=false',
+    'map': '/api/plantations/map/?page_size=1000&count=false',
+    'geojson': '/api/plantations/map/?format=geojson',
+}
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.mark.parametrize('renderer_class', [JSONRenderer, FastJSONRenderer], ids=['stdlib', 'orjson'])
+@pytest.mark.parametrize('payload', list(PAYLOADS))
+def test_render(benchmark, renderer_class, payload):
+    projection_class, rows = PAYLOADS[payload]
+    projection = projection_class({'request': Request(APIRequestFactory().get('/'))})
+    data = projection.render(projection.values(Plantation.objects.order_by('id'))[:rows])
+    body = benchmark(renderer_class().render, data)
+    benchmark.extra_info['bytes'] = len(body)
+    assert body == JSONRenderer().render(data)
+
+
+@pytest.mark.parametrize('encoding', ['identity', 'gzip', 'br'])
+@pytest.mark.parametrize('url', list(URLS))
+def test_wire_size(benchmark, url, encoding):
+    client = Client()
+
+    def get():
+        response = client.get(URLS[url], HTTP_ACCEPT_ENCODING=encoding)
+        assert response.status_code == 200
+        return response, b''.join(response.streaming_content) if response.streaming else response.content
+
+    # Кэш ответов очищается перед каждым замером: считается сборка и сжатие, а не попадание в кэш
+    response, body = benchmark.pedantic(get, setup=cache.clear, rounds=3, warmup_rounds=1)
+    benchmark.extra_info['bytes'] = len(body)
+    if encoding == 'identity':
+        assert not response.has_header('Content-Encoding')
+    else:
+        assert response['Content-Encoding'] == encoding
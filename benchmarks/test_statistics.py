@@ -0,0 +1,23 @@
+"""
+api.statistics.compute_statistics на 100k плантаций: без группировки и на каждом сочетании group_by:
+
+    pip install -r requirements-dev.txt
+    pytest benchmarks/test_statistics.py --benchmark-group-by=param:groups
+"""
+from itertools import combinations
+
+import pytest
+
+from api.plantation_models import Plantation
+from api.statistics import GROUP_FIELDS, compute_statistics
+
+GROUPS = [groups for size in range(len(GROUP_FIELDS) + 1) for groups in combinations(GROUP_FIELDS, size)]
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.mark.parametrize('groups', GROUPS, ids=lambda groups: ','.join(groups) or 'none')
+def test_compute_statistics(benchmark, large_dataset, groups):
+    rows = benchmark.pedantic(compute_statistics, args=(Plantation.objects.all(), groups), rounds=3, warmup_rounds=1)
+    assert sum(row['plantation_count'] for row in rows) >= large_dataset
+    benchmark.extra_info['groups'] = len(rows)
@@ -1,5 +1,6 @@
 from datetime import timedelta
 import os
+import tempfile
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -30,6 +31,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'api.middleware.CompressionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -66,6 +68,32 @@ DATABASES = {
     }
 }
 
+# Кэш общий для всех процессов: версии каталога, тайлов, кэша списков и автодополнения должны
+# меняться сразу во всех воркерах. REDIS_URL - Redis (нужен пакет redis), иначе файловый кэш в CACHE_DIR:
+# общий для воркеров одного сервера (на serverless - для вызовов одного экземпляра)
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_DIR', os.path.join(tempfile.gettempdir(), 'geoagro-cache')),
+            # По умолчанию 300 записей: ответы списков вытесняли бы изменения автодополнения, и воркеры
+            # перестраивали бы индекс вместо применения изменений
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        }
+    }
+
+# Кэш ответов списков плантаций (api.response_cache): алиас из CACHES, общий для всех воркеров,
+# иначе воркеры отдают устаревшие списки и /api/cache/stats/ показывает счётчики одного процесса
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = 5 * 60
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -83,6 +111,18 @@ AUTH_PASSWORD_VALIDATORS = [
 #     ],
 # }
 
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'api.authentication.ClaimsJWTAuthentication',  # JWT без запроса пользователя к БД
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',  # orjson, без него - стандартный json
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
 SIMPLE_JWT = {
     # 'ACCESS_TOKEN_LIFETIME': timedelta(days=15),
     # 'REFRESH_TOKEN_LIFETIME': timedelta(days=30),
@@ -123,6 +163,17 @@ USE_TZ = True
 MEDIA_URL = '/storage/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'storage')
 
+# Версии фото (api.images) строятся в пуле потоков процесса. На Vercel (переменная окружения VERCEL)
+# функция замораживается сразу после ответа, и задачи пула не доживают до выполнения - там версии
+# строятся в on_commit самого запроса, а пропущенные дополняет команда build_image_variants
+IMAGE_VARIANTS_ASYNC = not os.getenv('VERCEL')
+
+# Снимки для аналитики (api.snapshots). Каталог проекта на Vercel только для чтения, там по умолчанию
+# временный каталог экземпляра функции; постоянное место задаётся переменной SNAPSHOT_ROOT
+SNAPSHOT_ROOT = os.getenv('SNAPSHOT_ROOT') or (
+    os.path.join(tempfile.gettempdir(), 'geoagro-snapshots') if os.getenv('VERCEL') else os.path.join(BASE_DIR, 'snapshots')
+)
+
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+from api.media import serve_media
 from api.views import home_view
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
@@ -27,4 +27,6 @@ urlpatterns = [
     path('docs/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
     re_path(r'^swagger(?P<format>\.json|\.yaml)$', schema_view.without_ui(cache_timeout=0), name='schema-json'),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    # Медиафайлы: условные запросы, диапазоны, X-Accel-Redirect / X-Sendfile (api.media)
+    re_path(r'^%s(?P<path>.*)$' % settings.MEDIA_URL.lstrip('/'), serve_media, name='media'),
+]